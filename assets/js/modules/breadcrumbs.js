@@ -2,125 +2,111 @@
  * Dynamic Breadcrumbs - ES6 Module
  * Отслеживают текущий H2/H3 при прокрутке
  * Dropdown меню для навигации по всем H2
+ *
+ * Структура заголовков берётся из <script id="md-outline"> (генерирует
+ * OutlinePostprocessor), текущий раздел - бинарным поиском по позициям
+ * заголовков (IntersectionObserver, hashchange, scrollend - сигналы для
+ * пересчёта), DOM обновляется только при смене раздела.
  */
 
-export function initDynamicBreadcrumbs() {
-  console.log("🔧 [Breadcrumbs] Инициализация...");
+// Линия от верха окна: заголовок выше неё считается текущим
+const BREADCRUMBS_OFFSET = 150;
 
+export function initDynamicBreadcrumbs() {
   const breadcrumbsContainer = document.querySelector(".breadcrumbs-dynamic");
   if (!breadcrumbsContainer) {
     console.warn("⚠️ [Breadcrumbs] Контейнер .breadcrumbs-dynamic не найден");
     return;
   }
 
-  const headings = Array.from(document.querySelectorAll("h2, h3"));
-  if (headings.length === 0) {
-    console.warn("⚠️ [Breadcrumbs] Заголовки h2/h3 не найдены");
+  const outline = loadOutline();
+  if (outline.length === 0) {
     return;
   }
 
-  console.log(
-    `📚 [Breadcrumbs] Найдено заголовков: ${headings.length} (h2: ${
-      headings.filter((h) => h.tagName === "H2").length
-    }, h3: ${headings.filter((h) => h.tagName === "H3").length})`
-  );
+  const headings = outline.map((entry) => document.getElementById(entry.id));
+  const h2Entries = outline.filter((entry) => entry.level === 2);
 
-  // Добавляем ID к заголовкам (если нет)
-  headings.forEach((heading, index) => {
-    if (!heading.id) {
-      const slug = heading.textContent
-        .toLowerCase()
-        .replace(/[^\w\s-]/g, "")
-        .replace(/\s+/g, "-")
-        .substring(0, 50);
-      heading.id = `heading-${slug}-${index}`;
+  const isTouchDevice = "ontouchstart" in window;
+
+  // DOM строится один раз, дальше меняются только текст и классы
+  const h2Item = createH2Item();
+  const h3Separator = document.createElement("span");
+  h3Separator.className = "breadcrumb-separator h2-h3-separator";
+  h3Separator.textContent = " / ";
+  const h3Item = document.createElement("span");
+  h3Item.className = "breadcrumb-item breadcrumb-h3 active";
+
+  let activeH2 = -1;
+  let activeH3 = -1;
+
+  function render(index) {
+    let h2 = -1;
+    let h3 = -1;
+    if (index >= 0) {
+      const entry = outline[index];
+      h2 = entry.level === 2 ? index : entry.parent;
+      h3 = entry.level === 3 && entry.parent >= 0 ? index : -1;
     }
-  });
 
-  const allH2 = headings.filter((h) => h.tagName === "H2");
+    if (h2 === activeH2 && h3 === activeH3) {
+      return;
+    }
 
-  // Определяем устройство
-  const isTouchDevice = "ontouchstart" in window;
-  const isMobile = window.innerWidth <= 768;
-  console.log(
-    `📱 [Breadcrumbs] Touch: ${isTouchDevice}, Mobile: ${isMobile}, Width: ${window.innerWidth}px`
-  );
-
-  function updateBreadcrumbs() {
-    const scrollPosition = window.scrollY + 150;
-    let currentH2 = null;
-    let currentH3 = null;
-
-    for (const heading of headings) {
-      const headingTop = heading.offsetTop;
-
-      if (headingTop <= scrollPosition) {
-        if (heading.tagName === "H2") {
-          currentH2 = heading;
-          currentH3 = null;
-        } else if (heading.tagName === "H3" && currentH2) {
-          currentH3 = heading;
-        }
+    if (h2 !== activeH2) {
+      if (activeH2 >= 0) {
+        h2Item.items.get(activeH2).classList.remove("active");
+      }
+      if (h2 >= 0) {
+        h2Item.link.href = `#${outline[h2].id}`;
+        h2Item.link.textContent = outline[h2].text;
+        h2Item.items.get(h2).classList.add("active");
       }
     }
 
-    breadcrumbsContainer.innerHTML = "";
-
-    console.log(
-      `📍 [Breadcrumbs] Update - H2: ${
-        currentH2 ? currentH2.textContent.substring(0, 30) : "none"
-      }, H3: ${currentH3 ? currentH3.textContent.substring(0, 30) : "none"}`
-    );
-
-    if (currentH2) {
-      addBreadcrumbWithDropdown(breadcrumbsContainer, currentH2, allH2);
+    if (h3 >= 0) {
+      h3Item.textContent = outline[h3].text;
     }
 
-    if (currentH3) {
-      console.log(
-        `➕ [Breadcrumbs] Добавляем H3 элемент: "${currentH3.textContent.substring(
-          0,
-          30
-        )}"`
-      );
-      addBreadcrumb(
-        breadcrumbsContainer,
-        currentH3.textContent,
-        currentH3.id,
-        true,
-        true // isH3 = true для скрытия на мобильных
-      );
+    activeH2 = h2;
+    activeH3 = h3;
+
+    if (h2 < 0) {
+      breadcrumbsContainer.replaceChildren();
+    } else if (h3 < 0) {
+      breadcrumbsContainer.replaceChildren(h2Item.wrapper, h3Separator);
+    } else {
+      breadcrumbsContainer.replaceChildren(h2Item.wrapper, h3Separator, h3Item);
     }
   }
 
-  function addBreadcrumbWithDropdown(container, currentH2, allH2) {
+  function createH2Item() {
     const wrapper = document.createElement("span");
     wrapper.className = "breadcrumb-item breadcrumb-dropdown";
 
     const link = document.createElement("a");
-    link.href = `#${currentH2.id}`;
-    link.textContent = currentH2.textContent;
     link.className = "breadcrumb-h2-link";
 
     const dropdown = document.createElement("div");
     dropdown.className = "breadcrumb-dropdown-menu";
 
-    allH2.forEach((h2) => {
+    const items = new Map();
+    h2Entries.forEach((entry) => {
       const dropdownItem = document.createElement("a");
-      dropdownItem.href = `#${h2.id}`;
-      dropdownItem.textContent = h2.textContent;
+      dropdownItem.href = `#${entry.id}`;
+      dropdownItem.textContent = entry.text;
       dropdownItem.className = "breadcrumb-dropdown-item";
 
-      if (h2.id === currentH2.id) {
-        dropdownItem.classList.add("active");
-      }
-
       dropdownItem.addEventListener("click", (e) => {
         e.preventDefault();
-        h2.scrollIntoView({ behavior: "smooth", block: "start" });
+        const target = headings[entry.index];
+        if (target) {
+          target.scrollIntoView({ behavior: "smooth", block: "start" });
+        }
         dropdown.classList.remove("show");
       });
 
+      items.set(entry.index, dropdownItem);
       dropdown.appendChild(dropdownItem);
     });
 
@@ -128,27 +114,17 @@ export function initDynamicBreadcrumbs() {
     wrapper.appendChild(dropdown);
 
     let closeTimer;
-    let isTouchDevice = "ontouchstart" in window;
-    let isMobile = window.innerWidth <= 768;
-
-    console.log(
-      `🔘 [Dropdown] Touch=${isTouchDevice}, Mobile=${isMobile}, Width=${window.innerWidth}px`
-    );
 
     // Desktop: hover для открытия
     wrapper.addEventListener("mouseenter", () => {
       if (!isTouchDevice) {
-        console.log("🖱️ [Dropdown] Hover - открываем меню");
         clearTimeout(closeTimer);
         dropdown.classList.add("show");
-      } else {
-        console.log("👆 [Dropdown] Hover игнорируется (touch device)");
       }
     });
 
     wrapper.addEventListener("mouseleave", () => {
       if (!isTouchDevice) {
-        console.log("🖱️ [Dropdown] Mouseleave - закрываем через 300ms");
         closeTimer = setTimeout(() => {
           dropdown.classList.remove("show");
         }, 300);
@@ -158,102 +134,124 @@ export function initDynamicBreadcrumbs() {
     // Mobile/Touch: клик/тап для toggle меню
     link.addEventListener("click", (e) => {
       e.preventDefault();
-      console.log(
-        `👆 [Dropdown] Click - Touch=${isTouchDevice}, Mobile=${isMobile}`
-      );
 
       if (isTouchDevice || window.innerWidth <= 768) {
         // На мобильных - toggle dropdown
-        const isShown = dropdown.classList.toggle("show");
-        console.log(
-          `📲 [Dropdown] Toggle menu - теперь ${
-            isShown ? "ОТКРЫТО" : "ЗАКРЫТО"
-          }`
-        );
-      } else {
+        dropdown.classList.toggle("show");
+      } else if (activeH2 >= 0 && headings[activeH2]) {
         // На desktop - переход к заголовку
-        console.log("🖥️ [Dropdown] Desktop - скролл к заголовку");
-        currentH2.scrollIntoView({ behavior: "smooth", block: "start" });
+        headings[activeH2].scrollIntoView({ behavior: "smooth", block: "start" });
       }
     });
 
     // Закрытие dropdown при клике вне его
     document.addEventListener("click", (e) => {
-      if (!wrapper.contains(e.target)) {
-        if (dropdown.classList.contains("show")) {
-          console.log("❌ [Dropdown] Клик вне - закрываем");
-          dropdown.classList.remove("show");
-        }
+      if (!wrapper.contains(e.target) && dropdown.classList.contains("show")) {
+        dropdown.classList.remove("show");
       }
     });
 
-    container.appendChild(wrapper);
-
-    const separator = document.createElement("span");
-    separator.className = "breadcrumb-separator h2-h3-separator";
-    separator.textContent = " / ";
-    container.appendChild(separator);
+    return { wrapper, link, items };
   }
 
-  function addBreadcrumb(container, text, id, isLast = false, isH3 = false) {
-    const item = document.createElement("span");
-    item.className = "breadcrumb-item";
-
-    // Добавляем класс для h3 элементов (для скрытия на мобильных)
-    if (isH3) {
-      item.classList.add("breadcrumb-h3");
-      console.log(
-        `🏷️ [Breadcrumb] Добавлен класс breadcrumb-h3 к: "${text.substring(
-          0,
-          30
-        )}", классы: ${item.className}`
-      );
-    }
+  // Заголовки страницы в порядке документа (без отсутствующих в DOM)
+  const located = [];
+  headings.forEach((heading, index) => {
+    if (heading) located.push({ heading, index });
+  });
 
-    if (isLast) {
-      item.textContent = text;
-      item.classList.add("active");
-    } else {
-      const link = document.createElement("a");
-      link.href = `#${id}`;
-      link.textContent = text;
+  // Текущий заголовок - последний выше линии BREADCRUMBS_OFFSET. Позиции
+  // заголовков растут по порядку документа: бинарный поиск, O(log n)
+  // вызовов getBoundingClientRect на обновление
+  function currentIndex() {
+    let low = 0;
+    let high = located.length;
+    while (low < high) {
+      const middle = (low + high) >> 1;
+      if (located[middle].heading.getBoundingClientRect().top < BREADCRUMBS_OFFSET) {
+        low = middle + 1;
+      } else {
+        high = middle;
+      }
+    }
+    return low > 0 ? located[low - 1].index : -1;
+  }
 
-      link.addEventListener("click", (e) => {
-        e.preventDefault();
-        const target = document.getElementById(id);
-        if (target) {
-          target.scrollIntoView({ behavior: "smooth", block: "start" });
-        }
-      });
+  let pending = false;
+  function update() {
+    if (pending) return;
+    pending = true;
+    requestAnimationFrame(() => {
+      pending = false;
+      render(currentIndex());
+    });
+  }
 
-      item.appendChild(link);
-    }
+  // IntersectionObserver - только сигнал "заголовок пересёк линию": при
+  // прыжке (оглавление, якорь, Home/End, полоса прокрутки) заголовки
+  // перескакивают через область без пересечения и callback не приходит,
+  // поэтому позиция всегда пересчитывается по DOM, а прыжки ловят
+  // hashchange и scrollend
+  if ("IntersectionObserver" in window) {
+    const observer = new IntersectionObserver(update, {
+      // Область наблюдения - окно без верхней полосы BREADCRUMBS_OFFSET
+      rootMargin: `-${BREADCRUMBS_OFFSET}px 0px 0px 0px`,
+    });
+    located.forEach(({ heading }) => observer.observe(heading));
+  }
+  window.addEventListener("hashchange", update);
+  if ("onscrollend" in window) {
+    window.addEventListener("scrollend", update);
+  } else {
+    // Без scrollend (Safari): не чаще раза за кадр
+    window.addEventListener("scroll", update, { passive: true });
+  }
+  update();
 
-    container.appendChild(item);
+  console.log(`✅ Dynamic breadcrumbs initialized (${h2Entries.length} H2 headings)`);
+}
 
-    // Добавляем разделитель с классом для h3 (для скрытия на мобильных)
-    if (isH3 && !isLast) {
-      const separator = document.createElement("span");
-      separator.className = "breadcrumb-separator h3-separator";
-      separator.textContent = " / ";
-      container.appendChild(separator);
-      console.log(`🏷️ [Breadcrumb] Добавлен разделитель h3-separator`);
+/**
+ * Структура заголовков: из JSON (Python) или из DOM (fallback)
+ */
+function loadOutline() {
+  const script = document.getElementById("md-outline");
+  if (script) {
+    try {
+      return JSON.parse(script.textContent).map(([id, level, parent, text], index) => ({
+        id,
+        level,
+        parent,
+        text,
+        index,
+      }));
+    } catch (error) {
+      console.warn("⚠️ [Breadcrumbs] Некорректный md-outline:", error);
     }
   }
 
-  let ticking = false;
-  window.addEventListener("scroll", () => {
-    if (!ticking) {
-      window.requestAnimationFrame(() => {
-        updateBreadcrumbs();
-        ticking = false;
-      });
-      ticking = true;
+  const outline = [];
+  let lastH2 = -1;
+  document.querySelectorAll("h2, h3").forEach((heading, index) => {
+    // Добавляем ID к заголовкам (если нет)
+    if (!heading.id) {
+      const slug = heading.textContent
+        .toLowerCase()
+        .replace(/[^\w\s-]/g, "")
+        .replace(/\s+/g, "-")
+        .substring(0, 50);
+      heading.id = `heading-${slug}-${index}`;
     }
-  });
 
-  updateBreadcrumbs();
-  console.log(
-    `✅ Dynamic breadcrumbs initialized (${allH2.length} H2 headings)`
-  );
+    const level = heading.tagName === "H2" ? 2 : 3;
+    if (level === 2) lastH2 = outline.length;
+    outline.push({
+      id: heading.id,
+      level,
+      parent: level === 2 ? -1 : lastH2,
+      text: heading.textContent,
+      index: outline.length,
+    });
+  });
+  return outline;
 }
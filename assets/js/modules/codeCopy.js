@@ -3,23 +3,30 @@
  */
 
 export function addCodeCopyButtons() {
-  document.querySelectorAll("pre:not(.mermaid)").forEach((preBlock) => {
-    preBlock.style.position = "relative";
+  document.querySelectorAll("pre:not(.mermaid)").forEach(addCodeCopyButton);
+  console.log("✅ Code copy buttons added");
+}
+
+/**
+ * Кнопка копирования для одного блока (ленивая инициализация)
+ */
+export function addCodeCopyButton(preBlock) {
+  if (preBlock.dataset.copyAttached === "true") return;
+  preBlock.dataset.copyAttached = "true";
+  preBlock.style.position = "relative";
 
-    const copyButton = createCopyButton();
-    preBlock.appendChild(copyButton);
+  const copyButton = createCopyButton();
+  preBlock.appendChild(copyButton);
 
-    copyButton.addEventListener("click", () => {
-      const codeElement = preBlock.querySelector("code");
-      if (!codeElement) return;
+  copyButton.addEventListener("click", () => {
+    const codeElement = preBlock.querySelector("code");
+    if (!codeElement) return;
 
-      const codeContent = codeElement.innerText;
-      navigator.clipboard.writeText(codeContent).then(() => {
-        showCopyFeedback(copyButton);
-      });
+    const codeContent = codeElement.innerText;
+    navigator.clipboard.writeText(codeContent).then(() => {
+      showCopyFeedback(copyButton);
     });
   });
-  console.log("✅ Code copy buttons added");
 }
 
 function createCopyButton() {
@@ -58,58 +58,97 @@ function showFullscreenContent(content) {
 }
 
 function attachMermaidClickHandlers() {
-  const mermaidContainers = document.querySelectorAll("div.mermaid, .mermaid");
+  document
+    .querySelectorAll("div.mermaid, .mermaid")
+    .forEach(attachMermaidClickHandler);
+}
 
-  mermaidContainers.forEach((container) => {
-    if (container.dataset.fullscreenAttached === "true") {
-      return;
-    }
+/**
+ * Fullscreen для одного Mermaid контейнера (ленивая инициализация)
+ */
+export function attachMermaidClickHandler(container) {
+  if (container.dataset.fullscreenAttached === "true") {
+    return;
+  }
 
-    container.dataset.fullscreenAttached = "true";
-    container.style.cursor = "zoom-in";
+  container.dataset.fullscreenAttached = "true";
+  container.style.cursor = "zoom-in";
 
-    container.addEventListener("click", function (e) {
-      e.stopPropagation();
-      e.preventDefault();
+  container.addEventListener("click", function (e) {
+    e.stopPropagation();
+    e.preventDefault();
 
-      const svg = this.querySelector("svg");
-      if (!svg) return;
+    const svg = this.querySelector("svg");
+    if (!svg) return;
 
-      // Клонируем через innerHTML для сохранения SVG namespace
-      const tempWrapper = document.createElement("div");
-      tempWrapper.innerHTML = svg.outerHTML;
-      const svgClone = tempWrapper.firstElementChild;
+    // Клонируем через innerHTML для сохранения SVG namespace
+    const tempWrapper = document.createElement("div");
+    tempWrapper.innerHTML = svg.outerHTML;
+    const svgClone = tempWrapper.firstElementChild;
 
-      // Сохраняем или создаём viewBox
-      const rect = svg.getBoundingClientRect();
-      const existingViewBox = svg.getAttribute("viewBox");
-      if (!existingViewBox) {
-        svgClone.setAttribute("viewBox", `0 0 ${rect.width} ${rect.height}`);
-      }
+    // Сохраняем или создаём viewBox
+    const rect = svg.getBoundingClientRect();
+    const existingViewBox = svg.getAttribute("viewBox");
+    if (!existingViewBox) {
+      svgClone.setAttribute("viewBox", `0 0 ${rect.width} ${rect.height}`);
+    }
 
-      // Удаляем фиксированные размеры
-      svgClone.removeAttribute("width");
-      svgClone.removeAttribute("height");
-      svgClone.removeAttribute("style");
+    // Удаляем фиксированные размеры
+    svgClone.removeAttribute("width");
+    svgClone.removeAttribute("height");
+    svgClone.removeAttribute("style");
 
-      showFullscreenContent(svgClone);
-    });
+    showFullscreenContent(svgClone);
   });
 }
 
-export function enableFullscreenMedia() {
-  // Создаём контейнер
+/**
+ * Fullscreen для одного изображения (ленивая инициализация)
+ */
+export function attachFullscreenToImage(img) {
+  if (img.dataset.fullscreenAttached === "true") return;
+  img.dataset.fullscreenAttached = "true";
+  img.style.cursor = "zoom-in";
+  img.addEventListener("click", () => {
+    const clone = img.cloneNode(true);
+    // srcset подобран под колонку текста, на весь экран нужен вариант под окно
+    if (clone.srcset) clone.sizes = "100vw";
+    showFullscreenContent(clone);
+  });
+}
+
+/**
+ * Контейнер полноэкранного просмотра и закрытие по фону/ESC (один раз)
+ */
+export function initFullscreenContainer() {
+  if (_fullscreenContainer) return;
+
   _fullscreenContainer = createFullscreenContainer();
   document.body.appendChild(_fullscreenContainer);
 
-  // Обработка изображений
-  document.querySelectorAll("img:not(.no-fullscreen)").forEach((img) => {
-    img.style.cursor = "zoom-in";
-    img.addEventListener("click", () => {
-      showFullscreenContent(img.cloneNode(true));
-    });
+  // Закрытие по клику на фон
+  _fullscreenContainer.addEventListener("click", (e) => {
+    if (e.target === _fullscreenContainer) {
+      _fullscreenContainer.classList.remove("active");
+    }
   });
 
+  // Закрытие по ESC
+  document.addEventListener("keydown", (e) => {
+    if (e.key === "Escape") {
+      _fullscreenContainer.classList.remove("active");
+    }
+  });
+}
+
+export function enableFullscreenMedia() {
+  initFullscreenContainer();
+
+  // Обработка изображений
+  document
+    .querySelectorAll("img:not(.no-fullscreen)")
+    .forEach(attachFullscreenToImage);
+
   // Обработка Mermaid диаграмм
   attachMermaidClickHandlers();
 
@@ -126,19 +165,5 @@ export function enableFullscreenMedia() {
   // Останавливаем observer через 10 секунд
   setTimeout(() => observer.disconnect(), 10000);
 
-  // Закрытие по клику на фон
-  _fullscreenContainer.addEventListener("click", (e) => {
-    if (e.target === _fullscreenContainer) {
-      _fullscreenContainer.classList.remove("active");
-    }
-  });
-
-  // Закрытие по ESC
-  document.addEventListener("keydown", (e) => {
-    if (e.key === "Escape") {
-      _fullscreenContainer.classList.remove("active");
-    }
-  });
-
   console.log("✅ Fullscreen media enabled");
 }
@@ -0,0 +1,43 @@
+/**
+ * Lazy Hydration - ES6 Module
+ * Инициализация функций только для элементов, подходящих к viewport
+ */
+
+/**
+ * Один проход querySelectorAll и один IntersectionObserver для всех функций.
+ *
+ * @param {Array<{selector: string, hydrate: Function}>} hydrators
+ * @param {string} rootMargin - запас до viewport (элемент готов заранее)
+ */
+export function initLazyHydration(hydrators, rootMargin = "600px 0px") {
+  if (!hydrators.length) return;
+
+  const selector = hydrators.map((h) => h.selector).join(", ");
+  const elements = document.querySelectorAll(selector);
+
+  const hydrate = (element) => {
+    hydrators.forEach((h) => {
+      if (element.matches(h.selector)) h.hydrate(element);
+    });
+  };
+
+  // Старые браузеры: инициализируем всё сразу
+  if (!("IntersectionObserver" in window)) {
+    elements.forEach(hydrate);
+    return;
+  }
+
+  const observer = new IntersectionObserver(
+    (entries) => {
+      entries.forEach((entry) => {
+        if (!entry.isIntersecting) return;
+        observer.unobserve(entry.target);
+        hydrate(entry.target);
+      });
+    },
+    { rootMargin }
+  );
+
+  elements.forEach((element) => observer.observe(element));
+  console.log(`💧 Lazy hydration: ${elements.length} elements`);
+}
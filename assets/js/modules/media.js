@@ -106,3 +106,29 @@ function initVideoPlayer() {
     console.log(`Инициализировано ${audioElements.length} аудио плееров`);
   }
 }
+
+/**
+ * Plyr для одного audio/video элемента (ленивая инициализация)
+ */
+export function setupPlyrPlayer(element) {
+  if (typeof Plyr === "undefined" || element.dataset.plyrAttached === "true") {
+    return null;
+  }
+  element.dataset.plyrAttached = "true";
+
+  return new Plyr(element, {
+    controls: [
+      "play-large",
+      "play",
+      "progress",
+      "current-time",
+      "duration",
+      "mute",
+      "volume",
+      "settings",
+      "fullscreen",
+    ],
+    settings: ["quality", "speed"],
+    speed: { selected: 1, options: [0.5, 0.75, 1, 1.25, 1.5, 2] },
+  });
+}
@@ -7,27 +7,21 @@ from pathlib import Path
 
 try:
     from md_converter import Converter, ConverterConfig
+    from md_converter.batch import expand_inputs
 except ImportError:
     # Если запускаем из корня проекта
     sys.path.insert(0, str(Path(__file__).parent))
     from md_converter import Converter, ConverterConfig
+    from md_converter.batch import expand_inputs
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        prog="md-convert",
-        description="Конвертер Markdown в HTML/EPUB с профессиональным оформлением",
-    )
-
-    # Позиционные аргументы
-    parser.add_argument("input", help="Путь к MD файлу или папке")
-    parser.add_argument("-o", "--output", help="Имя выходного файла (без расширения)")
-
+def add_common_arguments(parser: argparse.ArgumentParser):
+    """Общие опции одиночной и пакетной конвертации."""
     # Форматы
     parser.add_argument(
         "-f",
         "--format",
-        choices=["html", "epub", "both"],
+        choices=["html", "epub", "both", "site"],
         default="html",
         help="Выходной формат (default: html)",
     )
@@ -36,9 +30,10 @@ def main():
     parser.add_argument(
         "-m",
         "--media",
-        choices=["embed", "copy"],
+        choices=["embed", "copy", "hybrid"],
         default="embed",
-        help="Режим медиа: embed (в файл) или copy (в папку media/)",
+        help="Режим медиа: embed (в файл), copy (в папку media/) или hybrid "
+        "(небольшие в файл, остальные в media/)",
     )
 
     # Шаблон
@@ -70,6 +65,12 @@ def main():
     )
     parser.add_argument("--no-mermaid", action="store_true", help="Отключить Mermaid")
 
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Собрать заново, даже если входы не изменились (при optimize.skip_unchanged)",
+    )
+
     # Тема
     parser.add_argument(
         "--theme",
@@ -77,8 +78,9 @@ def main():
         help="Тема подсветки кода (default: github-dark)",
     )
 
-    args = parser.parse_args()
 
+def build_config(args: argparse.Namespace) -> ConverterConfig:
+    """Конфиг из YAML с переопределениями из CLI."""
     # Загрузка базового конфига
     config_path = Path(args.config)
     if config_path.exists():
@@ -89,7 +91,6 @@ def main():
         print(f"⚠️ Конфиг {config_path} не найден, используем настройки по умолчанию\n")
 
     # Переопределение из CLI
-    config.input.path = args.input
     config.media_mode = args.media
     config.template = args.template
     config.formats = ["html", "epub"] if args.format == "both" else [args.format]
@@ -106,9 +107,89 @@ def main():
     config.features.toc = not args.no_toc
     config.features.breadcrumbs = not args.no_breadcrumbs
     config.features.mermaid = not args.no_mermaid
+    if args.force:
+        config.optimize.skip_unchanged = False
+    return config
+
+
+def batch_main(argv: list[str]):
+    """md-convert batch <glob|список|путь>... --jobs N"""
+    parser = argparse.ArgumentParser(
+        prog="md-convert batch",
+        description="Пакетная конвертация многих документов в пуле процессов",
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Glob шаблон (\"уроки/*.md\"), файл-список (.txt: путь на строку) "
+        "или путь к MD файлу/папке",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=0,
+        help="Число процессов (default: 0 = по числу CPU)",
+    )
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+
+    config = build_config(args)
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("❌ Не найдено ни одного документа", file=sys.stderr)
+        sys.exit(1)
+
+    report = Converter(config).convert_many(inputs, jobs=args.jobs)
+
+    print(f"\n{'=' * 60}")
+    print("📦 Пакетная конвертация")
+    print(f"{'=' * 60}")
+    print(report.summary())
+    print()
+    if report.failed:
+        sys.exit(1)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        prog="md-convert",
+        description="Конвертер Markdown в HTML/EPUB с профессиональным оформлением. "
+        "Пакетный режим: md-convert batch --help",
+    )
+
+    # Позиционные аргументы
+    parser.add_argument("input", help="Путь к MD файлу или папке")
+    parser.add_argument("-o", "--output", help="Имя выходного файла (без расширения)")
+    parser.add_argument(
+        "--check-reproducible",
+        action="store_true",
+        help="Собрать дважды во временные папки и сравнить результаты побайтово",
+    )
+    add_common_arguments(parser)
+
+    args = parser.parse_args()
+
+    config = build_config(args)
+    config.input.path = args.input
 
     # Конвертация
     converter = Converter(config)
+    if args.check_reproducible:
+        differences = converter.check_reproducible(args.input, args.output)
+        print(f"\n{'=' * 60}")
+        if differences:
+            print("❌ Сборка не воспроизводима:")
+            for difference in differences:
+                print(f"  • {difference}")
+            sys.exit(1)
+        print("✅ Сборка воспроизводима: результаты совпадают побайтово")
+        return
+
     try:
         results = converter.convert(args.input, args.output)
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Загрузка вендорных библиотек (highlight.js, Plyr) для optimize.vendor_assets.
+
+Скачивает закреплённые версии пакетов из реестра npm, проверяет архивы по
+integrity из реестра и раскладывает файлы в assets/vendor/ (для коммита в
+репозиторий) или в общий кеш (--cache), записывая SHA256SUMS. Сборка сама
+в сеть не ходит - только этот скрипт.
+
+    python fetch_vendor.py            # assets/vendor/ + SHA256SUMS
+    python fetch_vendor.py --cache    # ~/.cache/md-to-html/vendor
+    python fetch_vendor.py --check    # сверить файлы с SHA256SUMS
+"""
+
+import argparse
+import base64
+import fnmatch
+import hashlib
+import io
+import json
+import sys
+import tarfile
+import urllib.request
+from pathlib import Path
+
+try:
+    from md_converter.cache import get_cache_dir, write_atomic
+    from md_converter.processors.vendor import CHECKSUMS_NAME, VENDOR_PACKAGES, read_checksums
+except ImportError:
+    sys.path.insert(0, str(Path(__file__).parent))
+    from md_converter.cache import get_cache_dir, write_atomic
+    from md_converter.processors.vendor import CHECKSUMS_NAME, VENDOR_PACKAGES, read_checksums
+
+REGISTRY = "https://registry.npmjs.org"
+
+
+def download(url: str) -> bytes:
+    """Загрузка URL."""
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def fetch_package(name: str, version: str) -> tarfile.TarFile:
+    """
+    Архив пакета npm, проверенный по dist.integrity из реестра.
+
+    Raises:
+        ValueError: Хеш архива не совпал с реестром
+    """
+    meta = json.loads(download(f"{REGISTRY}/{name}/{version}"))
+    data = download(meta["dist"]["tarball"])
+
+    algorithm, _, expected = meta["dist"]["integrity"].partition("-")
+    actual = base64.b64encode(hashlib.new(algorithm, data).digest()).decode()
+    if actual != expected:
+        raise ValueError(f"{name}@{version}: {algorithm} архива не совпадает с реестром")
+    return tarfile.open(fileobj=io.BytesIO(data), mode="r:gz")
+
+
+def extract(archive: tarfile.TarFile, files: dict[str, str]) -> dict[str, bytes]:
+    """
+    Файлы пакета по схеме VENDOR_PACKAGES.
+
+    Returns:
+        Путь в папке вендорных файлов → содержимое
+    """
+    result = {}
+    members = [m for m in archive.getmembers() if m.isfile()]
+    for pattern, target in files.items():
+        matched = [m for m in members if fnmatch.fnmatchcase(m.name, pattern)]
+        if not matched:
+            raise ValueError(f"В архиве нет {pattern}")
+        for member in matched:
+            relative = target + Path(member.name).name if target.endswith("/") else target
+            result[relative] = archive.extractfile(member).read()
+    return result
+
+
+def write_vendor(base: Path, files: dict[str, bytes]):
+    """Файлы и SHA256SUMS (отсортированный - стабильный diff)."""
+    checksums = read_checksums(base)
+    for relative, data in files.items():
+        write_atomic(base / relative, data)
+        checksums[relative] = hashlib.sha256(data).hexdigest()
+    lines = [f"{digest}  {relative}\n" for relative, digest in sorted(checksums.items())]
+    write_atomic(base / CHECKSUMS_NAME, "".join(lines).encode("utf-8"))
+
+
+def check_vendor(base: Path) -> int:
+    """Сверка файлов с SHA256SUMS; число расхождений."""
+    checksums = read_checksums(base)
+    if not checksums:
+        print(f"❌ Нет {base / CHECKSUMS_NAME}", file=sys.stderr)
+        return 1
+    errors = 0
+    for relative, digest in sorted(checksums.items()):
+        path = base / relative
+        if not path.exists() or hashlib.sha256(path.read_bytes()).hexdigest() != digest:
+            print(f"  ❌ {relative}", file=sys.stderr)
+            errors += 1
+    print(f"🔍 Проверено файлов: {len(checksums)}, ошибок: {errors}", file=sys.stderr)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Сохранить в общий кеш, а не в assets/vendor/ репозитория",
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Только сверить файлы с SHA256SUMS"
+    )
+    args = parser.parse_args()
+
+    base = get_cache_dir("vendor") if args.cache else Path(__file__).parent / "assets" / "vendor"
+    if args.check:
+        sys.exit(1 if check_vendor(base) else 0)
+
+    files = {}
+    for (name, version), members in VENDOR_PACKAGES.items():
+        print(f"📥 {name}@{version}...", file=sys.stderr)
+        with fetch_package(name, version) as archive:
+            files.update(extract(archive, members))
+
+    write_vendor(base, files)
+    print(f"✅ {len(files)} файлов в {base}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
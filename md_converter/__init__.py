@@ -1,7 +1,8 @@
 """MD-to-HTML Converter - модульный конвертер Markdown в HTML/EPUB."""
 
+from .batch import BatchItem, BatchReport
 from .config import ConverterConfig
 from .converter import Converter
 
 __version__ = "2.0.0"
-__all__ = ["Converter", "ConverterConfig"]
+__all__ = ["BatchItem", "BatchReport", "Converter", "ConverterConfig"]
@@ -1,5 +1,6 @@
 """Backends для конвертации."""
 
+from .epub import EpubRepacker
 from .pandoc import PandocBackend
 
-__all__ = ["PandocBackend"]
+__all__ = ["EpubRepacker", "PandocBackend"]
@@ -0,0 +1,449 @@
+"""Инкрементальная упаковка EPUB: неизменённые главы из прошлой сборки."""
+
+import hashlib
+import json
+import re
+import struct
+import sys
+import zipfile
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from ..cache import write_atomic
+
+# Версия формата манифеста: меняется → прошлая сборка не используется
+_MANIFEST_VERSION = 1
+
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_ATX_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]|$)")
+_SETEXT_RE = re.compile(r"^ {0,3}(=+|-+)[ \t]*$")
+# Явный id в атрибутах: [текст]{#id}, ![](pic){#id}, ```{#id}, ::: {#id}
+_ID_RE = re.compile(r"(?:[\])`~]|^:{3,}[^{\n]*)\{[^}\n]*?(?<![\w-])#([A-Za-z][\w:.-]*)", re.M)
+_NOTE_RE = re.compile(r"\[\^|\^\[")
+
+_CHAPTER_RE = re.compile(r"^(?:EPUB/)?text/ch(\d+)\.xhtml$")
+_MEDIA_ENTRY_RE = re.compile(r"^((?:EPUB/)?media/)(file\d+(?:\.\w+)?)$")
+_MEDIA_REF_RE = re.compile(r"\bmedia/(file\d+(?:\.\w+)?)\b")
+_HASHED_REF_RE = re.compile(r"\bmedia/([0-9a-f]{16}(?:\.\w+)?)\b")
+_OPF_ITEM_RE = re.compile(r"<item\b[^>]*>")
+_TEXT_SUFFIXES = (".xhtml", ".html", ".opf", ".ncx")
+
+
+class EpubRepacker:
+    """
+    Пересборка EPUB только для изменённых глав.
+
+    Pandoc делит книгу на XHTML по заголовкам первого уровня
+    (text/ch001.xhtml, ...) и каждый раз заново собирает весь архив.
+    Здесь главы, Markdown которых не изменился, передаются Pandoc
+    заготовками (только заголовки и якоря: оглавление, ссылки между
+    главами и нумерация файлов прежние), а их XHTML копируется из
+    прошлого EPUB сжатыми байтами, без перепаковки. Медиа получают имена
+    по хешу содержимого (media/<sha1>.png вместо media/file0.png):
+    имена Pandoc зависят от порядка картинок во всей книге.
+
+    Манифест прошлой сборки - .<имя>.epubchapters.json рядом с EPUB.
+    Любое расхождение (другие заголовки, настройки, изменённый EPUB,
+    сноски) - полная сборка.
+    """
+
+    def __init__(self, output_file: Path, content: str, context: str):
+        """
+        Args:
+            output_file: Публикуемый EPUB (он же - прошлая сборка)
+            content: Markdown книги
+            context: Хеш всего, кроме текста глав, от чего зависит
+                XHTML (команда Pandoc, CSS, шрифты, версия Pandoc)
+        """
+        self.output_file = Path(output_file)
+        self.manifest_path = self.output_file.with_name(
+            f".{self.output_file.stem}.epubchapters.json"
+        )
+        self.context = context
+        self.chapters = split_chapters(content)
+        self.hashes = [_sha1(chapter.encode("utf-8")) for chapter in self.chapters]
+        self.stubs = [_stub(chapter) for chapter in self.chapters]
+        self.structure = _sha1("\0".join(self.stubs).encode("utf-8"))
+        self.reused: set[int] = set()
+
+    def stub_content(self) -> Optional[str]:
+        """
+        Markdown для Pandoc с заготовками вместо неизменённых глав.
+
+        Returns:
+            None - прошлую сборку использовать нельзя (полная сборка)
+        """
+        manifest = self._load_manifest()
+        if (
+            manifest.get("version") != _MANIFEST_VERSION
+            or manifest.get("context") != self.context
+            or manifest.get("structure") != self.structure
+            or manifest.get("chapters", []) == []
+            or len(manifest["chapters"]) != len(self.chapters)
+            or not self.output_file.exists()
+            or manifest.get("epub") != _file_sha1(self.output_file)
+        ):
+            return None
+
+        self.reused = {
+            index
+            for index, (old, new) in enumerate(zip(manifest["chapters"], self.hashes))
+            # Сноски нумеруются по всей книге - главы с ними собираются всегда
+            if old == new and self.stubs[index] and not _NOTE_RE.search(self.chapters[index])
+        }
+        if not self.reused:
+            return None
+        return "".join(
+            self.stubs[index] if index in self.reused else chapter
+            for index, chapter in enumerate(self.chapters)
+        )
+
+    def repack(self, built: Path, target: Path) -> Optional[Path]:
+        """
+        Итоговый EPUB: архив Pandoc + главы из прошлой сборки.
+
+        Args:
+            built: EPUB от Pandoc (из stub_content или полного Markdown)
+            target: Куда записать результат
+
+        Returns:
+            target; None - заготовки не совпали с прошлой сборкой
+            (нужна полная сборка)
+        """
+        with zipfile.ZipFile(built) as new, open(built, "rb") as new_fp:
+            chapters = _chapter_entries(new)
+            if len(chapters) != len(self.chapters):
+                if self.reused:
+                    return None
+                # Деление на главы не совпало с Pandoc: без манифеста
+                self.hashes = []
+            if not self.reused:
+                _write_package(new, new_fp, target)
+                return target
+
+            with zipfile.ZipFile(self.output_file) as old, open(self.output_file, "rb") as old_fp:
+                if not _same_entry(new, old, "EPUB/nav.xhtml"):
+                    return None
+                reused = {chapters[index] for index in self.reused}
+                if not reused <= set(old.namelist()):
+                    return None
+                _write_package(new, new_fp, target, old, old_fp, reused)
+
+        print(
+            f"♻️ EPUB: пересобрано глав {len(self.chapters) - len(self.reused)} "
+            f"из {len(self.chapters)}",
+            file=sys.stderr,
+        )
+        return target
+
+    def save(self):
+        """Манифест опубликованной сборки (после writer.move)."""
+        if not self.hashes:
+            self.manifest_path.unlink(missing_ok=True)
+            return
+        data = {
+            "version": _MANIFEST_VERSION,
+            "context": self.context,
+            "structure": self.structure,
+            "epub": _file_sha1(self.output_file),
+            "chapters": self.hashes,
+        }
+        write_atomic(self.manifest_path, json.dumps(data, indent=1).encode("utf-8"))
+
+    def _load_manifest(self) -> dict:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+
+def split_chapters(content: str) -> list[str]:
+    """
+    Главы в том виде, как их делит Pandoc (--split-level=1).
+
+    Граница - заголовок первого уровня (# или ===) вне блоков кода.
+    Текст до первого заголовка - отдельная глава, если он не пустой.
+    """
+    lines = content.splitlines(keepends=True)
+    starts = []
+    for index, line, kind in _scan(lines):
+        if kind != "text":
+            continue
+        heading = _ATX_RE.match(line)
+        if heading and len(heading.group(1)) == 1:
+            starts.append(index)
+        elif _setext_title(lines, index) and line.lstrip().startswith("="):
+            starts.append(index - 1)
+
+    bounds = [0, *starts, len(lines)]
+    chapters = ["".join(lines[a:b]) for a, b in zip(bounds, bounds[1:])]
+    if chapters and not chapters[0].strip():
+        chapters = chapters[1:]  # Pandoc не создаёт пустую первую главу
+    return chapters
+
+
+def _stub(chapter: str) -> str:
+    """
+    Заготовка главы: её заголовки и явные якоря {#id}.
+
+    Pandoc строит по ним то же оглавление, те же id заголовков и те же
+    ссылки между главами. "" - у главы нет заголовков (не заменяется).
+    """
+    lines = chapter.splitlines(keepends=True)
+    headings = []
+    anchors = []
+    scanned = list(_scan(lines))
+    underlined = {
+        index - 1 for index, _, kind in scanned if kind == "text" and _setext_title(lines, index)
+    }
+    for index, line, kind in scanned:
+        if kind == "code" or index in underlined:
+            continue
+        if kind == "text" and _ATX_RE.match(line):
+            headings.append(line.rstrip("\n") + "\n\n")
+        elif kind == "text" and index - 1 in underlined:
+            headings.append(lines[index - 1].rstrip("\n") + "\n" + line.rstrip("\n") + "\n\n")
+        else:
+            anchors.extend(f"[]{{#{anchor}}}" for anchor in _ID_RE.findall(line))
+    if not headings:
+        return ""
+    stub = headings[0]
+    if anchors:
+        stub += "".join(anchors) + "\n\n"
+    return stub + "".join(headings[1:])
+
+
+def _scan(lines: list[str]):
+    """(номер, строка, вид): "fence" - начало блока кода, "code" - внутри."""
+    fence = None
+    for index, line in enumerate(lines):
+        match = _FENCE_RE.match(line)
+        if fence:
+            closing = match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence)
+            if closing:
+                fence = None
+            yield index, line, "code"
+        elif match:
+            fence = match.group(1)
+            yield index, line, "fence"
+        else:
+            yield index, line, "text"
+
+
+def _setext_title(lines: list[str], index: int) -> bool:
+    """Строка index подчёркивает заголовок (=== или ---) из строки выше."""
+    return (
+        index > 0
+        and _SETEXT_RE.match(lines[index]) is not None
+        and lines[index - 1].strip() != ""
+        and not _ATX_RE.match(lines[index - 1])
+        and not _FENCE_RE.match(lines[index - 1])
+    )
+
+
+def _chapter_entries(archive: zipfile.ZipFile) -> list[str]:
+    """XHTML глав Pandoc в порядке номеров."""
+    numbered = []
+    for name in archive.namelist():
+        match = _CHAPTER_RE.match(name)
+        if match:
+            numbered.append((int(match.group(1)), name))
+    return [name for _, name in sorted(numbered)]
+
+
+def _same_entry(first: zipfile.ZipFile, second: zipfile.ZipFile, name: str) -> bool:
+    """Одинаковое содержимое записи (нет в обоих - тоже одинаковое)."""
+    try:
+        return first.read(name) == second.read(name)
+    except KeyError:
+        return name not in first.namelist() and name not in second.namelist()
+
+
+def _write_package(
+    new: zipfile.ZipFile,
+    new_fp: BinaryIO,
+    target: Path,
+    old: Optional[zipfile.ZipFile] = None,
+    old_fp: Optional[BinaryIO] = None,
+    reused: frozenset = frozenset(),
+):
+    """
+    Архив из записей Pandoc с медиа по хешу и главами reused из old.
+
+    Записи, содержимое которых не меняется, копируются сжатыми байтами.
+    """
+    # Медиа Pandoc: media/file<N>.ext → media/<sha1>.ext
+    renames = {}
+    for info in new.infolist():
+        match = _MEDIA_ENTRY_RE.match(info.filename)
+        if match:
+            suffix = Path(match.group(2)).suffix
+            renames[match.group(2)] = _sha1(new.read(info))[:16] + suffix
+
+    # Медиа прошлой сборки, на которые ссылаются взятые из неё главы
+    old_media = {}
+    if old is not None:
+        for name in reused:
+            text = old.read(name).decode("utf-8", "replace")
+            for media in _HASHED_REF_RE.findall(text):
+                old_media.setdefault(media, None)
+        opf_items = _opf_items(old)
+        for info in old.infolist():
+            match = re.match(r"^(?:EPUB/)?media/(.+)$", info.filename)
+            if match and match.group(1) in old_media:
+                old_media[match.group(1)] = (info, opf_items.get(match.group(1), ""))
+    new_media = set(renames.values())
+    extra = {m: v for m, v in old_media.items() if v is not None and m not in new_media}
+
+    def rename_refs(text: str) -> str:
+        return _MEDIA_REF_RE.sub(lambda m: "media/" + renames.get(m.group(1), m.group(1)), text)
+
+    written = set()
+    with open(target, "wb") as out:
+        writer = _ZipWriter(out)
+        for info in new.infolist():
+            name = info.filename
+            if name in reused:
+                previous = old.getinfo(name)
+                writer.write_raw(previous, name, _raw_data(old_fp, previous))
+                continue
+            match = _MEDIA_ENTRY_RE.match(name)
+            if match:
+                name = match.group(1) + renames[match.group(2)]
+                if name not in written:
+                    written.add(name)
+                    writer.write_raw(info, name, _raw_data(new_fp, info))
+                continue
+            if name.endswith(_TEXT_SUFFIXES):
+                text = new.read(info).decode("utf-8")
+                changed = rename_refs(text)
+                if name.endswith(".opf"):
+                    changed = _rewrite_opf(changed, renames, [item for _, item in extra.values()])
+                if changed != text:
+                    writer.write(info, name, changed.encode("utf-8"))
+                    continue
+            writer.write_raw(info, name, _raw_data(new_fp, info))
+
+        for media in sorted(extra):
+            info, _ = extra[media]
+            writer.write_raw(info, info.filename, _raw_data(old_fp, info))
+        writer.close()
+
+
+def _opf_items(archive: zipfile.ZipFile) -> dict[str, str]:
+    """{имя медиа: тег <item>} манифеста OPF."""
+    items = {}
+    for name in archive.namelist():
+        if name.endswith(".opf"):
+            for item in _OPF_ITEM_RE.findall(archive.read(name).decode("utf-8")):
+                href = re.search(r'href="media/([^"]+)"', item)
+                if href:
+                    items[href.group(1)] = item
+    return items
+
+
+def _rewrite_opf(text: str, renames: dict, extra_items: list[str]) -> str:
+    """Новые имена и id медиа в манифесте; медиа прошлой сборки - в конец."""
+    seen = set()
+
+    def item(match: re.Match) -> str:
+        tag = match.group()
+        href = re.search(r'href="media/([^"]+)"', tag)
+        if not href:
+            return tag
+        media = href.group(1)
+        if media in seen:
+            return ""  # Одинаковые файлы - одна запись
+        seen.add(media)
+        if not _HASHED_REF_RE.fullmatch("media/" + media):
+            return tag
+        return re.sub(r'\bid="[^"]*"', f'id="media-{Path(media).stem}"', tag)
+
+    text = _OPF_ITEM_RE.sub(item, text)
+    added = "".join(f"    {tag}\n" for tag in extra_items if tag)
+    return text.replace("</manifest>", added + "  </manifest>", 1) if added else text
+
+
+def _raw_data(fp: BinaryIO, info: zipfile.ZipInfo) -> bytes:
+    """Сжатые байты записи (без распаковки)."""
+    fp.seek(info.header_offset)
+    header = fp.read(30)
+    if header[:4] != b"PK\x03\x04":
+        raise zipfile.BadZipFile(f"Нет заголовка записи {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    fp.seek(info.header_offset + 30 + name_length + extra_length)
+    return fp.read(info.compress_size)
+
+
+class _ZipWriter:
+    """
+    Минимальная запись ZIP: готовые сжатые данные или deflate.
+
+    zipfile умеет только распаковать и сжать заново - здесь записи
+    переносятся как есть. ZIP64 не нужен (EPUB меньше 4 GB).
+    """
+
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.entries = []
+
+    def write(self, info: zipfile.ZipInfo, name: str, data: bytes):
+        """Запись с новым содержимым (сжатие как у исходной записи)."""
+        method = info.compress_type
+        raw = data
+        if method != zipfile.ZIP_STORED:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+            raw = compressor.compress(data) + compressor.flush()
+            method = zipfile.ZIP_DEFLATED
+        self._add(info, name, method, zlib.crc32(data), raw, len(data))
+
+    def write_raw(self, info: zipfile.ZipInfo, name: str, raw: bytes):
+        """Запись со сжатыми байтами из другого архива."""
+        self._add(info, name, info.compress_type, info.CRC, raw, info.file_size)
+
+    def _add(self, info, name, method, crc, raw, size):
+        encoded = name.encode("utf-8")
+        flags = 0 if name.isascii() else 0x800
+        year, month, day, hour, minute, second = info.date_time
+        dos_date = (year - 1980) << 9 | month << 5 | day
+        dos_time = hour << 11 | minute << 5 | second // 2
+        offset = self.fp.tell()
+        self.fp.write(
+            struct.pack(
+                "<4s5H3L2H", b"PK\x03\x04", 20, flags, method, dos_time, dos_date,
+                crc, len(raw), size, len(encoded), 0,
+            )
+        )
+        self.fp.write(encoded)
+        self.fp.write(raw)
+        self.entries.append(
+            (encoded, flags, method, dos_time, dos_date, crc, len(raw), size,
+             info.external_attr, offset)
+        )
+
+    def close(self):
+        start = self.fp.tell()
+        for encoded, flags, method, time, date, crc, csize, size, attr, offset in self.entries:
+            self.fp.write(
+                struct.pack(
+                    "<4s6H3L5H2L", b"PK\x01\x02", 20, 20, flags, method, time, date,
+                    crc, csize, size, len(encoded), 0, 0, 0, 0, attr, offset,
+                )
+            )
+            self.fp.write(encoded)
+        end = self.fp.tell()
+        count = len(self.entries)
+        self.fp.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, count, count, end - start, start, 0))
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
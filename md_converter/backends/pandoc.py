@@ -1,22 +1,40 @@
 """Pandoc backend для конвертации (перенесено из build_book.py)."""
 
+import hashlib
 import os
 import subprocess
 import sys
+import tempfile
+import uuid
 from pathlib import Path
 from typing import Optional
+from ..buildstamp import executable_id
 from ..config import ConverterConfig
+from ..postprocessors import run_postprocessors
+from ..processors.fonts import font_stylesheet
+from ..writer import OutputWriter
+from .epub import EpubRepacker
 
 
 class PandocBackend:
     """Backend для конвертации через Pandoc."""
 
-    def __init__(self, config: ConverterConfig):
+    def __init__(
+        self,
+        config: ConverterConfig,
+        stylesheet: bool = True,
+        writer: Optional[OutputWriter] = None,
+    ):
         """
         Args:
             config: Конфигурация конвертера
+            stylesheet: Подключать assets/css/book_style.css в HTML через --css
+                (False - стили уже в общем бандле app.<hash>.css; EPUB - всегда)
+            writer: Публикация результата (замена файла только при изменении)
         """
         self.config = config
+        self.stylesheet = stylesheet
+        self.writer = writer or OutputWriter()
 
     def convert(
         self,
@@ -25,6 +43,9 @@ class PandocBackend:
         format_type: str,
         header: str = "",
         media_map: Optional[dict] = None,
+        postprocessors: Optional[list] = None,
+        source_date_epoch: Optional[int] = None,
+        fonts: Optional[dict] = None,
     ) -> Path:
         """
         Конвертирует Markdown в HTML или EPUB через Pandoc.
@@ -35,6 +56,11 @@ class PandocBackend:
             format_type: "html" или "epub"
             header: HTML header для вставки
             media_map: Мапа медиа файлов (для режима copy)
+            postprocessors: Постпроцессоры HTML (поток до публикации)
+            source_date_epoch: Дата сборки для Pandoc (SOURCE_DATE_EPOCH):
+                дата и время файлов EPUB не зависят от момента сборки
+            fonts: Подмножества шрифтов {имя файла: путь} вместо полных
+                (EPUB и встроенный HTML)
 
         Returns:
             Путь к созданному файлу
@@ -43,13 +69,45 @@ class PandocBackend:
         output_dir = Path(self.config.output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Сохраняем временный MD файл
-        temp_md = output_dir / "_temp_merged.md"
+        # Временные файлы (MD, header, результат Pandoc) - в своей папке
+        # внутри output_dir: та же файловая система, публикация = rename.
+        # Параллельные сборки в одну папку не мешают друг другу.
+        with tempfile.TemporaryDirectory(
+            prefix=f".{output_name}.", dir=output_dir
+        ) as temp_dir:
+            return self._run(
+                content,
+                output_name,
+                format_type,
+                header,
+                output_dir,
+                Path(temp_dir),
+                postprocessors,
+                source_date_epoch,
+                fonts,
+            )
+
+    def _run(
+        self,
+        content: str,
+        output_name: str,
+        format_type: str,
+        header: str,
+        output_dir: Path,
+        temp_dir: Path,
+        postprocessors: Optional[list],
+        source_date_epoch: Optional[int],
+        fonts: Optional[dict] = None,
+    ) -> Path:
+        """Запуск Pandoc во временную папку и публикация результата."""
+        # Имя входа = имя результата: Pandoc берёт из него pagetitle
+        temp_md = temp_dir / f"{output_name}.md"
         temp_md.write_text(content, encoding="utf-8")
 
         # Формируем команду Pandoc
         output_ext = "epub" if format_type == "epub" else "html"
         output_file = output_dir / f"{output_name}.{output_ext}"
+        temp_output = temp_dir / output_file.name
 
         cmd = [
             "pandoc",
@@ -57,7 +115,7 @@ class PandocBackend:
             "markdown-yaml_metadata_block+fenced_divs",  # Добавляем fenced_divs для callouts
             str(temp_md),
             "-o",
-            str(output_file),
+            str(temp_output),
             "--standalone",
         ]
 
@@ -75,16 +133,26 @@ class PandocBackend:
         # CSS - используем абсолютный путь от корня проекта
         # Предполагаем, что скрипт запущен из корня проекта
         css_path = Path("assets/css/book_style.css").resolve()
-        if css_path.exists():
-            cmd.extend(["--css", str(css_path)])
-        else:
-            print(f"⚠️ CSS файл не найден: {css_path}", file=sys.stderr)
+        if self.stylesheet or format_type == "epub":
+            if not css_path.exists():
+                print(f"⚠️ CSS файл не найден: {css_path}", file=sys.stderr)
+            elif format_type == "html" and self.config.media_mode == "copy":
+                # assets/ скопирован рядом с HTML: относительная ссылка
+                # (абсолютный путь машины сборки попал бы в результат)
+                cmd.extend(["--css", "assets/css/book_style.css"])
+            elif format_type == "html" and fonts:
+                # Копия CSS со ссылками на подмножества: Pandoc встроит их
+                # вместо полных TTF
+                stylesheet = font_stylesheet(css_path, fonts, temp_dir / css_path.name)
+                cmd.extend(["--css", str(stylesheet)])
+            else:
+                cmd.extend(["--css", str(css_path)])
 
         # Формат-специфичные настройки
         if format_type == "html":
-            self._configure_html(cmd, header, output_dir)
+            self._configure_html(cmd, header, temp_dir)
         else:
-            self._configure_epub(cmd)
+            self._configure_epub(cmd, output_name, fonts or {})
 
         # Дополнительные аргументы
         cmd.extend(self.config.advanced.pandoc_extra_args)
@@ -98,9 +166,50 @@ class PandocBackend:
             env["MERMAID_FILTER_FORMAT"] = "svg"
             env["MERMAID_FILTER_THEME"] = self.config.styles.mermaid_theme
             env["MERMAID_FILTER_WIDTH"] = "1200"
+        if source_date_epoch is not None:
+            env["SOURCE_DATE_EPOCH"] = str(source_date_epoch)
+
+        incremental = None
+        if format_type == "epub" and self.config.optimize.incremental_epub:
+            incremental = EpubRepacker(output_file, content, self._epub_context(cmd, temp_dir))
+            stub = incremental.stub_content()
+            if stub is not None:
+                temp_md.write_text(stub, encoding="utf-8")
+
+        self._pandoc(cmd, env)
+
+        if incremental is not None:
+            repacked = temp_dir / f"repacked-{output_file.name}"
+            if incremental.repack(temp_output, repacked) is None:
+                # Заготовки не совпали с прошлой сборкой - полная сборка
+                print("♻️ EPUB: прошлая сборка не подходит, полная сборка", file=sys.stderr)
+                incremental.reused.clear()
+                temp_md.write_text(content, encoding="utf-8")
+                self._pandoc(cmd, env)
+                incremental.repack(temp_output, repacked)
+            temp_output = repacked
 
+        # Постобработка потоком: файл → файл блоками, без HTML в памяти
+        if postprocessors:
+            print("🔧 Постобработка HTML...", file=sys.stderr)
+            processed = temp_dir / f"processed-{output_file.name}"
+            run_postprocessors(temp_output, processed, postprocessors)
+            temp_output = processed
+
+        # Публикация: файл заменяется, только если байты изменились
+        changed = self.writer.move(temp_output, output_file)
+        if incremental is not None:
+            incremental.save()
+        if changed:
+            print(f"✅ Готово! Файл: {output_file}", file=sys.stderr)
+        else:
+            print(f"✅ Готово, без изменений: {output_file}", file=sys.stderr)
+        return output_file
+
+    def _pandoc(self, cmd: list, env: dict):
+        """Запуск Pandoc (RuntimeError с выводом Pandoc при ошибке)."""
         try:
-            result = subprocess.run(
+            subprocess.run(
                 cmd,
                 check=True,
                 capture_output=True,
@@ -109,9 +218,6 @@ class PandocBackend:
                 timeout=300,  # 5 минут максимум для Pandoc
                 stdin=subprocess.DEVNULL,  # Закрыть stdin чтобы не блокировать MCP stdio
             )
-            print(f"✅ Готово! Файл: {output_file}", file=sys.stderr)
-            return output_file
-
         except subprocess.TimeoutExpired:
             raise RuntimeError(
                 f"Pandoc превысил таймаут (5 минут). Возможно документ слишком большой или есть проблемы с медиа файлами."
@@ -131,25 +237,50 @@ class PandocBackend:
                 error_msg += "Нет вывода от Pandoc. Возможные причины: кириллица в пути, недоступные ресурсы в --embed-resources, или повреждённый входной файл."
             raise RuntimeError(error_msg) from e
 
-    def _configure_html(self, cmd: list, header: str, output_dir: Path):
+    def _epub_context(self, cmd: list, temp_dir: Path) -> str:
+        """
+        Хеш всего, от чего зависит XHTML глав EPUB, кроме их текста.
+
+        Команда Pandoc (без временных путей), файлы из неё (CSS, тема
+        подсветки, шрифты) по размеру и mtime, сам Pandoc. Дата сборки
+        не входит: от неё зависят только метаданные пакета.
+        """
+        parts = [executable_id("pandoc")]
+        for arg in cmd:
+            arg = arg.replace(str(temp_dir), "")
+            parts.append(arg)
+            path = Path(arg)
+            if path.is_file():
+                stat = path.stat()
+                parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _configure_html(self, cmd: list, header: str, temp_dir: Path):
         """Настройки для HTML."""
         # Отключаем встроенную подсветку (используем highlight.js)
         cmd.append("--syntax-highlighting=none")
 
-        # Встраиваем ресурсы
-        if self.config.media_mode == "embed":
+        # Встраиваем ресурсы (hybrid: кроме помеченных data-external)
+        if self.config.media_mode != "copy":
             cmd.append("--embed-resources")
 
         # Header с JS/CSS
         if header:
-            header_file = output_dir / "_header.html"
+            header_file = temp_dir / "header.html"
             header_file.write_text(header, encoding="utf-8")
             cmd.extend(["--include-in-header", str(header_file)])
 
         cmd.append("--to=html5")
 
-    def _configure_epub(self, cmd: list):
+    def _configure_epub(self, cmd: list, output_name: str, fonts: dict):
         """Настройки для EPUB."""
+        # Постоянный идентификатор книги: иначе Pandoc генерирует
+        # случайный UUID и каждая сборка EPUB отличается
+        extra_args = " ".join(self.config.advanced.pandoc_extra_args)
+        if "identifier" not in extra_args:
+            book_uuid = self._book_uuid(output_name)
+            cmd.extend(["--metadata", f"identifier=urn:uuid:{book_uuid}"])
+
         # Тема подсветки
         theme_file = self.config.styles.highlight_theme
         if Path(theme_file).exists():
@@ -162,8 +293,10 @@ class PandocBackend:
             fonts_dir = Path(self.config.fonts.dir)
             if fonts_dir.exists():
                 print(f"📎 Вшиваем шрифты из {fonts_dir}...", file=sys.stderr)
-                for font_file in fonts_dir.glob("*.ttf"):
-                    cmd.extend(["--epub-embed-font", str(font_file)])
+                for font_file in sorted(fonts_dir.glob("*.ttf")):
+                    # Подмножество с тем же именем: CSS ссылается по имени
+                    embedded = fonts.get(font_file.name, font_file)
+                    cmd.extend(["--epub-embed-font", str(embedded)])
                     print(f"  • {font_file.name}", file=sys.stderr)
 
         # Mermaid filter
@@ -176,3 +309,9 @@ class PandocBackend:
             print("🎨 Mermaid: format=svg, theme=neutral", file=sys.stderr)
 
         cmd.append("--to=epub3")
+
+    def _book_uuid(self, output_name: str) -> uuid.UUID:
+        """UUID книги из заголовка, автора и имени результата."""
+        metadata = self.config.metadata
+        key = "\n".join([metadata.title or output_name, metadata.author, output_name])
+        return uuid.uuid5(uuid.NAMESPACE_URL, key)
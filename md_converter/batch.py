@@ -0,0 +1,235 @@
+"""Пакетная конвертация: много документов в пуле процессов."""
+
+import glob
+import os
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Union
+
+from .config import ConverterConfig
+
+# Converter процесса-воркера: создаётся один раз в _init_worker и
+# обрабатывает все документы воркера (поиск mmdc, Pygments, кеши
+# header/CSS/изображений в памяти - один раз на процесс, а не на файл)
+_WORKER_CONVERTER = None
+
+
+@dataclass
+class BatchItem:
+    """Результат конвертации одного документа."""
+
+    input_path: Path
+    output_name: str
+    outputs: list[Path] = field(default_factory=list)
+    error: str = ""  # Текст ошибки ("" - успех)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class BatchReport:
+    """Итог пакетной конвертации (порядок элементов = порядок входов)."""
+
+    items: list[BatchItem] = field(default_factory=list)
+    seconds: float = 0.0  # Общее время (стена)
+
+    @property
+    def succeeded(self) -> list[BatchItem]:
+        return [item for item in self.items if item.ok]
+
+    @property
+    def failed(self) -> list[BatchItem]:
+        return [item for item in self.items if not item.ok]
+
+    def summary(self) -> str:
+        """Текстовая сводка для CLI."""
+        lines = []
+        for item in self.items:
+            mark = "✓" if item.ok else "✗"
+            lines.append(f"  {mark} {item.input_path} ({item.seconds:.1f} с)")
+            if not item.ok:
+                first_line = item.error.strip().splitlines()[0] if item.error.strip() else ""
+                lines.append(f"      {first_line[:200]}")
+        lines.append(
+            f"\nГотово: {len(self.succeeded)}, ошибок: {len(self.failed)}, "
+            f"всего {len(self.items)} за {self.seconds:.1f} с"
+        )
+        return "\n".join(lines)
+
+
+def expand_inputs(sources: Iterable[Union[str, Path]]) -> list[Path]:
+    """
+    Список документов из аргументов batch.
+
+    Каждый аргумент - glob шаблон (lessons/*.md, курсы/*/), файл-список
+    (.txt/.lst: путь на строку, # - комментарий; относительные пути -
+    от папки списка) или путь к MD файлу/папке. Повторы отбрасываются.
+
+    Returns:
+        Пути в порядке аргументов
+    """
+    result: list[Path] = []
+    seen = set()
+
+    def add(path: Path):
+        key = path.resolve()
+        if key not in seen:
+            seen.add(key)
+            result.append(path)
+
+    for source in sources:
+        source = str(source)
+        if glob.has_magic(source):
+            for match in sorted(glob.glob(source, recursive=True)):
+                path = Path(match)
+                if path.is_dir() or path.suffix.lower() == ".md":
+                    add(path)
+        elif Path(source).suffix.lower() in (".txt", ".lst"):
+            list_file = Path(source)
+            for line in list_file.read_text(encoding="utf-8").splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    path = Path(line)
+                    add(path if path.is_absolute() else list_file.parent / path)
+        else:
+            add(Path(source))
+    return result
+
+
+def output_names(inputs: list[Path]) -> list[str]:
+    """
+    Уникальные имена результатов.
+
+    Имя файла без расширения; при совпадении - путь относительно общей
+    папки совпадающих входов через "_" (курс1/x/урок.md, курс2/x/урок.md
+    → курс1_x_урок, курс2_x_урок). Если и так совпало (тот же файл
+    дважды, a_урок.md рядом с a/урок.md) - добавляется номер: урок_2.
+    Сравнение без учёта регистра (Windows, macOS).
+    """
+    groups: dict[str, list[int]] = {}
+    for index, path in enumerate(inputs):
+        groups.setdefault(path.stem.casefold(), []).append(index)
+
+    names = [path.stem for path in inputs]
+    for indexes in groups.values():
+        if len(indexes) < 2:
+            continue
+        paths = [inputs[i].resolve().with_suffix("") for i in indexes]
+        common = Path(os.path.commonpath([path.parent for path in paths]))
+        for i, path in zip(indexes, paths):
+            names[i] = "_".join(path.relative_to(common).parts)
+
+    result: list[str] = []
+    taken: set[str] = set()
+    for name in names:
+        unique, number = name, 1
+        while unique.casefold() in taken:
+            number += 1
+            unique = f"{name}_{number}"
+        taken.add(unique.casefold())
+        result.append(unique)
+    return result
+
+
+def convert_many(
+    config: ConverterConfig,
+    inputs: Iterable[Union[str, Path]],
+    jobs: int = 0,
+    converter=None,
+) -> BatchReport:
+    """
+    Конвертирует документы в пуле процессов.
+
+    Ошибка в одном документе не останавливает остальные: она попадает
+    в BatchReport. Дисковые кеши (изображения, вендорные ассеты,
+    подсветка) общие для всех воркеров.
+
+    Args:
+        config: Конфигурация (одна на все документы)
+        inputs: Пути к MD файлам/папкам
+        jobs: Процессов (0 = по числу CPU, 1 = в текущем процессе)
+        converter: Converter для jobs=1 (None - создаётся по config)
+
+    Returns:
+        Отчёт в порядке inputs
+    """
+    inputs = [Path(path) for path in inputs]
+    names = output_names(inputs)
+    if len({name.casefold() for name in names}) != len(names):
+        raise ValueError(f"Совпадающие имена результатов: {names}")
+    report = BatchReport(
+        items=[BatchItem(path, name) for path, name in zip(inputs, names)]
+    )
+    if not inputs:
+        return report
+
+    jobs = min(jobs or os.cpu_count() or 1, len(inputs))
+    start = time.perf_counter()
+    print(
+        f"📚 Пакетная конвертация: {len(inputs)} документов, процессов: {jobs}",
+        file=sys.stderr,
+    )
+
+    if jobs == 1:
+        if converter is None:
+            from .converter import Converter
+
+            converter = Converter(config)
+        for item in report.items:
+            _convert_item(converter, item)
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(config,)
+        ) as executor:
+            futures = {
+                executor.submit(_convert_in_worker, item): index
+                for index, item in enumerate(report.items)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                try:
+                    report.items[index] = future.result()
+                except Exception as e:
+                    # Воркер упал целиком (память, сигнал) - BrokenProcessPool
+                    report.items[index].error = f"{type(e).__name__}: {e}"
+                item = report.items[index]
+                mark = "✓" if item.ok else "✗"
+                print(
+                    f"  [{done}/{len(inputs)}] {mark} {item.input_path}",
+                    file=sys.stderr,
+                )
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def _init_worker(config: ConverterConfig):
+    """Инициализация воркера: один Converter на процесс."""
+    global _WORKER_CONVERTER
+    from .converter import Converter
+
+    _WORKER_CONVERTER = Converter(config)
+
+
+def _convert_in_worker(item: BatchItem) -> BatchItem:
+    """Конвертация одного документа в процессе-воркере."""
+    return _convert_item(_WORKER_CONVERTER, item)
+
+
+def _convert_item(converter, item: BatchItem) -> BatchItem:
+    """Конвертирует документ, ошибка → item.error."""
+    start = time.perf_counter()
+    try:
+        item.outputs = converter.convert(item.input_path, item.output_name)
+    except Exception as e:
+        item.error = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+    item.seconds = time.perf_counter() - start
+    return item
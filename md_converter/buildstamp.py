@@ -0,0 +1,304 @@
+"""Штамп сборки: пропуск конвертации, если ничего не изменилось."""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .cache import write_atomic
+from .config import ConverterConfig
+
+# Корень проекта (assets/ и исходники конвертера)
+_PROJECT_ROOT = Path(__file__).parent.parent
+_STAMP_VERSION = 2
+
+
+class FileLookups:
+    """
+    Поиск файлов, не оставивший следа в найденных медиа.
+
+    Ссылка на ещё не созданный pic.png или на файл, который позже появится
+    в папке с большим приоритетом (files_folder, attachments/ Obsidian),
+    меняет результат, хотя ни один записанный в штамп файл не изменился.
+    Поэтому запоминаются проверенные и отсутствовавшие пути и результаты
+    рекурсивного поиска по папкам. Потокобезопасен: главы формата site
+    обрабатываются параллельно.
+    """
+
+    def __init__(self):
+        self.missing: set[str] = set()  # Проверенные пути, которых не было
+        # (папка, шаблон) → найденные rglob файлы
+        self.listings: dict[tuple[str, str], list[str]] = {}
+        self._lock = threading.Lock()
+
+    def exists(self, path: Path) -> bool:
+        """path.exists() с записью отсутствующего пути."""
+        if path.exists():
+            return True
+        with self._lock:
+            self.missing.add(os.path.abspath(path))
+        return False
+
+    def rglob(self, folder: Path, pattern: str) -> list[Path]:
+        """Отсортированный folder.rglob(pattern) с записью результата."""
+        found = _rglob(folder, pattern)
+        with self._lock:
+            self.listings[(os.path.abspath(folder), pattern)] = [
+                os.path.abspath(p) for p in found
+            ]
+        return found
+
+    def update(self, other: "FileLookups"):
+        """Добавляет поиск другого процессора (главы, препроцессора)."""
+        with self._lock:
+            self.missing.update(other.missing)
+            self.listings.update(other.listings)
+
+
+
+class BuildStamp:
+    """
+    Штамп сборки рядом с результатом: <output_dir>/.<имя>.buildstamp.json.
+
+    Хранит хеши всех входов сборки - MD файлов, найденных медиа, ассетов
+    (CSS/JS/шрифты), исходников конвертера - а также хеш конфига, версии
+    инструментов (pandoc, mmdc, Pygments, Pillow, ffmpeg, fontTools),
+    список результатов и поиск медиа (FileLookups): появление файла по
+    ненайденной ссылке или в папке с большим приоритетом - пересборка.
+
+    Для каждого файла сохраняется (размер, mtime_ns, sha1): при проверке
+    файл с тем же размером и mtime не читается. Проверка неизменённой
+    сборки - только stat файлов, без чтения содержимого и без запуска
+    внешних программ.
+    """
+
+    def __init__(self, output_dir: Path, output_name: str):
+        """
+        Args:
+            output_dir: Папка результатов
+            output_name: Имя результата (без расширения)
+        """
+        self.path = Path(output_dir) / f".{output_name}.buildstamp.json"
+        self._data = self._load()
+
+    @property
+    def outputs(self) -> list[Path]:
+        """Результаты сборки из штампа."""
+        return [Path(p) for p in self._data.get("outputs", [])]
+
+    def check(self, config: ConverterConfig, input_files: list[Path]) -> Optional[str]:
+        """
+        Актуален ли результат.
+
+        Args:
+            config: Конфигурация текущей сборки
+            input_files: MD файлы текущей сборки
+
+        Returns:
+            None - сборка актуальна, иначе причина пересборки
+        """
+        data = self._data
+        if not data:
+            return "нет штампа сборки"
+        if data.get("version") != _STAMP_VERSION:
+            return "штамп сборки другой версии"
+        if data.get("config") != _config_hash(config):
+            return "изменился конфиг"
+
+        tools = _tool_versions(config)
+        for name, version in tools.items():
+            if data.get("tools", {}).get(name) != version:
+                return f"изменился инструмент: {name}"
+
+        recorded = data.get("inputs", [])
+        current = [str(path.resolve()) for path in input_files]
+        for path in current:
+            if path not in recorded:
+                return f"добавлен файл: {path}"
+        for path in recorded:
+            if path not in current:
+                return f"удалён файл: {path}"
+
+        for output in self.outputs:
+            if not output.exists():
+                return f"нет результата: {output}"
+
+        files = data.get("files", {})
+        for path in _asset_files():
+            if str(path) not in files:
+                return f"новый ассет: {path}"
+
+        for name, entry in files.items():
+            current_entry = _file_entry(Path(name), entry)
+            if current_entry is None:
+                return f"удалён: {name}"
+            if current_entry[2] != entry[2]:
+                return f"изменён: {name}"
+
+        for name in data.get("missing", []):
+            if os.path.exists(name):
+                return f"появился файл: {name}"
+        for folder, pattern, found in data.get("listings", []):
+            if [os.path.abspath(p) for p in _rglob(Path(folder), pattern)] != found:
+                return f"изменился поиск {pattern} в {folder}"
+        return None
+
+    def save(
+        self,
+        config: ConverterConfig,
+        input_files: list[Path],
+        media_files: Iterable[Path],
+        outputs: list[Path],
+        lookups: Optional[FileLookups] = None,
+    ):
+        """
+        Записывает штамп после успешной сборки.
+
+        Args:
+            config: Конфигурация сборки
+            input_files: MD файлы
+            media_files: Найденные медиа файлы (исходники)
+            outputs: Созданные файлы
+            lookups: Поиск медиа сборки (ненайденные ссылки, папки)
+        """
+        lookups = lookups or FileLookups()
+        previous = self._data.get("files", {})
+        files = {}
+        for path in [*input_files, *media_files, *_asset_files()]:
+            name = str(Path(path).resolve())
+            if name not in files:
+                entry = _file_entry(Path(name), previous.get(name))
+                if entry is not None:
+                    files[name] = entry
+
+        self._data = {
+            "version": _STAMP_VERSION,
+            "config": _config_hash(config),
+            "tools": _tool_versions(config),
+            "inputs": [str(path.resolve()) for path in input_files],
+            "outputs": [str(Path(path).resolve()) for path in outputs],
+            "files": files,
+            "missing": sorted(lookups.missing),
+            "listings": [
+                [folder, pattern, found]
+                for (folder, pattern), found in sorted(lookups.listings.items())
+            ],
+        }
+        write_atomic(
+            self.path, json.dumps(self._data, ensure_ascii=False, indent=1).encode("utf-8")
+        )
+
+    def _load(self) -> dict:
+        """Содержимое штампа ({} если нет или повреждён)."""
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+
+def _file_entry(path: Path, previous: Optional[list]) -> Optional[list]:
+    """
+    [размер, mtime_ns, sha1] файла (None если файла нет).
+
+    Если размер и mtime совпадают с previous, хеш берётся из него
+    без чтения файла. touch без изменений даёт тот же хеш: сборка
+    остаётся актуальной.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime_ns:
+        return previous
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+
+def _rglob(folder: Path, pattern: str) -> list[Path]:
+    """Файлы folder.rglob(pattern) в стабильном порядке (порядок ФС не определён)."""
+    if not folder.is_dir():
+        return []
+    return sorted(path for path in folder.rglob(pattern) if path.is_file())
+
+
+def _config_hash(config: ConverterConfig) -> str:
+    """Хеш всех настроек."""
+    text = json.dumps(asdict(config), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _tool_versions(config: ConverterConfig) -> dict[str, str]:
+    """
+    Версии внешних инструментов, влияющих на результат.
+
+    pandoc и mmdc не запускаются (--version стоит десятки мс): версию
+    заменяет путь, размер и mtime исполняемого файла.
+    """
+    from . import __version__
+
+    tools = {"md_converter": __version__, "pandoc": executable_id("pandoc")}
+    if config.features.mermaid:
+        tools["mmdc"] = executable_id("mmdc")
+    if config.styles.highlight_mode == "build":
+        tools["pygments"] = _module_version("pygments")
+    if config.images.optimize or config.images.srcset_widths:
+        tools["pillow"] = _module_version("PIL")
+    if config.video.optimize and config.video.poster:
+        tools["ffmpeg"] = executable_id("ffmpeg")
+    if config.fonts.subset:
+        tools["fonttools"] = _module_version("fontTools")
+        tools["brotli"] = _module_version("brotli")
+    return tools
+
+
+def executable_id(name: str) -> str:
+    """
+    путь:размер:mtime исполняемого файла ("" если не найден).
+
+    Дешёвая замена --version: версия инструмента в штампе сборки и в
+    ключах кешей (PandocBackend).
+    """
+    path = shutil.which(name)
+    if not path:
+        return ""
+    try:
+        stat = Path(path).resolve().stat()
+    except OSError:
+        return path
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _module_version(name: str) -> str:
+    """__version__ уже импортированного или импортируемого модуля."""
+    module = sys.modules.get(name)
+    if module is None:
+        try:
+            module = __import__(name)
+        except ImportError:
+            return ""
+    return str(getattr(module, "__version__", ""))
+
+
+def _asset_files() -> list[Path]:
+    """Ассеты и исходники конвертера: их изменение меняет результат."""
+    files = []
+    for folder, pattern in (
+        (_PROJECT_ROOT / "assets", "*"),
+        (_PROJECT_ROOT / "md_converter", "*.py"),
+    ):
+        if folder.exists():
+            files.extend(
+                path
+                for path in folder.rglob(pattern)
+                if path.is_file() and "__pycache__" not in path.parts
+            )
+    return sorted(path.resolve() for path in files)
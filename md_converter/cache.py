@@ -0,0 +1,72 @@
+"""Общие дисковые кеши конвертера (вендорные ассеты, рендеры, изображения)."""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import Union
+
+# umask процесса: os.umask() только меняет и возвращает прежний - читаем
+# один раз при импорте (однопоточно), а не из потоков записи
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def get_cache_dir(*parts: str) -> Path:
+    """
+    Папка кеша (создаётся при необходимости).
+
+    База: переменная окружения MD_CONVERTER_CACHE_DIR, иначе
+    %LOCALAPPDATA%/md-to-html/cache на Windows и ~/.cache/md-to-html
+    на остальных системах. Кеш общий для всех процессов и сборок.
+
+    Args:
+        *parts: Подпапки внутри кеша ("vendor", "images", ...)
+
+    Returns:
+        Путь к папке
+    """
+    base = os.environ.get("MD_CONVERTER_CACHE_DIR")
+    if not base:
+        if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+            base = os.path.join(os.environ["LOCALAPPDATA"], "md-to-html", "cache")
+        else:
+            base = os.path.join(os.path.expanduser("~"), ".cache", "md-to-html")
+
+    path = Path(base).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def new_file_mode() -> int:
+    """Права нового файла, как у open(): 0o666 без битов umask."""
+    return 0o666 & ~_UMASK
+
+
+def write_atomic(path: Union[str, Path], data: bytes):
+    """
+    Атомарная запись: временный файл в той же папке + rename.
+
+    Параллельные процессы (batch сборка) никогда не увидят
+    недописанный файл кеша. Права - как у заменяемого файла, у нового -
+    как у обычного open() (0o666 с umask): mkstemp создаёт файл 0600, и
+    веб-сервер под другим пользователем не смог бы прочитать результат.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except OSError:
+        mode = new_file_mode()
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
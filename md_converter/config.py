@@ -2,8 +2,7 @@
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Literal, Union
-import yaml
+from typing import Literal, Optional, Union
 
 
 @dataclass
@@ -30,10 +29,12 @@ class StylesConfig:
     """Настройки стилей."""
 
     highlight_theme: str = "github-dark"
+    highlight_mode: str = "client"  # client (highlight.js) | build (Pygments)
     mermaid_theme: str = "forest"  # forest, dark, default, neutral, base
     mermaid_scale: int = 3  # Масштаб рендера для HiDPI/Retina (2, 3, 4)
-    mermaid_format: str = "webp"  # Формат вывода диаграмм
+    mermaid_format: str = "webp"  # webp (растр) | svg (встроенный векторный)
     mermaid_quality: int = 85  # Качество сжатия WebP (1-100)
+    mermaid_encoder: str = "lossy"  # lossy (WebP с quality) | palette (без потерь)
     mermaid_background: str = "white"  # Цвет фона: "transparent", "white", "#RRGGBB"
 
 
@@ -43,6 +44,9 @@ class FontsConfig:
 
     embed: bool = True
     dir: str = "assets/fonts"
+    # Подмножества шрифтов (только символы документа) для EPUB и
+    # встроенного HTML; требует fontTools (WOFF2 - ещё brotli)
+    subset: bool = False
 
 
 @dataclass
@@ -58,6 +62,76 @@ class FeaturesConfig:
     callouts: bool = True
     mermaid: bool = True
     plyr: bool = True
+    lazy_hydration: bool = False  # Инициализация JS функций у viewport
+
+
+@dataclass
+class OptimizeConfig:
+    """Оптимизация размера результата и скорости сборки."""
+
+    css_prune: bool = False  # Только CSS правила функций, найденных в документе
+    css_minify: bool = False  # Минификация встроенного CSS
+    vendor_assets: bool = False  # highlight.js/Plyr из локального кеша, а не CDN
+    shared_assets: bool = False  # Общий app.<hash>.css/js вместо копии assets/ (copy)
+    skip_unchanged: bool = False  # Пропуск сборки по штампу, если входы не изменились
+    dedupe_media: bool = False  # Одна копия повторяющихся встроенных медиа (embed)
+    defer_media: bool = False  # Встроенные медиа в конце файла, загрузка у экрана (embed)
+    incremental_epub: bool = False  # EPUB: Pandoc только для изменённых глав
+
+
+@dataclass
+class ImagesConfig:
+    """Оптимизация растровых изображений (PNG/JPEG/WebP)."""
+
+    optimize: bool = False  # Уменьшение и перекодирование перед встраиванием/копированием
+    max_width: int = 1600  # Максимальная ширина в пикселях (0 = без ограничения)
+    format: str = "webp"  # webp | avif | keep (исходный формат)
+    quality: int = 80  # Качество сжатия (1-100)
+    strip_metadata: bool = True  # Удалять EXIF/ICC
+    workers: int = 0  # Потоков обработки (0 = по числу CPU)
+    # Ширины уменьшенных копий для srcset (только media_mode: copy), [] = выкл.
+    srcset_widths: list[int] = field(default_factory=list)
+    sizes: str = "(max-width: 800px) 100vw, 800px"  # Ширина картинки в вёрстке
+    # width/height из заголовка файла, loading="lazy", decoding="async"
+    dimensions: bool = True
+
+
+@dataclass
+class VideoConfig:
+    """Подготовка копируемых видео (media_mode: copy/hybrid, формат site)."""
+
+    optimize: bool = False  # MP4 faststart (moov в начало) и постер
+    poster: bool = True  # Кадр-постер через ffmpeg (если установлен), preload="none"
+    poster_time: float = 1.0  # Секунда кадра для постера
+    poster_width: int = 1280  # Максимальная ширина постера (px)
+    workers: int = 0  # Потоков обработки (0 = по числу CPU)
+
+
+@dataclass
+class HybridConfig:
+    """media_mode: hybrid - небольшие медиа встраиваются, остальные копируются."""
+
+    embed_max_kb: int = 512  # Встраиваются файлы не больше (KB, после оптимизации)
+    # Встраиваемые типы: image | audio | video и/или расширения (".svg")
+    embed_types: list[str] = field(default_factory=lambda: ["image"])
+
+
+@dataclass
+class SiteConfig:
+    """Формат site: страница на главу с общими ассетами."""
+
+    workers: int = 0  # Глав собирается параллельно (0 = по числу CPU)
+
+
+@dataclass
+class PublishConfig:
+    """Подготовка HTML к публикации на статическом хостинге."""
+
+    minify_html: bool = False  # Пробелы, комментарии, лишние атрибуты (вне pre/code)
+    precompress: bool = False  # Сжатые копии .gz/.br рядом с HTML и ассетами
+    gzip: bool = True  # .gz (уровень 9)
+    brotli: bool = True  # .br (quality 11), если установлен brotli
+    workers: int = 0  # Потоков сжатия (0 = по числу CPU)
 
 
 @dataclass
@@ -67,6 +141,12 @@ class AdvancedConfig:
     pandoc_extra_args: list[str] = field(default_factory=list)
     custom_css: list[str] = field(default_factory=list)
     custom_js: list[str] = field(default_factory=list)
+    # Дата сборки (Unix time, SOURCE_DATE_EPOCH) для EPUB: None -
+    # $SOURCE_DATE_EPOCH, иначе время сборки (Pandoc)
+    source_date_epoch: Optional[int] = None
+    # Воспроизводимый EPUB без заданной даты: постоянная 1980-01-01
+    # вместо времени сборки (дата книги и файлов архива)
+    reproducible: bool = False
 
 
 @dataclass
@@ -75,7 +155,7 @@ class ConverterConfig:
 
     output_dir: str = "./build"
     template: Literal["book", "web"] = "book"
-    media_mode: Literal["embed", "copy"] = "embed"
+    media_mode: Literal["embed", "copy", "hybrid"] = "embed"
     formats: list[str] = field(default_factory=lambda: ["html"])
 
     input: InputConfig = field(default_factory=InputConfig)
@@ -83,11 +163,19 @@ class ConverterConfig:
     styles: StylesConfig = field(default_factory=StylesConfig)
     fonts: FontsConfig = field(default_factory=FontsConfig)
     features: FeaturesConfig = field(default_factory=FeaturesConfig)
+    optimize: OptimizeConfig = field(default_factory=OptimizeConfig)
+    images: ImagesConfig = field(default_factory=ImagesConfig)
+    video: VideoConfig = field(default_factory=VideoConfig)
+    hybrid: HybridConfig = field(default_factory=HybridConfig)
+    site: SiteConfig = field(default_factory=SiteConfig)
+    publish: PublishConfig = field(default_factory=PublishConfig)
     advanced: AdvancedConfig = field(default_factory=AdvancedConfig)
 
     @classmethod
     def from_yaml(cls, path: Union[str, Path]) -> "ConverterConfig":
         """Загрузка конфигурации из YAML файла."""
+        import yaml  # Ленивый импорт: для from_dict не нужен
+
         with open(path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
         return cls.from_dict(data)
@@ -105,6 +193,12 @@ class ConverterConfig:
             styles=StylesConfig(**data.get("styles", {})),
             fonts=FontsConfig(**data.get("fonts", {})),
             features=FeaturesConfig(**data.get("features", {})),
+            optimize=OptimizeConfig(**data.get("optimize", {})),
+            images=ImagesConfig(**data.get("images", {})),
+            video=VideoConfig(**data.get("video", {})),
+            hybrid=HybridConfig(**data.get("hybrid", {})),
+            site=SiteConfig(**data.get("site", {})),
+            publish=PublishConfig(**data.get("publish", {})),
             advanced=AdvancedConfig(**data.get("advanced", {})),
         )
 
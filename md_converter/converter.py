@@ -1,18 +1,46 @@
 """Главный класс конвертера - оркестратор pipeline."""
 
+import os
 import sys
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
+from .batch import BatchReport, convert_many
 from .config import ConverterConfig
 from .preprocessors import (
     ObsidianPreprocessor,
     CalloutsPreprocessor,
     MermaidPreprocessor,
     DiffPreprocessor,
+    prune_diagrams,
+)
+from .processors import (
+    DocumentFeatures,
+    FontSubsetter,
+    ImageOptimizer,
+    MediaProcessor,
+    MergerProcessor,
+    TemplateProcessor,
+    VideoOptimizer,
 )
-from .processors import MediaProcessor, MergerProcessor, TemplateProcessor
 from .backends import PandocBackend
-from .postprocessors import PlyrWrapPostprocessor
+from .buildstamp import BuildStamp, FileLookups
+from .precompress import Precompressor
+from .reproducible import check_reproducible
+from .site import SiteBuilder
+from .writer import OutputWriter
+from .postprocessors import (
+    HighlightPostprocessor,
+    HtmlMinifyPostprocessor,
+    OutlinePostprocessor,
+    PayloadDedupPostprocessor,
+    PayloadDeferPostprocessor,
+    PlyrWrapPostprocessor,
+    pygments_available,
+)
+
+# Дата сборки EPUB в advanced.reproducible без заданной даты:
+# 1980-01-01 UTC (минимальная дата ZIP)
+DEFAULT_SOURCE_DATE_EPOCH = 315532800
 
 
 class Converter:
@@ -40,11 +68,32 @@ class Converter:
 
         # Mermaid и Diff добавятся для каждого формата отдельно
 
+        # Запись результатов: файл заменяется, только если байты изменились
+        self.writer = OutputWriter()
+
         # Процессоры
+        self.image_optimizer = self._create_image_optimizer()
+        self.video_optimizer = (
+            VideoOptimizer(self.config.video) if self.config.video.optimize else None
+        )
         self.media_processor = MediaProcessor(
             mode=self.config.media_mode,
             files_folder=self.config.input.files_folder,
             output_dir=self.config.output_dir,
+            image_optimizer=self.image_optimizer,
+            # Общий бандл пишет TemplateProcessor.write_bundle
+            copy_assets=not self._shared_assets(),
+            writer=self.writer,
+            hybrid=self.config.hybrid,
+            video_optimizer=self.video_optimizer,
+            image_dimensions=self.config.images.dimensions,
+        )
+        # Поиск медиа последней сборки: ненайденные ссылки, папки (штамп сборки)
+        self.lookups = FileLookups()
+        # Хеши диаграмм Mermaid в media/ последней сборки (prune_diagrams)
+        self.diagrams: set[str] = set()
+        self.font_subsetter = (
+            FontSubsetter(self.config.fonts.dir) if self.config.fonts.subset else None
         )
         self.merger = MergerProcessor()
         self.template_processor = TemplateProcessor(
@@ -52,15 +101,61 @@ class Converter:
             features=self.config.features,
             styles=self.config.styles,
             media_mode=self.config.media_mode,  # Передаём режим медиа
+            optimize=self.config.optimize,
         )
 
         # Backend
-        self.backend = PandocBackend(self.config)
+        # book_style.css в общем бандле - отдельный --css не нужен
+        self.backend = PandocBackend(
+            self.config, stylesheet=not self._shared_assets(), writer=self.writer
+        )
+
+        if self.config.optimize.shared_assets and self.config.media_mode != "copy":
+            # Pandoc --embed-resources всё равно встроил бы бандл в каждую страницу
+            print(
+                "⚠️ optimize.shared_assets работает только с media_mode: copy",
+                file=sys.stderr,
+            )
 
         # Постпроцессоры
         self.postprocessors = []
+        # Первым: следующие обработчики получают теги уже без больших payload.
+        # Отложенные payload и так хранятся по одному на одинаковые данные
+        if self.config.media_mode != "copy":
+            if self.config.optimize.defer_media:
+                self.postprocessors.append(PayloadDeferPostprocessor())
+            elif self.config.optimize.dedupe_media:
+                self.postprocessors.append(PayloadDedupPostprocessor())
         if self.config.features.plyr:
             self.postprocessors.append(PlyrWrapPostprocessor())
+        if self.config.styles.highlight_mode == "build":
+            if pygments_available():
+                self.postprocessors.append(HighlightPostprocessor())
+            else:
+                print(
+                    "⚠️ Pygments не установлен: подсветка кода в браузере "
+                    "(pip install pygments)",
+                    file=sys.stderr,
+                )
+        if self.config.features.breadcrumbs:
+            self.postprocessors.append(OutlinePostprocessor())
+        # Последним: остальные обработчики видят разметку Pandoc как есть
+        if self.config.publish.minify_html:
+            self.postprocessors.append(HtmlMinifyPostprocessor())
+
+    def _shared_assets(self) -> bool:
+        """Общий app.<hash>.css/js вместо inline header (только copy)."""
+        return self.config.optimize.shared_assets and self.config.media_mode == "copy"
+
+    def _create_image_optimizer(self):
+        """ImageOptimizer, если включена оптимизация или srcset (copy и site)."""
+        images = self.config.images
+        srcset = bool(images.srcset_widths) and (
+            self.config.media_mode == "copy" or "site" in self.config.formats
+        )
+        if images.optimize or srcset:
+            return ImageOptimizer(images)
+        return None
 
     def convert(
         self, input_path: Union[str, Path], output_name: Optional[str] = None
@@ -77,12 +172,72 @@ class Converter:
         """
         input_path = Path(input_path)
         output_name = output_name or input_path.stem
-        results = []
 
         print(f"\n{'=' * 60}", file=sys.stderr)
         print(f"📚 MD-to-HTML Converter v2.0", file=sys.stderr)
         print(f"{'=' * 60}\n", file=sys.stderr)
 
+        # Штамп сборки: неизменённый вход - без merge, Mermaid и Pandoc
+        stamp = None
+        if self.config.optimize.skip_unchanged:
+            input_files = self.merger.list_inputs(input_path)
+            stamp = BuildStamp(Path(self.config.output_dir), output_name)
+            reason = stamp.check(self.config, input_files)
+            if reason is None:
+                print("✅ Результат актуален, сборка пропущена", file=sys.stderr)
+                return stamp.outputs
+            print(f"🔄 Сборка: {reason}\n", file=sys.stderr)
+
+        results, media_sources = self._build(input_path, output_name)
+
+        if stamp is not None:
+            stamp.save(self.config, input_files, media_sources, results, self.lookups)
+        return results
+
+    def _build(self, input_path: Path, output_name: str) -> tuple[list[Path], list[Path]]:
+        """
+        Конвертация без проверки штампа.
+
+        Returns:
+            (созданные файлы, найденные исходные файлы медиа)
+        """
+        self.writer.reset()
+        self.lookups = FileLookups()
+        self.diagrams = set()
+        results, media_sources = self._build_formats(input_path, output_name)
+        if "html" in self.config.formats:
+            # Старые diagram-* этого документа (изменённые/удалённые диаграммы)
+            prune_diagrams(Path(self.config.output_dir), output_name, self.diagrams)
+        if self.config.publish.precompress:
+            Precompressor(self.config.publish, self.writer).compress(
+                Path(self.config.output_dir), results
+            )
+        self.writer.print_report()
+        return results, media_sources
+
+    def _build_formats(
+        self, input_path: Path, output_name: str
+    ) -> tuple[list[Path], list[Path]]:
+        """Сборка всех форматов (см. _build)."""
+        results = []
+        media_sources = []
+
+        # Формат site: главы собираются отдельно (SiteBuilder)
+        if "site" in self.config.formats:
+            builder = SiteBuilder(
+                self.config,
+                self.postprocessors,
+                self.image_optimizer,
+                self.writer,
+                video_optimizer=self.video_optimizer,
+            )
+            results.extend(builder.build(input_path, output_name))
+            media_sources.extend(builder.media_sources)
+            self.lookups.update(builder.lookups)
+        formats = [fmt for fmt in self.config.formats if fmt != "site"]
+        if not formats:
+            return results, media_sources
+
         # ИСПРАВЛЕНИЕ БАГ #12: Правильный base_path (папка с MD файлом)
         # Для файла: его parent, для папки: сама папка
         base_path = input_path.parent if input_path.is_file() else input_path
@@ -97,6 +252,7 @@ class Converter:
         if self.config.input.source_type == "obsidian":
             print("🔄 Obsidian → Markdown...", file=sys.stderr)
             content = self.obsidian_preprocessor.process(content)
+            self.lookups.update(self.obsidian_preprocessor.lookups)
             print("  ✓ Синтаксис преобразован\n", file=sys.stderr)
 
         # 1.7. Mermaid препроцессинг (ДО MediaProcessor!)
@@ -104,18 +260,23 @@ class Converter:
         # затем MediaProcessor обработает их как обычные изображения
         if self.config.features.mermaid:
             print("📊 Mermaid → WebP...", file=sys.stderr)
-            mermaid_pp = MermaidPreprocessor(self.config, format_type="html")
+            mermaid_pp = MermaidPreprocessor(
+                self.config, format_type="html", writer=self.writer
+            )
             content = mermaid_pp.process(content)
+            self.diagrams.update(mermaid_pp.diagrams)
             print("  ✓ Диаграммы конвертированы\n", file=sys.stderr)
 
         # 2. Обработка медиа
         print("📎 Этап 2: Обработка медиа...", file=sys.stderr)
         # Передаём реальный input_path, чтобы относительные пути к медиа разрешались корректно
         content, media_map = self.media_processor.process(content, input_path)
+        media_sources.extend(self.media_processor.sources)
+        self.lookups.update(self.media_processor.lookups)
         print(f"  ✓ Обработано {len(media_map)} медиа файлов\n", file=sys.stderr)
 
         # 3. Конвертация для каждого формата
-        for fmt in self.config.formats:
+        for fmt in formats:
             print(f"{'=' * 60}", file=sys.stderr)
             print(f"📝 Формат: {fmt.upper()}", file=sys.stderr)
             print(f"{'=' * 60}\n", file=sys.stderr)
@@ -137,10 +298,18 @@ class Converter:
 
             # Подготовка header
             print("🎨 Этап 4: Генерация шаблона...", file=sys.stderr)
-            header = self.template_processor.build_header(fmt)
+            # Функции документа - для отбора CSS (optimize.css_prune)
+            document = DocumentFeatures.detect(processed_content)
+            if fmt == "html" and self._shared_assets():
+                header = self.template_processor.write_bundle(
+                    Path(self.config.output_dir), document
+                )
+            else:
+                header = self.template_processor.build_header(fmt, document)
             print("  ✓ Шаблон готов\n", file=sys.stderr)
 
-            # Конвертация через Pandoc
+            # Конвертация через Pandoc (постобработка HTML - до публикации:
+            # файл результата пишется один раз и только при изменении)
             print("🔄 Этап 5: Pandoc конвертация...", file=sys.stderr)
             output_path = self.backend.convert(
                 content=processed_content,
@@ -148,18 +317,81 @@ class Converter:
                 format_type=fmt,
                 header=header,
                 media_map=media_map,
+                postprocessors=self.postprocessors if fmt == "html" else None,
+                source_date_epoch=self._source_date_epoch(),
+                fonts=self._subset_fonts(fmt, processed_content + header),
             )
             print(file=sys.stderr)
 
-            # Постобработка (только HTML)
-            if fmt == "html" and self.postprocessors:
-                print("🔧 Этап 6: Постобработка HTML...", file=sys.stderr)
-                html = output_path.read_text(encoding="utf-8")
-                for postprocessor in self.postprocessors:
-                    html = postprocessor.process(html)
-                output_path.write_text(html, encoding="utf-8")
-                print("  ✓ Постобработка завершена\n", file=sys.stderr)
-
             results.append(output_path)
 
-        return results
+        return results, media_sources
+
+    def _subset_fonts(self, fmt: str, text: str) -> Optional[dict]:
+        """
+        Подмножества шрифтов для формата (fonts.subset).
+
+        EPUB - TTF с прежними именами, встроенный HTML - WOFF2. В режиме
+        copy шрифты общие для всех страниц и кешируются браузером -
+        остаются полными.
+        """
+        if self.font_subsetter is None:
+            return None
+        if fmt == "epub" and self.config.fonts.embed:
+            flavor = None
+        elif fmt == "html" and self.config.media_mode != "copy":
+            flavor = "woff2"
+        else:
+            return None
+        metadata = self.config.metadata
+        return self.font_subsetter.subset_fonts(
+            "\n".join([text, metadata.title, metadata.author]), flavor=flavor
+        )
+
+    def _source_date_epoch(self) -> Optional[int]:
+        """
+        Дата сборки для Pandoc: advanced.source_date_epoch,
+        $SOURCE_DATE_EPOCH, в advanced.reproducible - постоянная 1980-01-01.
+
+        None - Pandoc берёт время сборки (дата книги - как обычно). Не
+        mtime файлов: у свежего клона это время checkout, одинаковые
+        входы давали бы разную дату на разных машинах.
+        """
+        if self.config.advanced.source_date_epoch is not None:
+            return self.config.advanced.source_date_epoch
+        env_value = os.environ.get("SOURCE_DATE_EPOCH", "")
+        if env_value.isdigit():
+            return int(env_value)
+        if self.config.advanced.reproducible:
+            return DEFAULT_SOURCE_DATE_EPOCH
+        return None
+
+    def convert_many(
+        self, inputs: Iterable[Union[str, Path]], jobs: int = 0
+    ) -> BatchReport:
+        """
+        Пакетная конвертация: много документов/папок в пуле процессов.
+
+        Каждый воркер создаёт один Converter и переиспользует его для всех
+        своих документов. Ошибка в документе не прерывает остальные.
+
+        Args:
+            inputs: Пути к MD файлам или папкам
+            jobs: Процессов (0 = по числу CPU, 1 = в текущем процессе)
+
+        Returns:
+            BatchReport с результатом по каждому документу
+        """
+        return convert_many(self.config, inputs, jobs, converter=self)
+
+    def check_reproducible(
+        self, input_path: Union[str, Path], output_name: Optional[str] = None
+    ) -> list[str]:
+        """
+        Проверка воспроизводимости: две полные сборки во временные папки
+        и побайтовое сравнение результатов.
+
+        Returns:
+            Список различий ([] - сборка воспроизводима)
+        """
+        return check_reproducible(self.config, input_path, output_name)
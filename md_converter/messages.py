@@ -0,0 +1,26 @@
+"""Сообщения сборки в stderr."""
+
+import sys
+import threading
+
+_warned_lock = threading.Lock()
+_warned: set[str] = set()
+
+
+def warn_once(key: str, message: str):
+    """
+    Предупреждение один раз на процесс (потоки печатают одновременно).
+
+    Для необязательных зависимостей и инструментов (Pillow, brotli,
+    fontTools, ffmpeg): сообщение об отсутствии - один раз, а не на
+    каждый файл.
+
+    Args:
+        key: Ключ предупреждения (повтор с тем же ключом не печатается)
+        message: Текст
+    """
+    with _warned_lock:
+        if key in _warned:
+            return
+        _warned.add(key)
+    print(message, file=sys.stderr)
@@ -1,6 +1,23 @@
 """Постпроцессоры для финальной обработки HTML."""
 
+from .highlight import HighlightPostprocessor, pygments_available
 from .mermaid_postprocessor import MermaidFixPostprocessor
+from .minify import HtmlMinifyPostprocessor
+from .outline import OutlinePostprocessor
+from .payloads import PayloadDedupPostprocessor, PayloadDeferPostprocessor
 from .plyr_wrap import PlyrWrapPostprocessor
+from .stream import TokenHandler, TokenPostprocessor, run_postprocessors
 
-__all__ = ["MermaidFixPostprocessor", "PlyrWrapPostprocessor"]
+__all__ = [
+    "HighlightPostprocessor",
+    "HtmlMinifyPostprocessor",
+    "MermaidFixPostprocessor",
+    "OutlinePostprocessor",
+    "PayloadDedupPostprocessor",
+    "PayloadDeferPostprocessor",
+    "PlyrWrapPostprocessor",
+    "TokenHandler",
+    "TokenPostprocessor",
+    "pygments_available",
+    "run_postprocessors",
+]
@@ -0,0 +1,251 @@
+"""Постпроцессор для подсветки кода при сборке (Pygments) вместо highlight.js."""
+
+import hashlib
+import html
+import re
+import sys
+import threading
+from typing import Optional
+from ..cache import get_cache_dir, write_atomic
+from .stream import END, START, Token, TokenHandler, TokenPostprocessor, tokenize
+
+# Токены Pygments → классы highlight.js (для темы github-dark и др.).
+# Ищется самый точный тип, затем родители: Name.Function.Magic → Name.Function
+TOKEN_CLASSES = {
+    "Keyword": "hljs-keyword",
+    "Keyword.Constant": "hljs-literal",
+    "Keyword.Type": "hljs-type",
+    "Name.Builtin": "hljs-built_in",
+    "Name.Builtin.Pseudo": "hljs-variable language_",
+    "Name.Function": "hljs-title function_",
+    "Name.Class": "hljs-title class_",
+    "Name.Exception": "hljs-title class_",
+    "Name.Decorator": "hljs-meta",
+    "Name.Tag": "hljs-name",
+    "Name.Attribute": "hljs-attr",
+    "Name.Property": "hljs-property",
+    "Name.Variable": "hljs-variable",
+    "Name.Constant": "hljs-variable constant_",
+    "Name.Label": "hljs-symbol",
+    "Name.Entity": "hljs-symbol",
+    "Literal": "hljs-literal",
+    "Literal.Number": "hljs-number",
+    "Literal.String": "hljs-string",
+    "Literal.String.Escape": "hljs-char escape_",
+    "Literal.String.Interpol": "hljs-subst",
+    "Literal.String.Regex": "hljs-regexp",
+    "Literal.String.Symbol": "hljs-symbol",
+    "Comment": "hljs-comment",
+    "Comment.Preproc": "hljs-meta",
+    "Comment.PreprocFile": "hljs-string",
+    "Operator": "hljs-operator",
+    "Operator.Word": "hljs-keyword",
+    "Generic.Deleted": "hljs-deletion",
+    "Generic.Inserted": "hljs-addition",
+    "Generic.Heading": "hljs-section",
+    "Generic.Subheading": "hljs-section",
+    "Generic.Emph": "hljs-emphasis",
+    "Generic.Strong": "hljs-strong",
+    "Generic.Prompt": "hljs-meta",
+}
+
+# Классы, которые не являются языком
+_NON_LANGUAGE_CLASSES = {"sourceCode", "numberSource", "numberLines", "hljs", "mermaid"}
+
+# <pre class="python"><code>...</code></pre> (Pandoc без подсветки)
+# <pre><code class="language-python">...</code></pre> (DiffPreprocessor)
+_CODE_BLOCK_RE = re.compile(
+    r"<pre(?P<pre_attrs>[^>]*)><code(?P<code_attrs>[^>]*)>(?P<code>.*?)</code></pre>",
+    re.DOTALL,
+)
+_CLASS_ATTR_RE = re.compile(r'\sclass="([^"]*)"')
+
+# Кеш фрагментов в памяти: (язык, sha1 кода) → HTML
+_FRAGMENT_CACHE: dict[tuple[str, str], str] = {}
+_FRAGMENT_CACHE_LOCK = threading.Lock()
+
+
+def pygments_available() -> bool:
+    """Установлен ли Pygments (необязательная зависимость)."""
+    try:
+        import pygments  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HighlightPostprocessor(TokenPostprocessor):
+    """
+    Подсвечивает блоки кода при сборке через Pygments.
+
+    Классы токенов совпадают с highlight.js (hljs-keyword, hljs-string, ...),
+    поэтому тема github-dark работает без изменений, а скрипт highlight.js
+    на странице не нужен. Фрагменты кешируются по (язык, хеш кода)
+    в памяти и на диске, общем для всех процессов.
+    """
+
+    def __init__(self, use_disk_cache: bool = True):
+        """
+        Args:
+            use_disk_cache: Хранить фрагменты в get_cache_dir("highlight")
+        """
+        import pygments
+
+        self.cache_dir = (
+            get_cache_dir("highlight", pygments.__version__) if use_disk_cache else None
+        )
+
+    def handler(self) -> TokenHandler:
+        return _HighlightHandler(self)
+
+    def highlight_blocks(self, markup: str) -> str:
+        """Подсветка всех <pre><code> блоков с известным языком."""
+        return _CODE_BLOCK_RE.sub(self._replace_block, markup)
+
+    def _replace_block(self, match: re.Match) -> str:
+        pre_attrs = match.group("pre_attrs")
+        code_attrs = match.group("code_attrs")
+
+        language = _find_language(pre_attrs) or _find_language(code_attrs)
+        if not language:
+            return match.group(0)
+
+        code = html.unescape(match.group("code"))
+        highlighted = self.highlight(code, language)
+        if highlighted is None:
+            return match.group(0)
+
+        code_attrs = _CLASS_ATTR_RE.sub("", code_attrs)
+        return (
+            f'<pre{pre_attrs}><code class="hljs language-{language}"{code_attrs}>'
+            f"{highlighted}</code></pre>"
+        )
+
+    def highlight(self, code: str, language: str) -> Optional[str]:
+        """
+        Подсветка фрагмента с кешированием.
+
+        Returns:
+            HTML со <span class="hljs-..."> или None если язык неизвестен
+        """
+        digest = hashlib.sha1(code.encode("utf-8")).hexdigest()
+        key = (language, digest)
+
+        with _FRAGMENT_CACHE_LOCK:
+            cached = _FRAGMENT_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        cache_file = None
+        if self.cache_dir is not None:
+            cache_file = self.cache_dir / f"{_safe_name(language)}-{digest}.html"
+            if cache_file.exists():
+                result = cache_file.read_text(encoding="utf-8")
+                with _FRAGMENT_CACHE_LOCK:
+                    _FRAGMENT_CACHE[key] = result
+                return result
+
+        result = _highlight_tokens(code, language)
+        if result is None:
+            return None
+
+        with _FRAGMENT_CACHE_LOCK:
+            _FRAGMENT_CACHE[key] = result
+        if cache_file is not None:
+            try:
+                write_atomic(cache_file, result.encode("utf-8"))
+            except OSError as e:
+                print(f"⚠️ Не удалось сохранить кеш подсветки: {e}", file=sys.stderr)
+        return result
+
+
+class _HighlightHandler(TokenHandler):
+    """Копит токены от <pre> до </pre> и подсвечивает блок целиком."""
+
+    def __init__(self, postprocessor: HighlightPostprocessor):
+        self.postprocessor = postprocessor
+        self._block: Optional[list[Token]] = None
+
+    def handle(self, token: Token) -> list[Token]:
+        if self._block is None:
+            if token.kind == START and token.name == "pre":
+                self._block = [token]
+                return []
+            return [token]
+
+        self._block.append(token)
+        if token.kind != END or token.name != "pre":
+            return []
+        block, self._block = self._block, None
+        markup = "".join(t.text for t in block)
+        highlighted = self.postprocessor.highlight_blocks(markup)
+        return block if highlighted == markup else tokenize(highlighted)
+
+    def close(self) -> list[Token]:
+        block, self._block = self._block or [], None
+        return block
+
+
+def _find_language(attrs: str) -> Optional[str]:
+    """Язык из атрибута class: "python", "sourceCode python", "language-python"."""
+    match = _CLASS_ATTR_RE.search(attrs)
+    if not match:
+        return None
+    for cls in match.group(1).split():
+        if cls.startswith("language-"):
+            cls = cls[len("language-") :]
+        if cls and cls not in _NON_LANGUAGE_CLASSES:
+            return cls
+    return None
+
+
+def _safe_name(language: str) -> str:
+    """Имя языка для имени файла кеша (c++, c# и т.п.)."""
+    return re.sub(r"[^\w-]", "_", language)
+
+
+def _token_class(token_type) -> Optional[str]:
+    """Класс highlight.js для типа токена Pygments."""
+    while token_type is not None and token_type.parent is not None:
+        name = str(token_type)[len("Token.") :]
+        css_class = TOKEN_CLASSES.get(name)
+        if css_class:
+            return css_class
+        token_type = token_type.parent
+    return None
+
+
+def _highlight_tokens(code: str, language: str) -> Optional[str]:
+    """Подсветка Pygments → HTML с классами highlight.js."""
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+
+    try:
+        lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+    parts = []
+    current_class: Optional[str] = None
+    buffer: list[str] = []
+
+    def flush():
+        if not buffer:
+            return
+        text = html.escape("".join(buffer), quote=False)
+        if current_class:
+            parts.append(f'<span class="{current_class}">{text}</span>')
+        else:
+            parts.append(text)
+        buffer.clear()
+
+    # Соседние токены одного класса склеиваются в один <span>
+    for token_type, value in lexer.get_tokens(code):
+        css_class = _token_class(token_type)
+        if css_class != current_class:
+            flush()
+            current_class = css_class
+        buffer.append(value)
+    flush()
+
+    return "".join(parts)
@@ -0,0 +1,118 @@
+"""Минификация HTML на потоке токенов (пробелы, комментарии, лишние атрибуты)."""
+
+import re
+
+from .stream import END, OTHER, START, TEXT, SpoolToken, Token, TokenHandler, TokenPostprocessor
+
+# Содержимое не трогается: пробелы значимы (код) или это не HTML
+_PRESERVE_TAGS = {"pre", "code", "textarea", "script", "style"}
+
+# Пробелы на границе блочного элемента не отображаются
+_BLOCK_TAGS = {
+    "address", "article", "aside", "base", "blockquote", "body", "br", "caption",
+    "dd", "details", "dialog", "div", "dl", "dt", "fieldset", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "head",
+    "header", "hgroup", "hr", "html", "li", "link", "main", "meta", "nav", "ol",
+    "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th",
+    "thead", "title", "tr", "ul",
+}
+
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "source", "track", "wbr",
+}
+
+_SPACE_RE = re.compile(r"[ \t\n\r\f]+")
+# "/>" после пробела или кавычки (<a href=x/> - "/" часть значения)
+_VOID_CLOSE_RE = re.compile(r"""(?:\s+|(?<=["']))/>$""")
+# type по умолчанию в HTML5: <script type="text/javascript">, <style type="text/css">
+_DEFAULT_TYPE_RE = re.compile(
+    r"""\s+type\s*=\s*(["']?)text/(?:javascript|css)\1(?=[\s/>])""", re.IGNORECASE
+)
+_BOOLEAN_ATTR_RE = re.compile(
+    r"""(\s(?:allowfullscreen|async|autoplay|checked|controls|defer|disabled|hidden|"""
+    r"""loop|multiple|muted|nomodule|open|playsinline|readonly|required|reversed|"""
+    r"""selected))\s*=\s*(?:""|'')(?=[\s/>])""",
+    re.IGNORECASE,
+)
+
+
+class HtmlMinifyPostprocessor(TokenPostprocessor):
+    """
+    Минификация HTML перед публикацией.
+
+    Вне pre/code/textarea/script/style: пробелы сворачиваются в один,
+    у границ блочных элементов убираются, комментарии удаляются
+    (кроме условных <!--[if ...]>). В тегах: type по умолчанию у
+    script/style/link, пустые значения логических атрибутов
+    (controls="" → controls), "/>" у пустых элементов. Последний в
+    цепочке: предыдущие обработчики видят исходную разметку.
+    """
+
+    def handler(self) -> TokenHandler:
+        return _MinifyHandler()
+
+
+class _MinifyHandler(TokenHandler):
+    def __init__(self):
+        self._preserve = 0  # Глубина вложенности pre/code/...
+        self._text: list[str] = []  # Текст до следующего тега
+        self._after_block = True  # Предыдущий тег - блочный (или начало)
+
+    def handle(self, token: Token) -> list[Token]:
+        if isinstance(token, SpoolToken):
+            return self._flush(block_after=False) + [token]
+
+        if token.kind == TEXT:
+            if self._preserve:
+                return [token]
+            self._text.append(token.text)
+            return []
+
+        if token.kind == OTHER:
+            if (
+                not self._preserve
+                and token.text.startswith("<!--")
+                and not token.text.startswith("<!--[if")
+            ):
+                return []  # Текст вокруг комментария склеивается
+            return self._flush(block_after=False) + [token]
+
+        result = self._flush(block_after=token.name in _BLOCK_TAGS)
+        if token.kind == START:
+            if token.name in _PRESERVE_TAGS and not token.text.endswith("/>"):
+                self._preserve += 1
+            token = Token(START, _minify_tag(token.text, token.name), token.name)
+        elif token.kind == END and token.name in _PRESERVE_TAGS and self._preserve:
+            self._preserve -= 1
+        self._after_block = token.name in _BLOCK_TAGS
+        result.append(token)
+        return result
+
+    def close(self) -> list[Token]:
+        return self._flush(block_after=True)
+
+    def _flush(self, block_after: bool) -> list[Token]:
+        """Накопленный текст со свёрнутыми пробелами."""
+        if not self._text:
+            return []
+        text = _SPACE_RE.sub(" ", "".join(self._text))
+        self._text = []
+        if self._after_block:
+            text = text.lstrip(" ")
+        if block_after:
+            text = text.rstrip(" ")
+        return [Token(TEXT, text)] if text else []
+
+
+def _minify_tag(markup: str, name: str) -> str:
+    """Открывающий тег без лишних атрибутов."""
+    if name in ("script", "style", "link"):
+        markup = _DEFAULT_TYPE_RE.sub("", markup)
+    if "=" in markup:
+        markup = _BOOLEAN_ATTR_RE.sub(r"\1", markup)
+    if name in _VOID_TAGS:
+        if markup[1:-2].lower() == name:  # <br/>
+            return f"<{markup[1:-2]}>"
+        markup = _VOID_CLOSE_RE.sub(">", markup)
+    return markup
@@ -0,0 +1,103 @@
+"""Постпроцессор: предвычисленная структура заголовков для breadcrumbs."""
+
+import html
+import json
+import re
+from typing import Optional
+
+from .stream import (
+    END,
+    OTHER,
+    START,
+    TEXT,
+    Token,
+    TokenHandler,
+    TokenPostprocessor,
+    tokenize,
+)
+
+_ID_ATTR_RE = re.compile(r'\sid="([^"]+)"')
+
+
+class OutlinePostprocessor(TokenPostprocessor):
+    """
+    Встраивает в страницу JSON со структурой H2/H3 заголовков.
+
+    Формат: список [id, уровень, индекс родителя (-1 для H2), текст].
+    breadcrumbs.js берёт структуру отсюда вместо обхода DOM и чтения
+    offsetTop при каждой прокрутке.
+    """
+
+    SCRIPT_ID = "md-outline"
+
+    def handler(self) -> TokenHandler:
+        return _OutlineHandler(self.SCRIPT_ID)
+
+    @staticmethod
+    def build_outline(html_content: str) -> list:
+        """
+        Структура заголовков документа.
+
+        Returns:
+            [[id, level, parent_index, text], ...]
+        """
+        handler = _OutlineHandler(OutlinePostprocessor.SCRIPT_ID)
+        for token in tokenize(html_content):
+            handler.handle(token)
+        return handler.outline
+
+
+class _OutlineHandler(TokenHandler):
+    """
+    Собирает заголовки по мере прохода, <script> с JSON - перед </body>
+    (или в конец документа, если </body> нет).
+    """
+
+    def __init__(self, script_id: str):
+        self.script_id = script_id
+        self.outline: list = []
+        self._last_h2 = -1
+        # Открытый заголовок: (тег, id, части текста)
+        self._heading: Optional[tuple[str, str, list[str]]] = None
+        self._inserted = False
+
+    def handle(self, token: Token) -> tuple:
+        if self._heading is not None:
+            name, heading_id, parts = self._heading
+            if token.kind == TEXT:
+                parts.append(token.text)
+            elif token.kind == END and token.name == name:
+                self._add(name, heading_id, "".join(parts))
+                self._heading = None
+            return (token,)
+
+        if token.kind == START and token.name in ("h2", "h3"):
+            id_match = _ID_ATTR_RE.search(token.text)
+            if id_match:
+                self._heading = (token.name, id_match.group(1), [])
+        elif token.kind == END and token.name == "body" and not self._inserted:
+            return (*self.close(), token)
+        return (token,)
+
+    def close(self) -> tuple:
+        if self._inserted:
+            return ()
+        self._inserted = True
+        if not self.outline:
+            return ()
+
+        data = json.dumps(self.outline, ensure_ascii=False, separators=(",", ":"))
+        # </script> внутри JSON закрыл бы тег раньше времени
+        data = data.replace("</", "<\\/")
+        script = f'<script type="application/json" id="{self.script_id}">{data}</script>\n'
+        return (Token(OTHER, script),)
+
+    def _add(self, name: str, heading_id: str, text: str):
+        level = int(name[1])
+        text = " ".join(html.unescape(text).split())
+        if level == 2:
+            self._last_h2 = len(self.outline)
+            parent = -1
+        else:
+            parent = self._last_h2
+        self.outline.append([html.unescape(heading_id), level, parent, text])
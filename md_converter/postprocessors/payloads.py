@@ -0,0 +1,269 @@
+"""Постпроцессоры встроенных медиа (режим embed): повторы и отложенная загрузка."""
+
+import base64
+import hashlib
+import re
+import sys
+import tempfile
+from typing import IO, Optional
+
+from ..processors.dimensions import image_size_from_bytes
+from ..writer import format_size
+from .stream import END, OTHER, START, SpoolToken, Token, TokenHandler, TokenPostprocessor
+
+# Теги и атрибуты, в которые Pandoc --embed-resources встраивает data: URI
+_MEDIA_TAGS = ("img", "video", "audio", "source", "embed")
+_DATA_ATTR_RE = re.compile(r'\s(src|poster)="(data:[^"]*)"')
+
+# Меньше - не выносим: ссылка и скрипт дороже самой копии
+MIN_PAYLOAD = 1024
+
+# Повторы получают payload из первого элемента с тем же data-mdp
+_RESOLVER_JS = """(function (attrs) {
+    document.querySelectorAll('[data-mdp-ref]').forEach(function (el) {
+        var ref = el.getAttribute('data-mdp-ref').split(' ');
+        var source = document.querySelector('[data-mdp="' + ref[0] + '"]');
+        if (!source) return;
+        el.setAttribute(ref[1], source.getAttribute(attrs[ref[0]]));
+        el.removeAttribute('data-mdp-ref');
+        if (el.tagName === 'SOURCE' && el.parentNode.load) el.parentNode.load();
+    });
+})"""
+
+
+# Отложенные payload: элементы подгружаются при приближении к экрану,
+# data: URI → Blob → object URL (браузер не держит строку в DOM атрибуте)
+_LOADER_JS = """(function () {
+    function apply(el, attr, url) {
+        el.setAttribute(attr, url);
+        if (el.tagName === 'SOURCE' && el.parentNode.load) el.parentNode.load();
+    }
+    function set(el, attr, uri) {
+        if (!window.fetch || !window.URL || !URL.createObjectURL) return apply(el, attr, uri);
+        fetch(uri).then(function (response) { return response.blob(); }).then(
+            function (blob) { apply(el, attr, URL.createObjectURL(blob)); },
+            function () { apply(el, attr, uri); }
+        );
+    }
+    function load(el) {
+        var spec = el.getAttribute('data-mdp-defer').split(' ');
+        el.removeAttribute('data-mdp-defer');
+        for (var i = 0; i < spec.length; i += 2) {
+            var payload = document.getElementById('mdp-' + spec[i]);
+            if (payload) set(el, spec[i + 1], payload.textContent);
+        }
+    }
+    var items = document.querySelectorAll('[data-mdp-defer]');
+    if (!('IntersectionObserver' in window)) return items.forEach(load);
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (!entry.isIntersecting) return;
+            observer.unobserve(entry.target);
+            entry.target.mdpItems.forEach(load);
+        });
+    }, {rootMargin: '800px 0px'});
+    items.forEach(function (el) {
+        // <source> видим через родительский <video>/<audio>
+        var target = el.tagName === 'SOURCE' ? el.parentNode : el;
+        if (!target.mdpItems) {
+            target.mdpItems = [];
+            observer.observe(target);
+        }
+        target.mdpItems.push(el);
+    });
+})();"""
+
+# Сколько base64 декодировать для чтения размера картинки (заголовок)
+_SIZE_PREFIX = 1 << 18
+_SIZE_ATTR_RE = re.compile(r"\s(width|height)\s*=", re.IGNORECASE)
+
+
+class PayloadDedupPostprocessor(TokenPostprocessor):
+    """
+    Хранит каждый одинаковый встроенный payload (data: URI) один раз.
+
+    Pandoc --embed-resources вставляет отдельную base64 копию на каждое
+    вхождение: логотип на 40 страницах курса или одинаковая диаграмма
+    Mermaid хранятся 40 раз. Первое вхождение остаётся как есть и
+    получает data-mdp="N", у повторов атрибут с payload заменяется на
+    data-mdp-ref="N src"; маленький скрипт перед </body> копирует
+    payload из первого элемента.
+    """
+
+    def handler(self) -> TokenHandler:
+        return _PayloadDedupHandler()
+
+
+class _PayloadDedupHandler(TokenHandler):
+    def __init__(self):
+        # sha1 payload → (номер, атрибут с payload в первом элементе)
+        self._seen: dict[str, tuple[int, str]] = {}
+        self._referenced: dict[int, str] = {}
+        self._refs = 0
+        self._saved_bytes = 0
+
+    def handle(self, token: Token) -> tuple:
+        if token.kind == START and token.name in _MEDIA_TAGS:
+            return (Token(START, self._rewrite(token.text), token.name),)
+        if token.kind == END and token.name == "body":
+            return (*self.close(), token)
+        return (token,)
+
+    def close(self) -> tuple:
+        if not self._referenced:
+            return ()
+        print(
+            f"  ♻️ Повторов встроенных медиа: {self._refs}, "
+            f"без копий -{format_size(self._saved_bytes)}",
+            file=sys.stderr,
+        )
+        table = ",".join(f'"{n}":"{attr}"' for n, attr in sorted(self._referenced.items()))
+        self._referenced = {}
+        return (Token(OTHER, f"<script>{_RESOLVER_JS}({{{table}}});</script>\n"),)
+
+    def _rewrite(self, markup: str) -> str:
+        """Помечает первое вхождение payload, повторы заменяет ссылкой."""
+        parts = []
+        last = 0
+        # Не больше одного data-mdp и одного data-mdp-ref на элемент
+        # (у video payload бывает и в src, и в poster)
+        marked = referenced = False
+        for match in _DATA_ATTR_RE.finditer(markup):
+            attr, value = match.group(1), match.group(2)
+            if len(value) < MIN_PAYLOAD:
+                continue
+            digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+            seen: Optional[tuple[int, str]] = self._seen.get(digest)
+            if seen is not None and not referenced:
+                referenced = True
+                parts.append(markup[last : match.start()])
+                parts.append(f' data-mdp-ref="{seen[0]} {attr}"')
+                self._referenced[seen[0]] = seen[1]
+                self._refs += 1
+                self._saved_bytes += len(value)
+            elif seen is None and not marked:
+                marked = True
+                number = len(self._seen) + 1
+                self._seen[digest] = (number, attr)
+                parts.append(markup[last : match.start()])
+                parts.append(f' data-mdp="{number}"{match.group(0)}')
+            else:
+                continue
+            last = match.end()
+        if not parts:
+            return markup
+        parts.append(markup[last:])
+        return "".join(parts)
+
+
+class PayloadDeferPostprocessor(TokenPostprocessor):
+    """
+    Выносит встроенные медиа в конец документа для быстрой первой отрисовки.
+
+    Встроенная картинка в 5 MB base64 внутри <img> задерживает разбор
+    всего, что после неё: первый экран одностраничного HTML ждёт все
+    медиа выше по тексту. Постпроцессор убирает payload из атрибута
+    (data-mdp-defer="N src"), у <img> ставит прозрачную заглушку с
+    размерами картинки (без скачка вёрстки) и складывает payload в
+    <script type="text/plain" id="mdp-N"> перед </body> - по одному на
+    одинаковые данные. Скрипт подгружает медиа при приближении к экрану.
+    Файл остаётся одним и самодостаточным.
+    """
+
+    def handler(self) -> TokenHandler:
+        return _PayloadDeferHandler()
+
+
+class _PayloadDeferHandler(TokenHandler):
+    def __init__(self):
+        self._numbers: dict[str, int] = {}  # sha1 payload → номер
+        # Payload копятся во временном файле, а не в памяти
+        self._spool: Optional[IO[str]] = None
+        self._deferred = 0
+        self._moved_bytes = 0
+
+    def handle(self, token: Token) -> tuple:
+        if token.kind == START and token.name in _MEDIA_TAGS:
+            return (Token(START, self._rewrite(token.text, token.name), token.name),)
+        if token.kind == END and token.name == "body":
+            return (*self.close(), token)
+        return (token,)
+
+    def close(self) -> tuple:
+        if self._spool is None:
+            return ()
+        print(
+            f"  ⏳ Отложено встроенных медиа: {self._deferred} "
+            f"({len(self._numbers)} payload, {format_size(self._moved_bytes)})",
+            file=sys.stderr,
+        )
+        spool, self._spool = self._spool, None
+        return (SpoolToken(spool), Token(OTHER, f"<script>{_LOADER_JS}</script>\n"))
+
+    def _rewrite(self, markup: str, name: str) -> str:
+        """Заменяет payload в атрибутах ссылкой на отложенный блок."""
+        parts = []
+        spec = []
+        last = 0
+        for match in _DATA_ATTR_RE.finditer(markup):
+            attr, value = match.group(1), match.group(2)
+            # "<" и "&" в тексте <script> читались бы не так, как в атрибуте
+            if len(value) < MIN_PAYLOAD or "<" in value or "&" in value:
+                continue
+            spec.append(f"{self._store(value)} {attr}")
+            parts.append(markup[last : match.start()])
+            if name == "img" and attr == "src":
+                parts.append(_placeholder(markup, value))
+            last = match.end()
+        if not spec:
+            return markup
+        self._deferred += 1
+        parts.append(markup[last:])
+        markup = "".join(parts)
+        split = len(name) + 1  # после "<img"
+        return f'{markup[:split]} data-mdp-defer="{" ".join(spec)}"{markup[split:]}'
+
+    def _store(self, value: str) -> int:
+        digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+        number = self._numbers.get(digest)
+        if number is None:
+            number = len(self._numbers) + 1
+            self._numbers[digest] = number
+            if self._spool is None:
+                self._spool = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")
+            self._spool.write(f'<script type="text/plain" id="mdp-{number}">{value}</script>\n')
+            self._moved_bytes += len(value)
+        return number
+
+
+def _placeholder(markup: str, value: str) -> str:
+    """
+    Заглушка вместо src картинки: SVG с viewBox исходного размера.
+
+    Вместе с width/height сохраняет место в вёрстке до загрузки. Для
+    неизвестного формата - без заглушки.
+    """
+    size = _image_size(value)
+    if size is None:
+        return ""
+    width, height = size
+    existing = {m.group(1).lower() for m in _SIZE_ATTR_RE.finditer(markup)}
+    attrs = "".join(
+        f' {attr}="{number}"'
+        for attr, number in (("width", width), ("height", height))
+        if attr not in existing
+    )
+    svg = f"%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {width} {height}'/%3E"
+    return f'{attrs} src="data:image/svg+xml,{svg}"'
+
+
+def _image_size(value: str) -> Optional[tuple[int, int]]:
+    """Размер картинки из data: URI (декодируется только начало)."""
+    header, _, data = value.partition(",")
+    if not header.endswith(";base64"):
+        return None
+    try:
+        raw = base64.b64decode(data[:_SIZE_PREFIX])
+    except ValueError:
+        return None
+    return image_size_from_bytes(raw)
@@ -1,46 +1,76 @@
 """Постпроцессор для обертывания audio/video в красивые figure с Plyr."""
 
 import re
+from typing import Optional
 
+from .stream import START, TEXT, Token, TokenHandler, TokenPostprocessor
 
-class PlyrWrapPostprocessor:
+_CLASS_ATTR_RE = re.compile(r"\sclass\s*=", re.IGNORECASE)
+# <div class="plyr ... plyr--audio"> (Plyr уже обернул элемент)
+_PLYR_DIV_RE = re.compile(r'<div class="plyr[^"]*plyr--(audio|video)')
+
+
+class PlyrWrapPostprocessor(TokenPostprocessor):
     """Оборачивает <audio> и <video> теги в красивые figure с классами для Plyr."""
 
-    def process(self, html: str) -> str:
-        """Обработка audio/video тегов - добавление классов для Plyr и стилизации."""
-
-        # ШАГ 1: Добавляем class="plyr-audio" к <audio> тегам (если ещё нет)
-        html = re.sub(
-            r"<audio(?![^>]*class=)([^>]*)>", r'<audio class="plyr-audio"\1>', html
-        )
-
-        # ШАГ 2: Добавляем class="plyr-video" к <video> тегам (если ещё нет)
-        html = re.sub(
-            r"<video(?![^>]*class=)([^>]*)>", r'<video class="plyr-video"\1>', html
-        )
-
-        # ШАГ 3: Добавляем классы к <figure> содержащим <audio>
-        # Паттерн матчит <figure> без класса, за которым идёт audio
-        html = re.sub(
-            r"<figure>(\s*<audio)", r'<figure class="media-player media-audio">\1', html
-        )
-
-        # ШАГ 4: Добавляем классы к <figure> содержащим <video>
-        html = re.sub(
-            r"<figure>(\s*<video)", r'<figure class="media-player media-video">\1', html
-        )
-
-        # ШАГ 5: Обработка figure с Plyr-обёрнутыми элементами (когда Plyr уже добавил div.plyr)
-        html = re.sub(
-            r'<figure>(\s*<div class="plyr[^"]*plyr--audio)',
-            r'<figure class="media-player media-audio">\1',
-            html,
-        )
-
-        html = re.sub(
-            r'<figure>(\s*<div class="plyr[^"]*plyr--video)',
-            r'<figure class="media-player media-video">\1',
-            html,
-        )
-
-        return html
+    def handler(self) -> TokenHandler:
+        return _PlyrWrapHandler()
+
+
+class _PlyrWrapHandler(TokenHandler):
+    """
+    Обработка audio/video тегов - добавление классов для Plyr и стилизации.
+
+    - <audio>/<video> без class получают plyr-audio/plyr-video;
+    - <figure> без атрибутов, в котором первым (после пробелов) идёт
+      audio/video или div.plyr, получает media-player media-audio/video.
+    """
+
+    def __init__(self):
+        # <figure> и пробелы после него - ждём следующий тег
+        self._figure: Optional[list[Token]] = None
+
+    def handle(self, token: Token) -> list[Token]:
+        if self._figure is not None:
+            if token.kind == TEXT and not token.text.strip():
+                self._figure.append(token)
+                return []
+            pending, self._figure = self._figure, None
+            media = _media_kind(token)
+            if media:
+                pending[0] = Token(
+                    START, f'<figure class="media-player media-{media}">', "figure"
+                )
+            return pending + self.handle(token)
+
+        if token.kind == START:
+            if token.text == "<figure>":
+                self._figure = [token]
+                return []
+            if token.name in ("audio", "video") and not _CLASS_ATTR_RE.search(
+                token.text
+            ):
+                cut = len(token.name) + 1
+                token = Token(
+                    START,
+                    f'{token.text[:cut]} class="plyr-{token.name}"{token.text[cut:]}',
+                    token.name,
+                )
+        return [token]
+
+    def close(self) -> list[Token]:
+        pending, self._figure = self._figure or [], None
+        return pending
+
+
+def _media_kind(token: Token) -> Optional[str]:
+    """"audio"/"video", если тег - медиа элемент или div плеера Plyr."""
+    if token.kind != START:
+        return None
+    if token.name in ("audio", "video"):
+        return token.name
+    if token.name == "div":
+        match = _PLYR_DIV_RE.match(token.text)
+        if match:
+            return match.group(1)
+    return None
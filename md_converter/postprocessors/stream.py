@@ -0,0 +1,357 @@
+"""Потоковая постобработка HTML: токенизатор и цепочка обработчиков токенов."""
+
+import html
+import re
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Union
+
+# Виды токенов
+TEXT = "text"
+START = "start"  # <tag ...>
+END = "end"  # </tag>
+OTHER = "other"  # <!-- -->, <!DOCTYPE>, <?...>
+
+# Содержимое до </script> / </style> - текст, а не разметка
+_RAW_TEXT_TAGS = ("script", "style")
+_TAG_NAME_RE = re.compile(r"</?([A-Za-z][^\s/>]*)")
+_TAG_SCAN_RE = re.compile(r"[>=]")
+_SPACE = " \t\n\r\f"
+
+# Размер блока чтения файла (символов)
+CHUNK_SIZE = 1 << 20
+
+
+class Token:
+    """Токен HTML: исходный текст без изменений + вид и имя тега."""
+
+    __slots__ = ("kind", "text", "name")
+
+    def __init__(self, kind: str, text: str, name: str = ""):
+        self.kind = kind
+        self.text = text
+        self.name = name  # Имя тега в нижнем регистре (START/END)
+
+    def __repr__(self) -> str:
+        return f"Token({self.kind!r}, {self.text[:40]!r})"
+
+
+class SpoolToken(Token):
+    """
+    Токен с большим текстом во временном файле (отложенные payload):
+    выводится блоками, в память целиком не читается.
+    """
+
+    __slots__ = ("file",)
+
+    def __init__(self, file: IO[str]):
+        super().__init__(OTHER, "")
+        self.file = file
+
+    def chunks(self) -> Iterator[str]:
+        """Текст блоками; файл закрывается после вывода."""
+        try:
+            self.file.seek(0)
+            yield from iter(lambda: self.file.read(CHUNK_SIZE), "")
+        finally:
+            self.file.close()
+
+
+class HtmlTokenizer:
+    """
+    Инкрементальный токенизатор HTML: блоки текста → токены.
+
+    Сохраняет исходный текст побайтово (склейка токенов = вход). Не
+    строит дерево и не разбирает атрибуты: в памяти только текущий блок
+    и незавершённый тег. Тег, разрезанный границей блока, дочитывается
+    без повторного сканирования (встроенные data: URI - десятки МБ).
+    """
+
+    def __init__(self):
+        self._buffer = ""  # Необработанный хвост (короткий)
+        self._tag_parts: list[str] = []  # Начало незавершённого тега
+        self._tag_state = ""  # Состояние сканера тега: "", "=", '"', "'"
+        self._raw_close: Optional[re.Pattern] = None  # </script> в сыром тексте
+
+    def feed(self, chunk: str) -> list[Token]:
+        """Токены, полностью содержащиеся в прочитанном тексте."""
+        tokens: list[Token] = []
+        if self._tag_parts:
+            end, self._tag_state = _scan_tag(chunk, 0, self._tag_state)
+            if end == -1:
+                self._tag_parts.append(chunk)
+                return tokens
+            self._tag_parts.append(chunk[:end])
+            self._start_tag("".join(self._tag_parts), tokens)
+            self._tag_parts = []
+            chunk = chunk[end:]
+        self._buffer += chunk
+        self._tokenize(tokens, final=False)
+        return tokens
+
+    def close(self) -> list[Token]:
+        """Остаток входа (незакрытые конструкции - как текст)."""
+        tokens: list[Token] = []
+        if self._tag_parts:
+            self._buffer = "".join(self._tag_parts) + self._buffer
+            self._tag_parts = []
+        self._tokenize(tokens, final=True)
+        if self._buffer:
+            tokens.append(Token(TEXT, self._buffer))
+            self._buffer = ""
+        return tokens
+
+    def _tokenize(self, tokens: list[Token], final: bool):
+        text = self._buffer
+        n = len(text)
+        pos = 0
+        while pos < n:
+            if self._raw_close is not None:
+                match = self._raw_close.search(text, pos)
+                if match is None:
+                    # Хвост может быть началом </script - ждём следующий блок
+                    keep = n if final else max(pos, n - len(self._raw_close.pattern))
+                    if keep > pos:
+                        tokens.append(Token(TEXT, text[pos:keep]))
+                        pos = keep
+                    break
+                if match.start() > pos:
+                    tokens.append(Token(TEXT, text[pos : match.start()]))
+                pos = match.start()
+                self._raw_close = None
+
+            i = text.find("<", pos)
+            if i == -1:
+                tokens.append(Token(TEXT, text[pos:]))
+                pos = n
+                break
+            if i > pos:
+                tokens.append(Token(TEXT, text[pos:i]))
+                pos = i
+            if i + 1 >= n:
+                if final:
+                    tokens.append(Token(TEXT, "<"))
+                    pos = n
+                break
+
+            next_char = text[i + 1]
+            if next_char.isascii() and next_char.isalpha():
+                end, state = _scan_tag(text, i + 1, "")
+                if end == -1:
+                    if final:
+                        break
+                    # Большой тег: дальше копим части без пересканирования
+                    self._tag_parts = [text[i:]]
+                    self._tag_state = state
+                    pos = n
+                    break
+                self._start_tag(text[i:end], tokens)
+                pos = end
+                continue
+
+            if next_char == "/":
+                end = text.find(">", i)
+                kind = END
+            elif next_char in "!?":
+                if text.startswith("<!--", i):
+                    end = text.find("-->", i + 4)
+                    end = end + 2 if end != -1 else -1
+                elif not final and n - i < 4 and "<!--".startswith(text[i:]):
+                    break  # Может оказаться началом комментария
+                else:
+                    end = text.find(">", i)
+                kind = OTHER
+            else:
+                tokens.append(Token(TEXT, "<"))
+                pos = i + 1
+                continue
+
+            if end == -1:
+                break
+            markup = text[i : end + 1]
+            name_match = _TAG_NAME_RE.match(markup) if kind == END else None
+            tokens.append(
+                Token(kind, markup, name_match.group(1).lower() if name_match else "")
+            )
+            pos = end + 1
+        self._buffer = text[pos:]
+
+    def _start_tag(self, markup: str, tokens: list[Token]):
+        name = _TAG_NAME_RE.match(markup).group(1).lower()
+        tokens.append(Token(START, markup, name))
+        if name in _RAW_TEXT_TAGS and not markup.endswith("/>"):
+            self._raw_close = re.compile(f"</{name}", re.IGNORECASE)
+
+
+def _scan_tag(text: str, pos: int, state: str) -> tuple[int, str]:
+    """
+    Ищет конец открывающего тега с учётом значений атрибутов в кавычках.
+
+    Args:
+        text: Текст
+        pos: Откуда продолжить
+        state: Состояние с прошлого блока ("", "=" после знака =,
+            кавычка внутри значения)
+
+    Returns:
+        (индекс после ">" или -1, состояние для следующего блока)
+    """
+    n = len(text)
+    while pos < n:
+        if state == "=":
+            while pos < n and text[pos] in _SPACE:
+                pos += 1
+            if pos == n:
+                break
+            if text[pos] in "\"'":
+                state = text[pos]
+                pos += 1
+            else:
+                state = ""
+        elif state:
+            end = text.find(state, pos)
+            if end == -1:
+                break
+            pos = end + 1
+            state = ""
+        else:
+            match = _TAG_SCAN_RE.search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if match.group() == ">":
+                return pos, ""
+            state = "="
+    return -1, state
+
+
+def tokenize(markup: str) -> list[Token]:
+    """Все токены строки HTML."""
+    tokenizer = HtmlTokenizer()
+    return tokenizer.feed(markup) + tokenizer.close()
+
+
+def get_attr(markup: str, name: str) -> Optional[str]:
+    """Значение атрибута из текста открывающего тега (None если нет)."""
+    match = re.search(
+        rf"""\s{re.escape(name)}\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""",
+        markup,
+        re.IGNORECASE,
+    )
+    if match is None:
+        return None
+    value = next(group for group in match.groups() if group is not None)
+    return html.unescape(value)
+
+
+class TokenHandler:
+    """
+    Обработчик токенов одного документа.
+
+    handle() получает токен и возвращает токены для следующего
+    обработчика цепочки (тот же, изменённый, несколько или ни одного -
+    если нужно дождаться следующих). close() отдаёт отложенное.
+    """
+
+    def handle(self, token: Token) -> Iterable[Token]:
+        return (token,)
+
+    def close(self) -> Iterable[Token]:
+        return ()
+
+
+class TokenPostprocessor:
+    """
+    Постпроцессор HTML на потоке токенов.
+
+    Документ проходит всю цепочку за один проход блоками: память -
+    блок чтения плюс то, что обработчик держит сам (блок кода,
+    заголовок), а не весь HTML в несколько копий. Обработчик создаётся
+    на каждый документ (handler()), сам постпроцессор без состояния:
+    главы формата site обрабатываются параллельно.
+    """
+
+    def handler(self) -> TokenHandler:
+        """Новый обработчик для одного документа."""
+        raise NotImplementedError
+
+    def process(self, html_content: str) -> str:
+        """Обработка HTML строки (прежний API)."""
+        stream = HtmlStream([self])
+        return stream.feed(html_content) + stream.close()
+
+
+class HtmlStream:
+    """Цепочка постпроцессоров над HTML, поступающим блоками."""
+
+    def __init__(self, postprocessors: list[TokenPostprocessor]):
+        self._tokenizer = HtmlTokenizer()
+        self._handlers = [postprocessor.handler() for postprocessor in postprocessors]
+
+    def feed(self, chunk: str) -> str:
+        """Обработанный HTML, готовый к записи."""
+        return "".join(self.feed_pieces(chunk))
+
+    def close(self) -> str:
+        """Остаток: хвост токенизатора и отложенное обработчиками."""
+        return "".join(self.close_pieces())
+
+    def feed_pieces(self, chunk: str) -> Iterator[str]:
+        """feed() по частям (SpoolToken - блоками из файла)."""
+        return self._pieces(self._apply(self._tokenizer.feed(chunk), 0))
+
+    def close_pieces(self) -> Iterator[str]:
+        """close() по частям."""
+        yield from self._pieces(self._apply(self._tokenizer.close(), 0))
+        for index, handler in enumerate(self._handlers):
+            yield from self._pieces(self._apply(list(handler.close()), index + 1))
+
+    def _apply(self, tokens: list[Token], first: int) -> list[Token]:
+        for handler in self._handlers[first:]:
+            result: list[Token] = []
+            for token in tokens:
+                result.extend(handler.handle(token))
+            tokens = result
+        return tokens
+
+    @staticmethod
+    def _pieces(tokens: list[Token]) -> Iterator[str]:
+        batch: list[str] = []
+        for token in tokens:
+            if isinstance(token, SpoolToken):
+                if batch:
+                    yield "".join(batch)
+                    batch = []
+                yield from token.chunks()
+            else:
+                batch.append(token.text)
+        if batch:
+            yield "".join(batch)
+
+
+def run_postprocessors(
+    source: Union[str, Path],
+    target: Union[str, Path],
+    postprocessors: list,
+    chunk_size: int = CHUNK_SIZE,
+):
+    """
+    Постобработка HTML файла source → target.
+
+    Постпроцессоры на токенах (TokenPostprocessor) работают потоком за
+    один проход. Если в цепочке есть постпроцессор только с process(str),
+    документ читается целиком.
+    """
+    if not all(isinstance(p, TokenPostprocessor) for p in postprocessors):
+        content = Path(source).read_text(encoding="utf-8")
+        for postprocessor in postprocessors:
+            content = postprocessor.process(content)
+        Path(target).write_text(content, encoding="utf-8")
+        return
+
+    stream = HtmlStream(postprocessors)
+    with open(source, encoding="utf-8", newline="") as src, open(
+        target, "w", encoding="utf-8", newline=""
+    ) as dst:
+        for chunk in iter(lambda: src.read(chunk_size), ""):
+            dst.writelines(stream.feed_pieces(chunk))
+        dst.writelines(stream.close_pieces())
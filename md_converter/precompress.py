@@ -0,0 +1,191 @@
+"""Предварительное сжатие результатов для статического хостинга (.gz, .br)."""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .cache import write_atomic
+from .config import PublishConfig
+from .messages import warn_once
+from .writer import OutputWriter, format_size
+
+# Текстовые файлы: HTML страниц и ассеты рядом с ними
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".svg", ".json", ".xml", ".txt", ".map"}
+
+# Меньше - сжатие не окупает запрос к файлу (как gzip_min_length)
+_MIN_SIZE = 1024
+
+_MANIFEST_NAME = ".precompress.json"
+
+
+class Precompressor:
+    """
+    Пишет рядом с файлами сжатые копии page.html.gz и page.html.br.
+
+    Статический сервер (nginx gzip_static/brotli_static, Caddy
+    precompressed) отдаёт их как есть, вместо сжатия на каждый запрос.
+    Сжатие - максимальное (gzip 9, Brotli 11), файлы и форматы сжимаются
+    параллельно. В <output_dir>/.precompress.json хранится хеш исходника
+    каждой пары: неизменённый файл повторно не сжимается (файлы с теми
+    же размером и mtime даже не читаются). Brotli - при установленном
+    пакете brotli, иначе только .gz.
+    """
+
+    def __init__(self, config: PublishConfig, writer: Optional[OutputWriter] = None):
+        """
+        Args:
+            config: Секция publish
+            writer: Запись копий (только при изменении, отчёт о записи)
+        """
+        self.config = config
+        self.writer = writer or OutputWriter()
+        self.formats = []
+        if config.gzip:
+            self.formats.append("gz")
+        if config.brotli and _brotli() is not None:
+            self.formats.append("br")
+
+    def compress(self, output_dir: Path, files: Iterable[Path] = ()) -> list[Path]:
+        """
+        Сжимает files и текстовые ассеты output_dir.
+
+        HTML других документов той же папки не трогается (их сжимает своя
+        сборка), ассеты и диаграммы - общие.
+
+        Args:
+            output_dir: Папка результатов (в ней манифест)
+            files: Результаты сборки (HTML страницы)
+
+        Returns:
+            Записанные сжатые копии
+        """
+        output_dir = Path(output_dir)
+        manifest_path = output_dir / _MANIFEST_NAME
+        manifest = _load(manifest_path)
+
+        sources = {}
+        for path in [*files, *_assets(output_dir)]:
+            path = Path(path)
+            if path.suffix.lower() in TEXT_EXTENSIONS and path.is_file():
+                sources.setdefault(path.resolve(), path)
+
+        jobs = []
+        for path in sources.values():
+            key = path.resolve().relative_to(output_dir.resolve()).as_posix()
+            entry = self._entry(path, manifest.get(key))
+            if entry is None:
+                continue  # Исходник не изменился, копии на месте
+            manifest[key] = entry
+            jobs.extend((key, path, fmt) for fmt in self.formats)
+        if not jobs:
+            return []
+
+        workers = self.config.workers or os.cpu_count() or 1
+        print(
+            f"🗜️ Сжатие для публикации: {len(jobs)} ({', '.join(self.formats)})...",
+            file=sys.stderr,
+        )
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            targets = list(executor.map(lambda job: self._write(job[1], job[2]), jobs))
+
+        written = []
+        for (key, _, fmt), target in zip(jobs, targets):
+            if target is not None:
+                manifest[key]["written"].append(fmt)
+                written.append(target)
+
+        write_atomic(
+            manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")
+        )
+        return written
+
+    def _entry(self, path: Path, previous: Optional[dict]) -> Optional[dict]:
+        """
+        Запись манифеста для исходника; None - сжимать не нужно.
+
+        Одинаковые размер и mtime - хеш не считается; тот же хеш (файл
+        перезаписан теми же байтами) - тоже без сжатия.
+        """
+        stat = path.stat()
+        fresh = (
+            previous is not None
+            and previous.get("formats") == self.formats
+            and all(Path(f"{path}.{fmt}").exists() for fmt in previous.get("written", []))
+        )
+        if fresh and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime_ns:
+            return None
+        digest = _file_sha1(path)
+        if fresh and previous["sha1"] == digest:
+            previous.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+            return None
+        return {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "sha1": digest,
+            "formats": self.formats,
+            "written": [],  # Форматы, для которых копия меньше исходника
+        }
+
+    def _write(self, path: Path, fmt: str) -> Optional[Path]:
+        """Одна сжатая копия (удаляется, если не меньше исходника)."""
+        data = path.read_bytes()
+        target = Path(f"{path}.{fmt}")
+        if len(data) < _MIN_SIZE:
+            target.unlink(missing_ok=True)
+            return None
+        if fmt == "gz":
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        else:
+            brotli = _brotli()
+            compressed = brotli.compress(data, mode=brotli.MODE_TEXT, quality=11, lgwin=24)
+        if len(compressed) >= len(data):
+            target.unlink(missing_ok=True)
+            return None
+        self.writer.write_bytes(target, compressed)
+        print(
+            f"  ✓ {target.name}: {format_size(len(data))} → {format_size(len(compressed))}",
+            file=sys.stderr,
+        )
+        return target
+
+
+def _assets(output_dir: Path) -> list[Path]:
+    """Текстовые файлы папки результатов, кроме HTML и скрытых."""
+    found = []
+    for root, dirs, names in os.walk(output_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            path = Path(root) / name
+            if not name.startswith(".") and path.suffix.lower() in TEXT_EXTENSIONS - {".html"}:
+                found.append(path)
+    return sorted(found)
+
+
+def _brotli():
+    """Модуль brotli (None - не установлен)."""
+    try:
+        import brotli
+    except ImportError:
+        warn_once("brotli-publish", "  ⚠️ brotli не установлен: только .gz (pip install brotli)")
+        return None
+    return brotli
+
+
+def _load(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -3,7 +3,7 @@
 from .base import Preprocessor
 from .obsidian import ObsidianPreprocessor
 from .callouts import CalloutsPreprocessor
-from .mermaid_preprocessor import MermaidPreprocessor
+from .mermaid_preprocessor import MermaidPreprocessor, prune_diagrams
 from .mermaid_autofix import MermaidAutoFixPreprocessor
 from .diff import DiffPreprocessor
 
@@ -12,6 +12,7 @@ __all__ = [
     "ObsidianPreprocessor",
     "CalloutsPreprocessor",
     "MermaidPreprocessor",
+    "prune_diagrams",
     "MermaidAutoFixPreprocessor",
     "DiffPreprocessor",
 ]
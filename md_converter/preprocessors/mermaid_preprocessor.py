@@ -1,11 +1,23 @@
 """Препроцессор для Mermaid диаграмм - рендеринг через CLI в WebP."""
 
+import hashlib
+import json
 import re
 import subprocess
 import sys
 import tempfile
 from pathlib import Path
+from typing import Iterable, Optional
 from .base import Preprocessor
+from ..cache import write_atomic
+from ..processors.dimensions import image_size_from_bytes
+from ..processors.image import encode_palette
+from ..processors.svg import SvgMinifier
+from ..writer import OutputWriter
+
+# Найденный mmdc: поиск по PATH и npm папкам - один раз на процесс
+# (batch сборка создаёт препроцессор на каждый документ)
+_MMDC_PATH = None
 
 
 class MermaidPreprocessor(Preprocessor):
@@ -22,24 +34,35 @@ class MermaidPreprocessor(Preprocessor):
     4. MediaProcessor затем обработает эти изображения (embed/copy)
     """
 
-    def __init__(self, config, format_type: str = "html"):
+    def __init__(
+        self,
+        config,
+        format_type: str = "html",
+        writer: Optional[OutputWriter] = None,
+    ):
         """
         Args:
             config: Объект конфигурации с настройками Mermaid
             format_type: "html" или "epub"
+            writer: Запись файлов диаграмм (только при изменении)
         """
         self.format_type = format_type
+        self.writer = writer or OutputWriter()
 
         # Извлекаем настройки из конфига
         self.theme = config.styles.mermaid_theme
         self.scale = config.styles.mermaid_scale
         self.format = config.styles.mermaid_format
         self.quality = config.styles.mermaid_quality
+        self.encoder = config.styles.mermaid_encoder
         self.background = config.styles.mermaid_background
+        self.image_dimensions = config.images.dimensions
 
         # Режим медиа и output_dir
         self.media_mode = config.media_mode
         self.output_dir = Path(config.output_dir)
+        # Хеши диаграмм, записанных в media/ (prune_diagrams после сборки)
+        self.diagrams: set[str] = set()
 
         # Находим mmdc исполняемый файл
         self.mmdc_path = self._find_mmdc()
@@ -54,6 +77,14 @@ class MermaidPreprocessor(Preprocessor):
         Raises:
             FileNotFoundError: Если mmdc не найден
         """
+        global _MMDC_PATH
+        if _MMDC_PATH is None:
+            _MMDC_PATH = self._locate_mmdc()
+        return _MMDC_PATH
+
+    @staticmethod
+    def _locate_mmdc() -> str:
+        """Поиск mmdc в PATH и стандартных папках npm (см. _find_mmdc)."""
         import shutil
         import os
         import sys
@@ -90,23 +121,52 @@ class MermaidPreprocessor(Preprocessor):
             "После установки может потребоваться перезапуск терминала/IDE для обновления PATH."
         )
 
-    def _render_diagram(self, diagram_code: str, diagram_index: int) -> bytes:
+    def _render_diagram(
+        self, diagram_code: str, diagram_index: int
+    ) -> tuple[bytes, str]:
         """
-        Рендерит Mermaid диаграмму в WebP формат В ПАМЯТИ.
+        Рендерит Mermaid диаграмму в WebP (или PNG) В ПАМЯТИ.
 
         Args:
             diagram_code: Код диаграммы Mermaid
             diagram_index: Порядковый номер диаграммы в документе
 
         Returns:
-            bytes: WebP данные
+            (данные изображения, расширение "webp" | "png")
 
         Raises:
             subprocess.CalledProcessError: Если рендеринг завершился с ошибкой
         """
-        from PIL import Image
-        import io
+        png_bytes = self._run_mmdc(diagram_code, ".png", ["-s", str(self.scale)])
+        return self._encode_diagram(png_bytes)
+
+    def _render_svg(self, diagram_code: str, id_prefix: str) -> str:
+        """
+        Рендерит Mermaid диаграмму в минифицированный SVG.
+
+        Args:
+            diagram_code: Код диаграммы Mermaid
+            id_prefix: Префикс id в SVG ("d3-")
+
+        Returns:
+            SVG разметка для встраивания в HTML
+        """
+        svg_bytes = self._run_mmdc(diagram_code, ".svg", [])
+        minifier = SvgMinifier(id_prefix=id_prefix)
+        return minifier.process(svg_bytes.decode("utf-8"))
 
+    def _run_mmdc(self, diagram_code: str, suffix: str, extra_args: list) -> bytes:
+        """
+        Запускает mmdc и возвращает содержимое результата.
+
+        Args:
+            diagram_code: Код диаграммы Mermaid
+            suffix: Расширение результата (".png", ".svg") - задаёт формат
+            extra_args: Дополнительные аргументы mmdc
+
+        Raises:
+            subprocess.CalledProcessError: Если рендеринг завершился с ошибкой
+        """
         # Создаём временный файл для исходного кода
         with tempfile.NamedTemporaryFile(
             mode="w", suffix=".mmd", delete=False, encoding="utf-8"
@@ -114,8 +174,8 @@ class MermaidPreprocessor(Preprocessor):
             tmp_file.write(diagram_code)
             tmp_path = Path(tmp_file.name)
 
-        # Временный PNG
-        png_path = tmp_path.with_suffix(".png")
+        # Временный файл результата
+        output_path = tmp_path.with_suffix(suffix)
 
         try:
             # Формируем команду для mmdc
@@ -124,16 +184,15 @@ class MermaidPreprocessor(Preprocessor):
                 "-i",
                 str(tmp_path),
                 "-o",
-                str(png_path),
+                str(output_path),
                 "-t",
                 self.theme,
-                "-s",
-                str(self.scale),
                 "-b",
                 self.background,
+                *extra_args,
             ]
 
-            # Запускаем рендеринг в PNG
+            # Запускаем рендеринг
             subprocess.run(
                 cmd,
                 capture_output=True,
@@ -143,15 +202,8 @@ class MermaidPreprocessor(Preprocessor):
                 stdin=subprocess.DEVNULL,  # Не блокировать MCP stdio
             )
 
-            # Читаем PNG в память
-            png_bytes = png_path.read_bytes()
-
-            # Конвертируем PNG -> WebP в памяти
-            with Image.open(io.BytesIO(png_bytes)) as png_image:
-                webp_buffer = io.BytesIO()
-                png_image.save(webp_buffer, "WEBP", quality=self.quality, method=6)
-
-            return webp_buffer.getvalue()
+            # Читаем результат в память
+            return output_path.read_bytes()
 
         finally:
             # Удаляем временные файлы (с небольшой задержкой для Windows)
@@ -159,13 +211,83 @@ class MermaidPreprocessor(Preprocessor):
 
             time.sleep(0.05)  # 50ms для освобождения файлов
 
-            for path in [tmp_path, png_path]:
+            for path in [tmp_path, output_path]:
                 try:
                     if path.exists():
                         path.unlink()
                 except PermissionError:
                     pass  # Игнорируем, система удалит позже
 
+    def _encode_diagram(self, png_bytes: bytes) -> tuple[bytes, str]:
+        """
+        PNG от mmdc → итоговый формат.
+
+        palette: диаграммы - плоская графика, палитра без потерь даёт файл
+        меньше и чёткий текст без артефактов lossy WebP. Если картинка
+        не плоская (градиенты, вставленные фото) - обычный lossy WebP.
+        """
+        from PIL import Image
+        import io
+
+        if self.encoder == "palette":
+            encoded = encode_palette(png_bytes)
+            if encoded is not None:
+                return encoded
+
+        # Конвертируем PNG -> WebP в памяти
+        with Image.open(io.BytesIO(png_bytes)) as png_image:
+            webp_buffer = io.BytesIO()
+            png_image.save(webp_buffer, "WEBP", quality=self.quality, method=6)
+
+        return webp_buffer.getvalue(), "webp"
+
+    def _svg_reference(self, diagram_code: str, current: int) -> str:
+        """
+        SVG диаграмма в Markdown.
+
+        EMBED: SVG встраивается в HTML как есть (raw блок Pandoc) - без
+        base64 и без растра, масштабируется без потерь.
+        COPY: сохраняется в media/diagram-<хеш>.svg.
+        """
+        if self.media_mode == "copy":
+            # Отдельный файл: префикс id по хешу - содержимое не зависит
+            # от позиции диаграммы в документе
+            digest = self._diagram_hash(diagram_code)
+            svg = self._render_svg(diagram_code, f"d{digest[:6]}-")
+            media_dir = self.output_dir / "media"
+            media_dir.mkdir(parents=True, exist_ok=True)
+            filename = f"diagram-{digest}.svg"
+            self.writer.write_text(media_dir / filename, svg)
+            self.diagrams.add(digest)
+            return f"\n![Mermaid Diagram {current}](media/{filename})\n"
+
+        # Встроенные SVG одной страницы: префикс по номеру (одинаковые
+        # диаграммы не должны делить id)
+        svg = self._render_svg(diagram_code, f"d{current}-")
+        return f'\n```{{=html}}\n<div class="mermaid">{svg}</div>\n```\n'
+
+    def _diagram_hash(self, diagram_code: str) -> str:
+        """
+        Хеш кода диаграммы и настроек рендера - имя файла диаграммы.
+
+        Имя по содержимому, а не по номеру: новая диаграмма в начале
+        документа не переименовывает все следующие (HTTP кеш, rsync,
+        кеш артефактов).
+        """
+        key = json.dumps(
+            [
+                diagram_code,
+                self.theme,
+                self.scale,
+                self.format,
+                self.quality,
+                self.encoder,
+                self.background,
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
     def process(self, content: str) -> str:
         """
         Обрабатывает все Mermaid блоки в документе.
@@ -199,17 +321,22 @@ class MermaidPreprocessor(Preprocessor):
             )
 
             try:
+                if self.format == "svg":
+                    return self._svg_reference(diagram_code, current)
+
                 # Рендерим в память
-                webp_bytes = self._render_diagram(diagram_code, current)
+                image_bytes, extension = self._render_diagram(diagram_code, current)
 
                 if self.media_mode == "copy":
                     # COPY: сохраняем в output_dir/media/
                     media_dir = self.output_dir / "media"
                     media_dir.mkdir(parents=True, exist_ok=True)
 
-                    filename = f"diagram_{current}.webp"
+                    digest = self._diagram_hash(diagram_code)
+                    filename = f"diagram-{digest}.{extension}"
                     filepath = media_dir / filename
-                    filepath.write_bytes(webp_bytes)
+                    self.writer.write_bytes(filepath, image_bytes)
+                    self.diagrams.add(digest)
 
                     # Ссылка на файл
                     return f"\n![Mermaid Diagram {current}](media/{filename})\n"
@@ -217,9 +344,17 @@ class MermaidPreprocessor(Preprocessor):
                     # EMBED: base64 напрямую в Markdown
                     import base64
 
-                    b64_data = base64.b64encode(webp_bytes).decode("ascii")
-                    data_uri = f"data:image/webp;base64,{b64_data}"
-                    return f"\n![Mermaid Diagram {current}]({data_uri})\n"
+                    b64_data = base64.b64encode(image_bytes).decode("ascii")
+                    data_uri = f"data:image/{extension};base64,{b64_data}"
+                    # data: URI MediaProcessor пропускает - размеры здесь
+                    size = image_size_from_bytes(image_bytes)
+                    attributes = ""
+                    if size and self.image_dimensions:
+                        attributes = (
+                            f'{{width="{size[0]}" height="{size[1]}" '
+                            'loading="lazy" decoding="async"}'
+                        )
+                    return f"\n![Mermaid Diagram {current}]({data_uri}){attributes}\n"
 
             except subprocess.CalledProcessError as e:
                 # Если рендеринг не удался - оставляем исходный блок с предупреждением
@@ -243,3 +378,53 @@ class MermaidPreprocessor(Preprocessor):
         )
 
         return content
+
+
+def prune_diagrams(output_dir: Path, output_name: str, diagrams: Iterable[str]) -> list[Path]:
+    """
+    Удаляет из media/ диаграммы прошлой сборки, на которые больше нет ссылок.
+
+    Имена диаграмм - по хешу содержимого, поэтому изменённая диаграмма
+    пишется новым файлом, а старый остаётся. Хеши диаграмм каждого
+    результата хранятся в <output_dir>/.<имя>.diagrams.json; удаляются
+    (вместе с копиями srcset и .gz/.br) только файлы из прошлой записи
+    этого результата, которых нет ни в текущей сборке, ни в записях
+    других документов той же папки (media/ у них общая).
+
+    Args:
+        output_dir: Папка результатов (в ней media/)
+        output_name: Имя результата
+        diagrams: Хеши диаграмм текущей сборки (MermaidPreprocessor.diagrams)
+
+    Returns:
+        Удалённые файлы
+    """
+    output_dir = Path(output_dir)
+    manifest = output_dir / f".{output_name}.diagrams.json"
+    current = set(diagrams)
+    previous = set(_load_diagrams(manifest))
+    if current or manifest.exists():
+        write_atomic(manifest, json.dumps(sorted(current)).encode("utf-8"))
+
+    stale = previous - current
+    for other in output_dir.glob(".*.diagrams.json"):
+        if stale and other != manifest:
+            stale -= set(_load_diagrams(other))
+
+    removed = []
+    media_dir = output_dir / "media"
+    for digest in sorted(stale):
+        # diagram-<хеш>.webp, diagram-<хеш>-480w.webp, diagram-<хеш>.svg.gz
+        for path in sorted(media_dir.glob(f"diagram-{digest}*")):
+            path.unlink(missing_ok=True)
+            removed.append(path)
+    if removed:
+        print(f"  🧹 Удалено старых файлов диаграмм: {len(removed)}", file=sys.stderr)
+    return removed
+
+
+def _load_diagrams(path: Path) -> list[str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
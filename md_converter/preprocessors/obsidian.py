@@ -3,6 +3,8 @@
 import re
 from pathlib import Path
 from typing import Optional
+
+from ..buildstamp import FileLookups
 from .base import Preprocessor
 
 
@@ -23,6 +25,8 @@ class ObsidianPreprocessor(Preprocessor):
     def __init__(self, base_path: Optional[Path] = None):
         """Args: base_path - базовая папка для поиска файлов (папка MD файла)."""
         self.base_path = base_path or Path.cwd()
+        # Проверенные пути и папки поиска вложений (штамп сборки)
+        self.lookups = FileLookups()
 
     def _find_attachment(self, filename: str) -> str:
         """Поиск файла в Obsidian attachment папках."""
@@ -37,25 +41,25 @@ class ObsidianPreprocessor(Preprocessor):
         ]
 
         for search_dir in search_dirs:
-            if not search_dir.exists():
+            if not self.lookups.exists(search_dir):
                 continue
 
             # Прямой поиск
             candidate = search_dir / filename
-            if candidate.exists():
+            if self.lookups.exists(candidate):
                 # ИСПРАВЛЕНИЕ БАГ #11: try/except для relative_to
                 try:
                     return str(candidate.relative_to(self.base_path))
                 except ValueError:
                     return str(candidate)  # Fallback на абсолютный путь
 
-            # Рекурсивный поиск (если файл в подпапках)
-            for file_path in search_dir.rglob(filename):
-                if file_path.is_file():
-                    try:
-                        return str(file_path.relative_to(self.base_path))
-                    except ValueError:
-                        return str(file_path)
+            # Рекурсивный поиск (если файл в подпапках; порядок обхода
+            # ФС не определён - lookups.rglob сортирует, выбор стабильный)
+            for file_path in self.lookups.rglob(search_dir, filename):
+                try:
+                    return str(file_path.relative_to(self.base_path))
+                except ValueError:
+                    return str(file_path)
 
         # Не найден - возвращаем оригинальное имя
         return filename
@@ -1,7 +1,22 @@
 """Процессоры для обработки контента."""
 
+from .css import CssOptimizer
+from .document import DocumentFeatures
+from .fonts import FontSubsetter
+from .image import ImageOptimizer
 from .media import MediaProcessor
-from .merger import MergerProcessor
+from .merger import Chapter, MergerProcessor
 from .template import TemplateProcessor
+from .video import VideoOptimizer
 
-__all__ = ["MediaProcessor", "MergerProcessor", "TemplateProcessor"]
+__all__ = [
+    "Chapter",
+    "CssOptimizer",
+    "DocumentFeatures",
+    "FontSubsetter",
+    "ImageOptimizer",
+    "MediaProcessor",
+    "MergerProcessor",
+    "TemplateProcessor",
+    "VideoOptimizer",
+]
@@ -0,0 +1,290 @@
+"""Отбор и минификация CSS для встраивания в HTML."""
+
+import hashlib
+import re
+import threading
+from typing import Optional
+from ..preprocessors.callouts import CalloutsPreprocessor
+from .document import DocumentFeatures
+
+# div.note, section.warning:hover > p ...
+_CALLOUT_SELECTOR_RE = re.compile(
+    r"(?:div|section)\.("
+    + "|".join(sorted(CalloutsPreprocessor.CALLOUT_TYPES, key=len, reverse=True))
+    + r")(?![\w-])"
+)
+
+# At-правила, внутри которых лежат обычные правила (их тоже чистим)
+_NESTED_AT_RULES = ("@media", "@supports", "@layer", "@container", "@document")
+
+# Результаты обработки: (sha1 CSS, callout-ы, mermaid, prune, minify) → CSS
+_CSS_CACHE: dict[tuple, str] = {}
+_CSS_CACHE_LOCK = threading.Lock()
+
+
+class CssOptimizer:
+    """
+    Удаляет правила неиспользуемых функций и минифицирует CSS.
+
+    Отбор работает по селекторам:
+    - `div.<type>` / `section.<type>` callout-ов, которых нет в документе;
+    - селекторы с `mermaid`, если в документе нет диаграмм.
+
+    Селектор из списка через запятую удаляется отдельно, правило целиком -
+    когда не осталось ни одного селектора. @media/@supports обрабатываются
+    рекурсивно, @font-face/@keyframes не трогаются.
+    """
+
+    def __init__(self, prune: bool = True, minify: bool = True):
+        """
+        Args:
+            prune: Удалять правила неиспользуемых функций
+            minify: Минифицировать результат
+        """
+        self.prune = prune
+        self.minify = minify
+
+    def process(self, css: str, document: Optional[DocumentFeatures] = None) -> str:
+        """
+        Обработать CSS текст (с кешированием результата).
+
+        Args:
+            css: Исходный CSS
+            document: Функции документа (None - отбор не выполняется)
+
+        Returns:
+            Обработанный CSS
+        """
+        prune = self.prune and document is not None
+        if not prune and not self.minify:
+            return css
+
+        key = (
+            hashlib.sha1(css.encode("utf-8")).hexdigest(),
+            # Только признаки, влияющие на отбор: общий кеш для разных уроков
+            (document.callout_types, document.has_mermaid) if prune else None,
+            prune,
+            self.minify,
+        )
+        with _CSS_CACHE_LOCK:
+            cached = _CSS_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        rules = _parse_rules(_strip_comments(css))
+        if prune:
+            rules = self._prune_rules(rules, document)
+        result = _serialize(rules, self.minify)
+
+        with _CSS_CACHE_LOCK:
+            _CSS_CACHE[key] = result
+        return result
+
+    def _prune_rules(self, rules: list, document: DocumentFeatures) -> list:
+        """Рекурсивно отбрасывает селекторы неиспользуемых функций."""
+        result = []
+        for prelude, body in rules:
+            if body is None or prelude.startswith("@"):
+                if isinstance(body, list) and prelude.lower().startswith(
+                    _NESTED_AT_RULES
+                ):
+                    body = self._prune_rules(body, document)
+                    if not body:
+                        continue
+                result.append((prelude, body))
+                continue
+
+            selectors = [
+                s for s in _split_top_level(prelude, ",") if self._is_used(s, document)
+            ]
+            if selectors:
+                result.append((", ".join(selectors), body))
+        return result
+
+    @staticmethod
+    def _is_used(selector: str, document: DocumentFeatures) -> bool:
+        """Нужен ли селектор для данного документа."""
+        for match in _CALLOUT_SELECTOR_RE.finditer(selector):
+            if match.group(1) not in document.callout_types:
+                return False
+        if not document.has_mermaid and "mermaid" in selector.lower():
+            return False
+        return True
+
+
+def _strip_comments(css: str) -> str:
+    """Удаляет /* комментарии */, не трогая строки."""
+    out = []
+    i = 0
+    n = len(css)
+    while i < n:
+        ch = css[i]
+        if ch in "\"'":
+            end = _skip_string(css, i)
+            out.append(css[i:end])
+            i = end
+        elif css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def _skip_string(text: str, start: int) -> int:
+    """Позиция сразу после строки в кавычках, начинающейся в start."""
+    quote = text[start]
+    i = start + 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == quote:
+            return i + 1
+        i += 1
+    return len(text)
+
+
+def _parse_rules(css: str) -> list:
+    """
+    Разбирает CSS в список (prelude, body).
+
+    body - строка деклараций, список вложенных правил (для @media и т.п.)
+    или None для at-правил без блока (@import, @charset).
+    """
+    rules = []
+    i = 0
+    n = len(css)
+    while i < n:
+        start = i
+        # Ищем начало блока или конец at-правила без блока
+        while i < n and css[i] not in "{;":
+            if css[i] in "\"'":
+                i = _skip_string(css, i)
+            else:
+                i += 1
+        prelude = css[start:i].strip()
+        if i >= n:
+            break
+        if css[i] == ";":
+            if prelude:
+                rules.append((prelude, None))
+            i += 1
+            continue
+
+        # Блок: ищем парную закрывающую скобку
+        depth = 0
+        body_start = i + 1
+        while i < n:
+            ch = css[i]
+            if ch in "\"'":
+                i = _skip_string(css, i)
+                continue
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    break
+            i += 1
+        body = css[body_start:i]
+        i += 1
+
+        if prelude.lower().startswith(_NESTED_AT_RULES) or (
+            prelude.startswith("@") and "{" in body
+        ):
+            # @media и т.п., а также @keyframes с блоками кадров
+            rules.append((prelude, _parse_rules(body)))
+        else:
+            rules.append((prelude, body))
+    return rules
+
+
+def _split_top_level(text: str, separator: str) -> list[str]:
+    """Делит по separator вне скобок и строк."""
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in "\"'":
+            i = _skip_string(text, i)
+            continue
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+        i += 1
+    tail = text[start:].strip()
+    if tail:
+        parts.append(tail)
+    return [p for p in parts if p]
+
+
+def _collapse_ws(text: str) -> str:
+    """Схлопывает пробелы вне строк."""
+    out = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch in "\"'":
+            end = _skip_string(text, i)
+            out.append(text[i:end])
+            i = end
+        elif ch.isspace():
+            while i < len(text) and text[i].isspace():
+                i += 1
+            out.append(" ")
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out).strip()
+
+
+def _minify_selector(selector: str) -> str:
+    """Убирает пробелы вокруг комбинаторов и запятых."""
+    selector = _collapse_ws(selector)
+    return re.sub(r"\s*([>~+,])\s*(?![^\[]*\])", r"\1", selector)
+
+
+def _minify_declarations(body: str) -> str:
+    """Минифицирует блок деклараций: `a: b;  c: d;` → `a:b;c:d`."""
+    declarations = []
+    for decl in _split_top_level(body, ";"):
+        name, sep, value = decl.partition(":")
+        if not sep:
+            declarations.append(_collapse_ws(decl))
+            continue
+        declarations.append(f"{name.strip()}:{_collapse_ws(value)}")
+    return ";".join(declarations)
+
+
+def _serialize(rules: list, minify: bool, indent: str = "") -> str:
+    """Собирает CSS обратно из разобранных правил."""
+    parts = []
+    for prelude, body in rules:
+        if minify:
+            if body is None:
+                parts.append(f"{_collapse_ws(prelude)};")
+            elif isinstance(body, list):
+                parts.append(f"{_collapse_ws(prelude)}{{{_serialize(body, True)}}}")
+            elif prelude.startswith("@"):
+                parts.append(f"{_collapse_ws(prelude)}{{{_minify_declarations(body)}}}")
+            else:
+                parts.append(
+                    f"{_minify_selector(prelude)}{{{_minify_declarations(body)}}}"
+                )
+        else:
+            if body is None:
+                parts.append(f"{indent}{prelude};")
+            elif isinstance(body, list):
+                inner = _serialize(body, False, indent + "  ")
+                parts.append(f"{indent}{prelude} {{\n{inner}\n{indent}}}")
+            else:
+                parts.append(f"{indent}{prelude} {{{body}}}")
+    return "".join(parts) if minify else "\n\n".join(parts)
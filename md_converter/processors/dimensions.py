@@ -0,0 +1,162 @@
+"""Размеры изображений из заголовков файлов (без декодирования и Pillow)."""
+
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Optional
+
+IMAGE_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".bmp", ".svg", ".tif", ".tiff"
+}
+
+# Сколько читать с начала файла: заголовки PNG/GIF/WebP - первые байты,
+# у JPEG размер (SOF) идёт после EXIF/ICC - обычно в первых десятках KB
+_HEAD_SIZE = 1 << 16
+
+# SOF маркеры JPEG (кроме DHT C4, JPG C8, DAC CC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_SVG_TAG_RE = re.compile(rb"<svg\b[^>]*>", re.IGNORECASE)
+_SVG_LENGTH_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(px)?\s*$")
+
+# (путь, размер, mtime) → размер: одна картинка в нескольких главах и
+# повторные сборки в одном процессе не читают файл снова
+_cache: dict[tuple[str, int, int], Optional[tuple[int, int]]] = {}
+_cache_lock = threading.Lock()
+
+
+def image_size(path: Path) -> Optional[tuple[int, int]]:
+    """
+    Ширина и высота изображения (с учётом поворота JPEG по EXIF).
+
+    Читаются только заголовки: PNG, GIF, JPEG, WebP, BMP, AVIF/HEIF, SVG.
+
+    Returns:
+        (ширина, высота) или None, если формат не распознан
+    """
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+
+    with open(path, "rb") as f:
+        head = f.read(_HEAD_SIZE)
+        size = image_size_from_bytes(head)
+        if size is None and head.startswith(b"\xff\xd8") and stat.st_size > _HEAD_SIZE:
+            # JPEG с большим EXIF (превью) - SOF дальше первого блока
+            f.seek(0)
+            size = image_size_from_bytes(f.read())
+
+    with _cache_lock:
+        _cache[key] = size
+    return size
+
+
+def image_size_from_bytes(data: bytes) -> Optional[tuple[int, int]]:
+    """Размер по началу файла (None - формат не распознан или мало данных)."""
+    try:
+        if data.startswith(b"\x89PNG\r\n\x1a\n"):
+            return struct.unpack_from(">II", data, 16)
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack_from("<HH", data, 6)
+        if data.startswith(b"\xff\xd8"):
+            return _jpeg_size(data)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _webp_size(data)
+        if data.startswith(b"BM"):
+            width, height = struct.unpack_from("<ii", data, 18)
+            return width, abs(height)
+        if data[4:8] == b"ftyp":
+            # AVIF/HEIF: свойство ispe (image spatial extents)
+            at = data.find(b"ispe")
+            if at != -1:
+                return struct.unpack_from(">II", data, at + 8)
+            return None
+        return _svg_size(data)
+    except struct.error:
+        return None
+
+
+def _jpeg_size(data: bytes) -> Optional[tuple[int, int]]:
+    """Размер из SOF; ориентации EXIF 5-8 меняют ширину и высоту местами."""
+    orientation = 1
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Заполнитель
+            pos += 1
+            continue
+        length = struct.unpack_from(">H", data, pos + 2)[0]
+        if marker == 0xE1 and data[pos + 4 : pos + 10] == b"Exif\0\0":
+            orientation = _exif_orientation(data[pos + 10 : pos + 2 + length])
+        elif marker in _JPEG_SOF:
+            height, width = struct.unpack_from(">HH", data, pos + 5)
+            if orientation in (5, 6, 7, 8):
+                return height, width
+            return width, height
+        pos += 2 + length
+    return None
+
+
+def _exif_orientation(tiff: bytes) -> int:
+    """Тег Orientation (0x0112) из IFD0 блока EXIF (1 - если нет)."""
+    try:
+        order = "<" if tiff[:2] == b"II" else ">"
+        ifd = struct.unpack_from(f"{order}I", tiff, 4)[0]
+        count = struct.unpack_from(f"{order}H", tiff, ifd)[0]
+        for index in range(count):
+            entry = ifd + 2 + index * 12
+            tag = struct.unpack_from(f"{order}H", tiff, entry)[0]
+            if tag == 0x0112:
+                return struct.unpack_from(f"{order}H", tiff, entry + 8)[0]
+    except struct.error:
+        pass
+    return 1
+
+
+def _webp_size(data: bytes) -> Optional[tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack_from("<I", data, 21)[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _svg_size(data: bytes) -> Optional[tuple[int, int]]:
+    """width/height корневого <svg> в px, иначе viewBox."""
+    match = _SVG_TAG_RE.search(data)
+    if match is None:
+        return None
+    tag = match.group().decode("utf-8", "replace")
+
+    def attr(name: str) -> Optional[str]:
+        found = re.search(rf"""\s{name}\s*=\s*["']([^"']*)["']""", tag)
+        return found.group(1) if found else None
+
+    lengths = [_SVG_LENGTH_RE.match(attr(name) or "") for name in ("width", "height")]
+    if all(lengths):
+        return tuple(round(float(length.group(1))) for length in lengths)
+    view_box = (attr("viewBox") or "").replace(",", " ").split()
+    if len(view_box) == 4:
+        try:
+            width, height = float(view_box[2]), float(view_box[3])
+        except ValueError:
+            return None
+        if width > 0 and height > 0:
+            return round(width), round(height)
+    return None
@@ -0,0 +1,101 @@
+"""Анализ документа: какие функции оформления реально используются."""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable
+
+# Расширения файлов, для которых нужен медиаплеер (Plyr)
+MEDIA_PLAYER_EXTENSIONS = (
+    ".mp4",
+    ".webm",
+    ".ogv",
+    ".mov",
+    ".m4v",
+    ".mp3",
+    ".wav",
+    ".ogg",
+    ".oga",
+    ".m4a",
+    ".flac",
+)
+
+# ::: note, ::: {.note}, :::: {.warning title="..."}
+_FENCED_DIV_RE = re.compile(r"^:{3,}[ \t]*\{?[ \t]*\.?([A-Za-z][\w-]*)", re.MULTILINE)
+# ```python, ~~~ {.python}, ``` py (после DiffPreprocessor: class="language-python")
+_CODE_FENCE_RE = re.compile(
+    r"^[ \t]*(?:`{3,}|~{3,})[ \t]*\{?[ \t]*\.?([\w+#-]+)", re.MULTILINE
+)
+_CODE_CLASS_RE = re.compile(r'class="language-([\w+#-]+)"')
+_MEDIA_LINK_RE = re.compile(
+    r"\]\([^)\s]+(?:" + "|".join(re.escape(e) for e in MEDIA_PLAYER_EXTENSIONS) + r")\)",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class DocumentFeatures:
+    """
+    Набор функций, найденных в Markdown после препроцессинга.
+
+    Используется для отбора CSS правил: стили callout-ов, diff блоков,
+    медиаплеера и Mermaid включаются только если документ их использует.
+    Языки code fences определяют состав вендорной сборки highlight.js.
+    """
+
+    callout_types: frozenset = frozenset()
+    has_diff: bool = False
+    has_media: bool = False
+    has_mermaid: bool = False
+    code_languages: frozenset = frozenset()
+
+    @classmethod
+    def detect(cls, content: str) -> "DocumentFeatures":
+        """
+        Анализирует Markdown (после Callouts/Diff/Mermaid препроцессоров).
+
+        Args:
+            content: Markdown текст
+
+        Returns:
+            Найденные функции
+        """
+        callout_types = frozenset(
+            name.lower() for name in _FENCED_DIV_RE.findall(content)
+        )
+
+        has_media = bool(
+            _MEDIA_LINK_RE.search(content)
+            or re.search(r"<(?:video|audio)\b", content, re.IGNORECASE)
+        )
+
+        code_languages = frozenset(
+            lang.lower()
+            for lang in _CODE_FENCE_RE.findall(content) + _CODE_CLASS_RE.findall(content)
+        )
+
+        return cls(
+            callout_types=callout_types,
+            has_diff='class="diff-wrapper"' in content,
+            has_media=has_media,
+            has_mermaid=(
+                "Mermaid Diagram" in content
+                or "```mermaid" in content
+                or '<div class="mermaid">' in content
+            ),
+            code_languages=code_languages,
+        )
+
+    @classmethod
+    def combine(cls, documents: Iterable["DocumentFeatures"]) -> "DocumentFeatures":
+        """
+        Объединение функций нескольких документов (главы формата site
+        делят один CSS/JS бандл).
+        """
+        documents = list(documents)
+        return cls(
+            callout_types=frozenset().union(*(d.callout_types for d in documents)),
+            has_diff=any(d.has_diff for d in documents),
+            has_media=any(d.has_media for d in documents),
+            has_mermaid=any(d.has_mermaid for d in documents),
+            code_languages=frozenset().union(*(d.code_languages for d in documents)),
+        )
@@ -0,0 +1,206 @@
+"""Подмножества шрифтов: только символы документа (EPUB, встроенный HTML)."""
+
+import hashlib
+import io
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+from ..cache import get_cache_dir, write_atomic
+from ..messages import warn_once
+
+FONT_EXTENSIONS = {".ttf", ".otf"}
+
+# Символы, которые появляются без явного ввода в тексте: ASCII (разметка
+# шаблона, номера строк), типографика Pandoc (smart: «“”», тире, …) и
+# подписи, которые генерирует Pandoc/JS (оглавление, кнопки)
+_BASE_TEXT = (
+    "".join(chr(code) for code in range(0x20, 0x7F))
+    + " «»“”„‘’‚–—…•·№©®™°±×÷→←↑↓"
+)
+
+# Версия алгоритма: меняется → старые записи кеша не используются
+_CACHE_VERSION = 1
+
+_hash_lock = threading.Lock()
+_font_hashes: dict[tuple[str, int, int], str] = {}
+
+
+class FontSubsetter:
+    """
+    Урезает шрифты до символов документа.
+
+    EPUB вшивает каждый TTF целиком (JetBrains Mono, Fira Code, Cascadia
+    Code, Montserrat, Noto Emoji - около 4.5 MB), встроенный HTML - тоже
+    через @font-face. Документу нужны сотни глифов из десятков тысяч.
+    Подмножество строится fontTools (с лигатурами и OpenType функциями
+    для найденных символов), для HTML сжимается в WOFF2 и кешируется по
+    (хеш шрифта, хеш набора символов). fontTools импортируется лениво -
+    без него шрифты вшиваются целиком.
+    """
+
+    def __init__(self, fonts_dir: Union[str, Path], cache_dir: Optional[Path] = None):
+        """
+        Args:
+            fonts_dir: Папка шрифтов (fonts.dir)
+            cache_dir: Папка кеша (по умолчанию get_cache_dir("fonts"))
+        """
+        self.fonts_dir = Path(fonts_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else get_cache_dir("fonts")
+
+    def subset_fonts(self, text: str, flavor: Optional[str] = None) -> dict[str, Path]:
+        """
+        Подмножества всех шрифтов папки для символов text.
+
+        Args:
+            text: Текст документа (Markdown, header, метаданные)
+            flavor: None - TTF/OTF (EPUB), "woff2" или "woff" (HTML)
+
+        Returns:
+            {имя исходного файла: путь к подмножеству в кеше}; {} - без
+            fontTools или шрифтов
+        """
+        fonts = sorted(
+            p for p in self.fonts_dir.glob("*") if p.suffix.lower() in FONT_EXTENSIONS
+        )
+        if not fonts:
+            return {}
+        try:
+            from fontTools import subset  # noqa: F401
+        except ImportError:
+            warn_once(
+                "fonttools",
+                "  ⚠️ fontTools не установлен: шрифты вшиваются целиком "
+                "(pip install fonttools brotli)",
+            )
+            return {}
+        flavor = _available_flavor(flavor)
+
+        codepoints = collect_codepoints(text)
+        glyph_set = hashlib.sha1(
+            ",".join(map(str, codepoints)).encode("ascii")
+        ).hexdigest()
+
+        subsets = {}
+        before = after = 0
+        for font in fonts:
+            try:
+                subsets[font.name] = self.subset(font, codepoints, glyph_set, flavor)
+            except Exception as e:
+                print(f"  ⚠️ Шрифт {font.name} не урезан: {e}", file=sys.stderr)
+                continue
+            before += font.stat().st_size
+            after += subsets[font.name].stat().st_size
+
+        if subsets:
+            from ..writer import format_size
+
+            print(
+                f"  🔤 Шрифты: {len(codepoints)} символов, "
+                f"{format_size(before)} → {format_size(after)}",
+                file=sys.stderr,
+            )
+        return subsets
+
+    def subset(
+        self, font: Path, codepoints: list[int], glyph_set: str, flavor: Optional[str]
+    ) -> Path:
+        """
+        Подмножество одного шрифта (с кешем).
+
+        Имя файла сохраняется (расширение - по flavor): CSS EPUB ссылается
+        на шрифты по имени.
+        """
+        params = (_CACHE_VERSION, _font_hash(font), glyph_set, flavor)
+        key = hashlib.sha1(repr(params).encode()).hexdigest()[:16]
+        suffix = f".{flavor}" if flavor else font.suffix
+        cached = self.cache_dir / key / (font.stem + suffix)
+        if cached.exists():
+            return cached
+        write_atomic(cached, _subset_bytes(font, codepoints, flavor))
+        return cached
+
+
+def collect_codepoints(text: str) -> list[int]:
+    """Отсортированные коды символов text и базового набора."""
+    return sorted({ord(char) for char in set(text) | set(_BASE_TEXT) if char >= " "})
+
+
+def _available_flavor(flavor: Optional[str]) -> Optional[str]:
+    """WOFF2 требует brotli - без него WOFF (zlib)."""
+    if flavor != "woff2":
+        return flavor
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        warn_once("brotli", "  ⚠️ brotli не установлен: шрифты в WOFF вместо WOFF2")
+        return "woff"
+    return flavor
+
+
+def _font_hash(font: Path) -> str:
+    """sha1 файла шрифта (в процессе - по пути, размеру и mtime)."""
+    stat = font.stat()
+    key = (str(font.resolve()), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if key not in _font_hashes:
+            _font_hashes[key] = hashlib.sha1(font.read_bytes()).hexdigest()
+        return _font_hashes[key]
+
+
+def _subset_bytes(font: Path, codepoints: list[int], flavor: Optional[str]) -> bytes:
+    """Подмножество через fontTools.subset."""
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = flavor
+    options.layout_features = ["*"]  # Лигатуры Fira Code/Cascadia, kern
+    options.name_IDs = ["*"]
+    options.name_languages = ["*"]
+    options.notdef_outline = True
+    options.recalc_timestamp = False  # Воспроизводимая сборка
+    loaded = subset.load_font(str(font), options)
+    try:
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(loaded)
+        buffer = io.BytesIO()
+        subset.save_font(loaded, buffer, options)
+        return buffer.getvalue()
+    finally:
+        loaded.close()
+
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""")
+
+
+def font_stylesheet(css_path: Path, fonts: dict[str, Path], target: Path) -> Path:
+    """
+    Копия CSS с подмножествами шрифтов для встроенного HTML.
+
+    Относительные url() становятся абсолютными (копия лежит в другой
+    папке), url() шрифтов из fonts указывают на подмножества в кеше.
+
+    Args:
+        css_path: Исходный CSS (assets/css/book_style.css)
+        fonts: {имя шрифта: путь к подмножеству} из subset_fonts
+        target: Куда записать копию
+
+    Returns:
+        target
+    """
+    base = Path(css_path).resolve().parent
+
+    def replace(match: re.Match) -> str:
+        url = match.group(2)
+        if ":" in url or url.startswith(("/", "#")):
+            return match.group(0)  # data:, http:, абсолютные - как есть
+        name = Path(url).name
+        path = fonts[name] if name in fonts else (base / url).resolve()
+        return f'url("{Path(path).resolve().as_posix()}")'
+
+    css = Path(css_path).read_text(encoding="utf-8")
+    target.write_text(_CSS_URL_RE.sub(replace, css), encoding="utf-8")
+    return target
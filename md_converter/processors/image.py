@@ -0,0 +1,378 @@
+"""Оптимизация растровых изображений: уменьшение, перекодирование, кеш."""
+
+import hashlib
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from ..cache import get_cache_dir, write_atomic
+from ..config import ImagesConfig
+from ..messages import warn_once
+from ..writer import format_size
+
+# Форматы, которые имеет смысл перекодировать (GIF может быть анимацией, SVG векторный)
+RASTER_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+
+# Формат конфига → (формат Pillow, расширение)
+_OUTPUT_FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "avif": ("AVIF", ".avif"),
+}
+_KEEP_FORMATS = {
+    ".png": ("PNG", ".png"),
+    ".jpg": ("JPEG", ".jpg"),
+    ".jpeg": ("JPEG", ".jpg"),
+    ".webp": ("WEBP", ".webp"),
+}
+
+# Версия алгоритма: меняется → старые записи кеша не используются
+_CACHE_VERSION = 1
+
+def _pillow_available() -> bool:
+    """
+    Установлен ли Pillow >= 9.1 (Image.Resampling, Image.Quantize,
+    Image.Dither). Старый Pillow - предупреждение, а не AttributeError
+    посреди сборки.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        warn_once(
+            "pil",
+            "  ⚠️ Pillow не установлен: изображения без оптимизации (pip install pillow)",
+        )
+        return False
+    if not hasattr(Image, "Resampling"):
+        warn_once(
+            "pil",
+            "  ⚠️ Нужен Pillow >= 9.1: изображения без оптимизации "
+            '(pip install -U "pillow>=9.1")',
+        )
+        return False
+    return True
+
+
+class ImageOptimizer:
+    """
+    Уменьшает изображения до max_width и перекодирует в WebP/AVIF.
+
+    Результат кешируется на диске по (хеш исходника, настройки), поэтому
+    повторная сборка не пережимает неизменённые скриншоты. Изображения
+    обрабатываются в пуле потоков: Pillow отпускает GIL при кодировании.
+    Pillow импортируется лениво - без него изображения остаются как есть.
+    """
+
+    def __init__(self, config: ImagesConfig, cache_dir: Optional[Path] = None):
+        """
+        Args:
+            config: Настройки оптимизации
+            cache_dir: Папка кеша (по умолчанию get_cache_dir("images"))
+        """
+        self.config = config
+        self.cache_dir = Path(cache_dir) if cache_dir else get_cache_dir("images")
+
+    def optimize_many(self, paths: Iterable[Path]) -> dict[Path, Path]:
+        """
+        Параллельная оптимизация.
+
+        Returns:
+            {исходный путь: путь к оптимизированному файлу} - только для
+            изображений, которые удалось уменьшить
+        """
+        candidates = list(
+            dict.fromkeys(p for p in paths if p.suffix.lower() in RASTER_EXTENSIONS)
+        )
+        if not candidates:
+            return {}
+
+        if not _pillow_available():
+            return {}
+
+        workers = self.config.workers or None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(self._optimize_safe, candidates)
+            return {
+                source: optimized
+                for source, optimized in zip(candidates, results)
+                if optimized is not None
+            }
+
+    def _optimize_safe(self, source: Path) -> Optional[Path]:
+        """optimize() без исключений: битое изображение не валит сборку."""
+        try:
+            return self.optimize(source)
+        except Exception as e:
+            print(f"  ⚠️ Не удалось оптимизировать {source.name}: {e}", file=sys.stderr)
+            return None
+
+    def variants_many(
+        self, bases: dict[Path, Path], widths: Iterable[int]
+    ) -> dict[Path, tuple[int, dict[int, Path]]]:
+        """
+        Уменьшенные копии для srcset (параллельно, с кешем).
+
+        Args:
+            bases: {исходник: основной файл страницы} (оптимизированный
+                или сам исходник) - копии делаются только уже основного
+            widths: Ширины копий
+
+        Returns:
+            {исходник: (ширина основного файла, {ширина: путь к копии})}
+        """
+        bases = {
+            source: base
+            for source, base in bases.items()
+            if source.suffix.lower() in RASTER_EXTENSIONS
+        }
+        if not bases:
+            return {}
+
+        if not _pillow_available():
+            return {}
+
+        base_widths: dict[Path, int] = {}
+        jobs: list[tuple[Path, int]] = []
+        for source, base in bases.items():
+            try:
+                base_widths[source] = image_width(base)
+            except Exception as e:
+                print(f"  ⚠️ Не удалось прочитать {base.name}: {e}", file=sys.stderr)
+                continue
+            jobs.extend(
+                (source, width)
+                for width in sorted(set(widths))
+                if 0 < width < base_widths[source]
+            )
+
+        results: dict[Path, tuple[int, dict[int, Path]]] = {
+            source: (width, {}) for source, width in base_widths.items()
+        }
+        with ThreadPoolExecutor(max_workers=self.config.workers or None) as pool:
+            paths = pool.map(lambda job: self._variant_safe(*job), jobs)
+            for (source, width), path in zip(jobs, paths):
+                if path is not None:
+                    results[source][1][width] = path
+        return results
+
+    def _variant_safe(self, source: Path, width: int) -> Optional[Path]:
+        """variant() без исключений."""
+        try:
+            return self.variant(source, width)
+        except Exception as e:
+            print(f"  ⚠️ Не удалось уменьшить {source.name}: {e}", file=sys.stderr)
+            return None
+
+    def optimize(self, source: Path) -> Optional[Path]:
+        """
+        Оптимизация одного изображения.
+
+        Returns:
+            Путь к файлу в кеше или None, если оригинал уже не больше результата
+        """
+        return self._convert(source, self.config.max_width, keep_original_if_smaller=True)
+
+    def variant(self, source: Path, width: int) -> Path:
+        """Копия шириной width для srcset (путь к файлу в кеше)."""
+        return self._convert(source, width, keep_original_if_smaller=False)
+
+    def _convert(
+        self, source: Path, max_width: int, keep_original_if_smaller: bool
+    ) -> Optional[Path]:
+        """Перекодирование с кешем по (хеш исходника, параметры результата)."""
+        data = source.read_bytes()
+        pil_format, extension = self._output_format(source)
+        digest = hashlib.sha1(data).hexdigest()
+        params = (
+            _CACHE_VERSION,
+            pil_format,
+            max_width,
+            self.config.quality,
+            self.config.strip_metadata,
+        )
+        settings = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+
+        cached = self.cache_dir / f"{digest}-{settings}{extension}"
+        skipped = self.cache_dir / f"{digest}-{settings}.skip"
+        if cached.exists():
+            return cached
+        if keep_original_if_smaller and skipped.exists():
+            return None
+
+        optimized = self._encode(data, pil_format, max_width)
+        if keep_original_if_smaller and len(optimized) >= len(data):
+            # Исходник уже меньше - запоминаем, чтобы не пережимать повторно
+            write_atomic(skipped, b"")
+            return None
+
+        write_atomic(cached, optimized)
+        if keep_original_if_smaller:
+            print(
+                f"  🖼️ {source.name}: {format_size(len(data))} → {format_size(len(optimized))}",
+                file=sys.stderr,
+            )
+        return cached
+
+    def _output_format(self, source: Path) -> tuple[str, str]:
+        """Формат Pillow и расширение результата."""
+        fmt = self.config.format.lower()
+        if fmt == "keep":
+            return _KEEP_FORMATS.get(source.suffix.lower(), ("PNG", ".png"))
+
+        if fmt == "avif":
+            from PIL import features
+
+            if not features.check("avif"):
+                warn_once("avif", "  ⚠️ Pillow собран без AVIF: используется WebP")
+                fmt = "webp"
+
+        if fmt not in _OUTPUT_FORMATS:
+            raise ValueError(f"Неизвестный формат изображений: {self.config.format}")
+        return _OUTPUT_FORMATS[fmt]
+
+    def _encode(self, data: bytes, pil_format: str, max_width: int) -> bytes:
+        """Уменьшение и перекодирование через Pillow."""
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(data)) as original:
+            icc_profile = original.info.get("icc_profile")
+            # Поворот по EXIF применяется к пикселям, иначе после удаления
+            # метаданных фото с телефона окажется на боку
+            image = ImageOps.exif_transpose(original)
+            exif = image.info.get("exif")
+
+            if max_width and image.width > max_width:
+                height = max(1, round(image.height * max_width / image.width))
+                image = image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+            image = _normalize_mode(image, pil_format)
+
+            options: dict = {"quality": self.config.quality}
+            if pil_format == "WEBP":
+                options["method"] = 6
+            elif pil_format == "PNG":
+                options = {"optimize": True}
+            elif pil_format == "JPEG":
+                options["optimize"] = True
+                options["progressive"] = True
+
+            if not self.config.strip_metadata:
+                if icc_profile:
+                    options["icc_profile"] = icc_profile
+                if exif and pil_format != "PNG":
+                    options["exif"] = exif
+
+            buffer = io.BytesIO()
+            image.save(buffer, format=pil_format, **options)
+            return buffer.getvalue()
+
+
+def encode_palette(png_bytes: bytes, max_colors: int = 256) -> Optional[tuple[bytes, str]]:
+    """
+    Кодирование плоской графики (диаграммы) палитрой без потерь.
+
+    Изображение квантуется до max_colors цветов и сохраняется как
+    lossless WebP и индексированный PNG - выбирается меньший. Усилие
+    кодировщика зависит от размера: method=6 на 4K рендере работает
+    секунды и почти не уменьшает файл.
+
+    Returns:
+        (данные, расширение "webp" | "png") или None, если изображение
+        не плоское (фото, градиенты) и палитра испортит его
+    """
+    from PIL import Image
+
+    if not hasattr(Image, "Quantize"):
+        return None  # Pillow < 9.1 - обычный WebP
+
+    with Image.open(io.BytesIO(png_bytes)) as source:
+        has_alpha = source.mode in ("RGBA", "LA") or "transparency" in source.info
+        image = source.convert("RGBA" if has_alpha else "RGB")
+
+    pixels = image.width * image.height
+    colors = _dominant_colors(image, pixels, max_colors)
+    if colors is None:
+        return None
+
+    if has_alpha:
+        # FASTOCTREE - единственный метод Pillow с поддержкой альфа-канала
+        quantized = image.quantize(
+            max_colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE
+        )
+    else:
+        # Палитра из самых частых цветов: фон и заливки почти точные,
+        # сглаживание краёв отображается в ближайший цвет. Pillow ищет
+        # цвет палитры по 6 старшим битам канала - соседние оттенки одной
+        # ячейки в палитре бесполезны, оставляем самый частый
+        buckets = {}
+        for _, (r, g, b) in colors:
+            buckets.setdefault((r >> 2, g >> 2, b >> 2), (r, g, b))
+        palette = Image.new("P", (1, 1))
+        palette.putpalette([channel for rgb in buckets.values() for channel in rgb])
+        quantized = image.quantize(palette=palette, dither=Image.Dither.NONE)
+
+    # Для палитровых изображений method=6/quality=100 в 10-40 раз медленнее
+    # method=4 и уменьшает файл на 1-2%; на больших рендерах экономим и quality
+    if pixels > 4_000_000:
+        webp_options = {"method": 4, "quality": 75}
+        png_options = {"compress_level": 6}
+    else:
+        webp_options = {"method": 4, "quality": 100}
+        png_options = {"optimize": True}
+
+    webp_buffer = io.BytesIO()
+    quantized.convert("RGBA" if has_alpha else "RGB").save(
+        webp_buffer, "WEBP", lossless=True, **webp_options
+    )
+    png_buffer = io.BytesIO()
+    quantized.save(png_buffer, "PNG", **png_options)
+
+    webp_bytes, png_bytes = webp_buffer.getvalue(), png_buffer.getvalue()
+    if len(png_bytes) < len(webp_bytes):
+        return png_bytes, "png"
+    return webp_bytes, "webp"
+
+
+def _dominant_colors(image, pixels: int, max_colors: int) -> Optional[list]:
+    """
+    Самые частые цвета, если графика плоская: max_colors цветов покрывают
+    почти все пиксели (остальное - сглаживание краёв текста и линий).
+
+    Returns:
+        [(число пикселей, цвет), ...] или None для фото и градиентов
+    """
+    colors = image.getcolors(maxcolors=1 << 16)
+    if colors is None:
+        return None
+    colors.sort(key=lambda item: item[0], reverse=True)
+    colors = colors[:max_colors]
+    if sum(count for count, _ in colors) < pixels * 0.98:
+        return None
+    return colors
+
+
+def image_width(path: Path) -> int:
+    """Ширина изображения с учётом поворота по EXIF (читается только заголовок)."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        # Ориентации 5-8: картинка повёрнута на 90°, ширина и высота меняются местами
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            return image.height
+        return image.width
+
+
+def _normalize_mode(image, pil_format: str):
+    """Цветовая модель, которую поддерживает целевой формат."""
+    has_alpha = image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+    if pil_format == "JPEG":
+        return image.convert("RGB") if image.mode != "RGB" else image
+    if pil_format == "PNG":
+        return image
+    if image.mode in ("RGB", "RGBA"):
+        return image
+    return image.convert("RGBA" if has_alpha else "RGB")
+
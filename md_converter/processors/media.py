@@ -1,11 +1,28 @@
 """Процессор для обработки медиа файлов (из main.py)."""
 
+import mimetypes
 import os
 import re
-import shutil
 import sys
+import threading
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Optional, Tuple, Union
+from urllib.parse import quote, unquote
+
+from ..buildstamp import FileLookups
+from ..config import HybridConfig
+from ..writer import OutputWriter
+from .dimensions import IMAGE_EXTENSIONS, image_size
+from .image import ImageOptimizer
+from .video import PreparedVideo, VideoOptimizer
+
+# Атрибут в блоке {key=value} Markdown или в HTML теге
+_ATTRIBUTE_RE = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'}>/]+))""")
+_PIXELS_RE = re.compile(r"(\d+)(?:px)?")  # Ширина в px: "300", "300px"
+
+# Главы формата site обрабатываются параллельно и копируют в общую media/:
+# один файл, упомянутый в двух главах, не должен копироваться одновременно
+_COPY_LOCK = threading.Lock()
 
 
 class MediaProcessor:
@@ -13,29 +30,63 @@ class MediaProcessor:
     Обрабатывает медиа файлы:
     - Режим EMBED: оставляет пути как есть (Pandoc встроит)
     - Режим COPY: копирует в ./media/, заменяет пути
+    - Режим HYBRID: небольшие файлы подходящих типов встраиваются,
+      остальные (видео лекций, большие картинки) копируются в ./media/
     """
 
     def __init__(
-        self, mode: str = "embed", files_folder: str = "", output_dir: str = "./build"
+        self,
+        mode: str = "embed",
+        files_folder: str = "",
+        output_dir: str = "./build",
+        image_optimizer: Optional[ImageOptimizer] = None,
+        copy_assets: bool = True,
+        writer: Optional[OutputWriter] = None,
+        hybrid: Optional[HybridConfig] = None,
+        video_optimizer: Optional[VideoOptimizer] = None,
+        image_dimensions: bool = True,
     ):
         """
         Args:
-            mode: "embed" или "copy"
+            mode: "embed", "copy" или "hybrid"
             files_folder: Папка для поиска медиа (Obsidian vault)
             output_dir: Папка для сохранения результатов (по умолчанию ./build)
+            image_optimizer: Оптимизация изображений (None = файлы как есть)
+            copy_assets: Копировать assets/ в режиме copy (формат site
+                собирает свои общие ассеты сам)
+            writer: Запись результатов (копия только при изменении)
+            hybrid: Пороги режима hybrid (None = по умолчанию)
+            video_optimizer: Подготовка копируемых видео (None = как есть)
+            image_dimensions: width/height из заголовка файла, loading="lazy"
+                и decoding="async" у изображений
         """
         self.mode = mode
         self.files_folder = Path(files_folder) if files_folder else None
         self.output_dir = Path(output_dir)
+        self.image_optimizer = image_optimizer
+        self.copy_assets = copy_assets
+        self.writer = writer or OutputWriter()
+        self.hybrid = hybrid or HybridConfig()
+        self.video_optimizer = video_optimizer
+        self.image_dimensions = image_dimensions
+        # Найденные исходные файлы медиа последнего process() и проверенные
+        # пути, где файла не было (штамп сборки)
+        self.sources: list[Path] = []
+        self.lookups = FileLookups()
 
     def process(self, content: str, input_path: Path) -> Tuple[str, dict]:
         """
         Обработать медиа в Markdown.
 
+        Этапы: поиск файлов → оптимизация изображений (параллельно,
+        с кешем) → копирование/замена путей.
+
         Returns:
             (обработанный_контент, media_map)
         """
         media_map = {}
+        self.sources = []
+        self.lookups = FileLookups()
         # Стандартный Markdown: ![alt](path)
         media_paths = re.findall(r"!\[.*?\]\((?!http)(.*?)\)", content)
         # HTML img теги (от ObsidianPreprocessor с |size): <img src="path" ...>
@@ -44,25 +95,27 @@ class MediaProcessor:
 
         if not media_paths:
             print("  ℹ️ Медиафайлы не найдены в MD", file=sys.stderr)
-            if self.mode == "copy":
+            if self.mode == "copy" and self.copy_assets:
                 self._copy_assets()
             return content, {}
 
         print(f"  🔍 Найдено {len(media_paths)} ссылок на медиа", file=sys.stderr)
 
         # Для COPY режима создаём папку media
+        media_dir = self.output_dir / "media"
         if self.mode == "copy":
-            media_dir = self.output_dir / "media"
             media_dir.mkdir(parents=True, exist_ok=True)
-            self._copy_assets()
+            if self.copy_assets:
+                self._copy_assets()
 
+        # 1. Поиск файлов
+        resolved: list[tuple[str, Path]] = []
+        seen = set()
         for media_path in media_paths:
             if not media_path:
                 continue
 
             # URL-декодирование пути (для "Pasted%20image%20...")
-            from urllib.parse import unquote
-
             decoded_path = unquote(media_path)
 
             # Пропускаем data URI (base64 встроенные изображения/шрифты)
@@ -73,89 +126,14 @@ class MediaProcessor:
             # Пропускаем уже обработанные пути (один файл упомянут несколько раз).
             # Без этого str.replace во второй итерации попадает в уже подставленный
             # абсолютный путь и задваивает его: C:/media/C:/media/hb_09.webp
-            if media_path in media_map:
+            if media_path in seen:
                 continue
+            seen.add(media_path)
 
-            # Определяем абсолютный путь к медиа-файлу
-            abs_path = None
-            search_locations = []  # Для логирования
-
-            if Path(decoded_path).is_absolute():
-                # Абсолютный путь - используем напрямую
-                abs_path = Path(decoded_path)
-                search_locations.append(f"абсолютный путь: {abs_path}")
-            elif "/" in decoded_path or "\\" in decoded_path:
-                # Относительный путь с подпапками (images/pic.png)
-                # Сначала пробуем files_folder (приоритет выше)
-                if self.files_folder:
-                    candidate = self.files_folder / decoded_path
-                    search_locations.append(f"files_folder: {candidate}")
-                    if candidate.exists():
-                        abs_path = candidate
-
-                # Если не нашли, пробуем относительно MD-файла
-                if abs_path is None:
-                    candidate = input_path.parent / decoded_path
-                    search_locations.append(f"input_path.parent: {candidate}")
-                    if candidate.exists():
-                        abs_path = candidate
-            else:
-                # Только имя файла (pic.png) - ищем в files_folder
-                if self.files_folder:
-                    candidate = self.files_folder / decoded_path
-                    search_locations.append(f"files_folder: {candidate}")
-                    if candidate.exists():
-                        abs_path = candidate
-
-                # Fallback: ищем относительно MD-файла
-                if abs_path is None:
-                    candidate = input_path.parent / decoded_path
-                    search_locations.append(f"input_path.parent: {candidate}")
-                    if candidate.exists():
-                        abs_path = candidate
-
-            # Обработка найденного файла
+            abs_path, search_locations = self._resolve_path(decoded_path, input_path)
             if abs_path and abs_path.exists():
-                if self.mode == "copy":
-                    # Копируем в media/
-                    target_path = media_dir / abs_path.name
-
-                    # Пропускаем если файл уже в целевой директории (созданный MermaidPreprocessor)
-                    if abs_path.resolve() == target_path.resolve():
-                        print(f"  📎 {abs_path.name} (уже в media/)", file=sys.stderr)
-                        new_path = f"media/{abs_path.name}"
-                        content = self._replace_media_path(
-                            content, media_path, new_path
-                        )
-                        media_map[media_path] = new_path
-                    else:
-                        shutil.copy2(abs_path, target_path)
-                        new_path = f"media/{abs_path.name}"
-                        content = self._replace_media_path(
-                            content, media_path, new_path
-                        )
-                        media_map[media_path] = new_path
-                        print(f"  📎 {abs_path.name}", file=sys.stderr)
-                        print(f"     ├─ источник: {abs_path}", file=sys.stderr)
-                        print(f"     └─ скопирован → {new_path}", file=sys.stderr)
-                else:
-                    # EMBED режим - заменяем на file:// URI для Pandoc
-                    # Абсолютный путь Windows (C:\...) Pandoc 3.x трактует как
-                    # относительный и задваивает путь при --embed-resources
-                    resolved = abs_path.resolve()
-                    # Используем путь с прямыми слэшами — Pandoc понимает C:/...
-                    # as_uri() URL-кодирует кириллицу → Pandoc не находит файл
-                    normalized_path = str(resolved).replace("\\", "/")
-                    content = self._replace_media_path(
-                        content, media_path, normalized_path
-                    )
-                    media_map[media_path] = normalized_path
-                    print(f"  📎 {abs_path.name}", file=sys.stderr)
-                    print(f"     ├─ источник: {abs_path}", file=sys.stderr)
-                    print(
-                        f"     └─ будет встроен (EMBED: {normalized_path})",
-                        file=sys.stderr,
-                    )
+                resolved.append((media_path, abs_path))
+                self.sources.append(abs_path)
             else:
                 # Файл не найден - выводим все места поиска
                 print(f"  ⚠️ НЕ НАЙДЕН: {decoded_path}", file=sys.stderr)
@@ -163,8 +141,235 @@ class MediaProcessor:
                 for location in search_locations:
                     print(f"     - {location}", file=sys.stderr)
 
+        # 2. Оптимизация изображений (кроме диаграмм MermaidPreprocessor в media/)
+        optimizer = self.image_optimizer
+        optimized: dict[Path, Path] = {}
+        if optimizer and optimizer.config.optimize and resolved:
+            media_dir_resolved = media_dir.resolve()
+            optimized = self.image_optimizer.optimize_many(
+                abs_path
+                for _, abs_path in resolved
+                if abs_path.resolve().parent != media_dir_resolved
+            )
+
+        # 2.1. Копируемые видео: moov в начало, постер (параллельно, с кешем)
+        videos: dict[Path, PreparedVideo] = {}
+        if self.video_optimizer and self.mode != "embed":
+            videos = self.video_optimizer.prepare_many(
+                abs_path for _, abs_path in resolved if not self._embeds(abs_path)
+            )
+
+        # 2.2. Уменьшенные копии для srcset (COPY: файлы лежат рядом с HTML).
+        # Диаграммы Mermaid тоже: они отрендерены с mermaid_scale для Retina
+        srcsets: dict[Path, tuple[int, dict[int, Path]]] = {}
+        if optimizer and optimizer.config.srcset_widths and self.mode == "copy":
+            srcsets = optimizer.variants_many(
+                {abs_path: optimized.get(abs_path, abs_path) for _, abs_path in resolved},
+                optimizer.config.srcset_widths,
+            )
+
+        # 3. Копирование и замена путей
+        with_srcset = set()
+        external = set()
+        posters: dict[str, str] = {}
+        sizes: dict[str, Optional[tuple[int, int]]] = {}
+        for media_path, abs_path in resolved:
+            source = optimized.get(abs_path, abs_path)
+            video = videos.get(abs_path)
+            if video is not None:
+                source = video.path
+
+            if not self._embeds(source):
+                # Копируем в media/ (оптимизированный файл - с новым расширением)
+                target_path = media_dir / (abs_path.stem + source.suffix)
+                new_path = f"media/{target_path.name}"
+
+                # Пропускаем если файл уже в целевой директории (созданный MermaidPreprocessor)
+                if source.resolve() == target_path.resolve():
+                    print(f"  📎 {abs_path.name} (уже в media/)", file=sys.stderr)
+                else:
+                    with _COPY_LOCK:
+                        self.writer.copy(source, target_path)
+                    print(f"  📎 {abs_path.name}", file=sys.stderr)
+                    print(f"     ├─ источник: {abs_path}", file=sys.stderr)
+                    if source is not abs_path:
+                        print(f"     └─ оптимизирован → {new_path}", file=sys.stderr)
+                    else:
+                        print(f"     └─ скопирован → {new_path}", file=sys.stderr)
+                if self.mode == "hybrid":
+                    external.add(new_path)
+                if video is not None and video.poster is not None:
+                    poster = target_path.with_name(f"{target_path.stem}.poster.jpg")
+                    with _COPY_LOCK:
+                        self.writer.copy(video.poster, poster)
+                    posters[new_path] = f"media/{poster.name}"
+            else:
+                # EMBED режим - заменяем на file:// URI для Pandoc
+                # Абсолютный путь Windows (C:\...) Pandoc 3.x трактует как
+                # относительный и задваивает путь при --embed-resources
+                resolved_path = source.resolve()
+                # Используем путь с прямыми слэшами — Pandoc понимает C:/...
+                # as_uri() URL-кодирует кириллицу → Pandoc не находит файл
+                new_path = str(resolved_path).replace("\\", "/")
+                print(f"  📎 {abs_path.name}", file=sys.stderr)
+                print(f"     ├─ источник: {abs_path}", file=sys.stderr)
+                print(
+                    f"     └─ будет встроен (EMBED: {new_path})",
+                    file=sys.stderr,
+                )
+
+            content = self._replace_media_path(content, media_path, new_path)
+            media_map[media_path] = new_path
+            if self.image_dimensions and source.suffix.lower() in IMAGE_EXTENSIONS:
+                sizes[new_path] = image_size(source)
+
+            if abs_path in srcsets and new_path not in with_srcset:
+                with_srcset.add(new_path)
+                srcset = self._copy_variants(target_path, *srcsets[abs_path])
+                content = self._add_image_attributes(
+                    content,
+                    new_path,
+                    {"srcset": srcset, "sizes": optimizer.config.sizes},
+                )
+
+        # Постер вместо чёрного прямоугольника; видео не грузится до Play
+        for new_path, poster in sorted(posters.items()):
+            content = self._add_image_attributes(
+                content, new_path, {"poster": quote(poster), "preload": "none"}
+            )
+
+        # Размеры из заголовка файла: страница не прыгает при загрузке картинок
+        for new_path, size in sorted(sizes.items()):
+            content = self._add_image_attributes(
+                content, new_path, _dimension_attributes(size)
+            )
+
+        # HYBRID: Pandoc --embed-resources пропускает элементы с data-external
+        for new_path in sorted(external):
+            content = self._add_image_attributes(content, new_path, {"data-external": "1"})
+
         return content, media_map
 
+    def _embeds(self, source: Path) -> bool:
+        """Встраивать ли файл: по режиму, а в hybrid - по размеру и типу."""
+        if self.mode != "hybrid":
+            return self.mode != "copy"
+        if source.stat().st_size > self.hybrid.embed_max_kb * 1024:
+            return False
+        suffix = source.suffix.lower()
+        mime_type = mimetypes.guess_type(source.name)[0] or ""
+        return any(
+            kind.lower() in (suffix, mime_type.split("/")[0])
+            for kind in self.hybrid.embed_types
+        )
+
+    def _copy_variants(
+        self, target_path: Path, base_width: int, variants: dict[int, Path]
+    ) -> str:
+        """
+        Копирует уменьшенные копии в media/ рядом с основным файлом.
+
+        Returns:
+            Значение srcset: "media/pic-480w.webp 480w, media/pic.webp 1600w"
+        """
+        entries = []
+        for width, variant in sorted(variants.items()):
+            name = f"{target_path.stem}-{width}w{variant.suffix}"
+            with _COPY_LOCK:
+                self.writer.copy(variant, target_path.parent / name)
+            entries.append(f"{quote(f'media/{name}')} {width}w")
+        # Основной файл - самый широкий вариант (он же src для fullscreen)
+        entries.append(f"{quote(f'media/{target_path.name}')} {base_width}w")
+        print(
+            f"     📐 srcset: {', '.join(e.rsplit(' ', 1)[1] for e in entries)}",
+            file=sys.stderr,
+        )
+        return ", ".join(entries)
+
+    @staticmethod
+    def _add_image_attributes(
+        content: str,
+        path: str,
+        attributes: Union[dict, Callable[[dict], dict]],
+    ) -> str:
+        """
+        Добавить атрибуты <img> к изображению path.
+
+        Markdown: ![alt](path) → ![alt](path){key="value"} (link_attributes
+        Pandoc, существующий блок {...} дополняется). HTML: <img src="path" ...>.
+        Уже заданные у изображения атрибуты не меняются. attributes - словарь
+        или функция (заданные атрибуты → добавляемые), если значения зависят
+        от заданных (высота по ширине из Obsidian ![[pic.png|300]]).
+        """
+        escaped = re.escape(path)
+        if callable(attributes):
+            build = attributes
+        else:
+            build = lambda existing: {  # noqa: E731
+                key: value for key, value in attributes.items() if key not in existing
+            }
+
+        def render(existing: Optional[str]) -> str:
+            added = build(_parse_attributes(existing or ""))
+            return " ".join(f'{key}="{value}"' for key, value in added.items())
+
+        def extend_markdown(match: re.Match) -> str:
+            existing = match.group(2)
+            rendered = render(existing)
+            if not rendered:
+                return match.group(0)
+            if existing is None:
+                return f"{match.group(1)}{{{rendered}}}"
+            return f"{match.group(1)}{{{existing[1:-1].strip()} {rendered}}}"
+
+        def extend_html(match: re.Match) -> str:
+            rendered = render(match.group(2))
+            if not rendered:
+                return match.group(0)
+            return f"{match.group(1)} {rendered}{match.group(2)}"
+
+        content = re.sub(
+            r"(!\[.*?\]\(" + escaped + r"\))(\{[^}]*\})?", extend_markdown, content
+        )
+        content = re.sub(r'(<img\s+src="' + escaped + r'")([^>]*)', extend_html, content)
+        return content
+
+    def _resolve_path(
+        self, decoded_path: str, input_path: Path
+    ) -> Tuple[Optional[Path], list[str]]:
+        """
+        Абсолютный путь к медиа-файлу.
+
+        Returns:
+            (путь или None, места поиска для логирования)
+        """
+        abs_path = None
+        search_locations = []  # Для логирования
+
+        if Path(decoded_path).is_absolute():
+            # Абсолютный путь - используем напрямую
+            abs_path = Path(decoded_path)
+            search_locations.append(f"абсолютный путь: {abs_path}")
+            self.lookups.exists(abs_path)
+            return abs_path, search_locations
+
+        # Относительный путь с подпапками (images/pic.png): сначала files_folder
+        # (приоритет выше), затем относительно MD-файла.
+        # Только имя файла (pic.png): так же - files_folder, fallback к MD-файлу
+        if self.files_folder:
+            candidate = self.files_folder / decoded_path
+            search_locations.append(f"files_folder: {candidate}")
+            if self.lookups.exists(candidate):
+                abs_path = candidate
+
+        if abs_path is None:
+            candidate = input_path.parent / decoded_path
+            search_locations.append(f"input_path.parent: {candidate}")
+            if self.lookups.exists(candidate):
+                abs_path = candidate
+
+        return abs_path, search_locations
+
     @staticmethod
     def _replace_media_path(content: str, old_path: str, new_path: str) -> str:
         """Заменить путь к медиа файлу в обоих форматах: markdown и HTML img."""
@@ -204,7 +409,7 @@ class MediaProcessor:
                 rel_path = css_file.relative_to(css_src)
                 dest_file = css_dest / rel_path
                 dest_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(css_file, dest_file)
+                self.writer.copy(css_file, dest_file)
             print("  📁 Скопированы CSS файлы (включая модули)", file=sys.stderr)
 
         # Копируем JS
@@ -216,7 +421,7 @@ class MediaProcessor:
                 rel_path = js_file.relative_to(js_src)
                 dest_file = js_dest / rel_path
                 dest_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(js_file, dest_file)
+                self.writer.copy(js_file, dest_file)
             print(f"  📁 Скопированы JS файлы", file=sys.stderr)
 
         # Копируем шрифты
@@ -226,7 +431,7 @@ class MediaProcessor:
             fonts_dest.mkdir(parents=True, exist_ok=True)
             for font_file in fonts_src.glob("*"):
                 if font_file.is_file():
-                    shutil.copy2(font_file, fonts_dest / font_file.name)
+                    self.writer.copy(font_file, fonts_dest / font_file.name)
             print(f"  📁 Скопированы шрифты", file=sys.stderr)
 
         # Копируем templates (если нужны)
@@ -235,5 +440,38 @@ class MediaProcessor:
             templates_dest = assets_dest / "templates"
             templates_dest.mkdir(parents=True, exist_ok=True)
             for template_file in templates_src.glob("*.html"):
-                shutil.copy2(template_file, templates_dest / template_file.name)
+                self.writer.copy(template_file, templates_dest / template_file.name)
             print(f"  📁 Скопированы HTML шаблоны", file=sys.stderr)
+
+
+def _parse_attributes(text: str) -> dict[str, str]:
+    """key=value из блока {...} Markdown или из тега <img ...>."""
+    return {
+        match.group(1).lower(): next(g for g in match.groups()[1:] if g is not None)
+        for match in _ATTRIBUTE_RE.finditer(text)
+    }
+
+
+def _dimension_attributes(size: Optional[tuple[int, int]]) -> Callable[[dict], dict]:
+    """
+    width/height (против скачков вёрстки), loading="lazy", decoding="async".
+
+    Заданную ширину в px (Obsidian ![[pic.png|300]]) дополняет высотой в
+    той же пропорции; ширину в % или только высоту не трогает.
+    """
+
+    def build(existing: dict) -> dict:
+        added = {}
+        if size is not None:
+            width, height = size
+            given = _PIXELS_RE.fullmatch(existing.get("width", ""))
+            if "width" not in existing and "height" not in existing:
+                added = {"width": width, "height": height}
+            elif given and "height" not in existing and width:
+                added = {"height": round(int(given.group(1)) * height / width)}
+        for key, value in (("loading", "lazy"), ("decoding", "async")):
+            if key not in existing:
+                added[key] = value
+        return added
+
+    return build
@@ -1,11 +1,27 @@
 """Процессор для склейки MD файлов из папки."""
 
 import os
+import re
 import sys
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Union
 from natsort import natsorted
 
+_H1_RE = re.compile(r"^#[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+# "# комментарий" в ```bash блоке - не заголовок
+_CODE_FENCE_RE = re.compile(r"^(`{3,}|~{3,}).*?^\1", re.MULTILINE | re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Chapter:
+    """Глава: один MD файл папки (формат site)."""
+
+    title: str  # Первый заголовок H1 или имя файла
+    slug: str  # Имя страницы без расширения: 01-введение
+    content: str
+    source: Path
+
 
 class MergerProcessor:
     """Склеивает Markdown файлы из папки в один документ."""
@@ -29,8 +45,7 @@ class MergerProcessor:
 
         elif input_path.is_dir():
             # Папка с файлами
-            md_files = [f for f in input_path.glob("*.md")]
-            sorted_files = natsorted(md_files, key=lambda f: f.name)
+            sorted_files = self.list_inputs(input_path)
 
             print(f"--- Сшиваем файлы ({len(sorted_files)} шт) ---", file=sys.stderr)
             merged_content = []
@@ -44,3 +59,48 @@ class MergerProcessor:
 
         else:
             raise ValueError(f"Путь не существует: {input_path}")
+
+    def merge_chapters(self, input_path: Union[str, Path]) -> list[Chapter]:
+        """
+        Читает MD файлы с сохранением границ глав (файл = глава).
+
+        Args:
+            input_path: Путь к файлу или папке
+
+        Returns:
+            Главы в порядке natsort (для файла - одна глава)
+        """
+        files = self.list_inputs(input_path)
+
+        print(f"--- Главы ({len(files)} шт) ---", file=sys.stderr)
+        chapters = []
+        for index, file_path in enumerate(files, start=1):
+            print(f"  • {file_path.name}", file=sys.stderr)
+            content = file_path.read_text(encoding="utf-8")
+            heading = _H1_RE.search(_CODE_FENCE_RE.sub("", content))
+            title = heading.group(1).strip() if heading else file_path.stem
+            slug = f"{index:02d}-{_slugify(file_path.stem)}"
+            chapters.append(Chapter(title, slug, content, file_path))
+        return chapters
+
+    @staticmethod
+    def list_inputs(input_path: Union[str, Path]) -> list[Path]:
+        """
+        MD файлы сборки: сам файл или файлы папки в естественном
+        порядке (2 < 10).
+
+        Raises:
+            ValueError: Путь не существует
+        """
+        input_path = Path(input_path)
+        if input_path.is_file():
+            return [input_path]
+        if input_path.is_dir():
+            return natsorted(input_path.glob("*.md"), key=lambda f: f.name)
+        raise ValueError(f"Путь не существует: {input_path}")
+
+
+def _slugify(name: str) -> str:
+    """Имя файла страницы: буквы (включая кириллицу), цифры и дефисы."""
+    slug = re.sub(r"[^\w]+", "-", name.lower()).strip("-_")
+    return slug or "chapter"
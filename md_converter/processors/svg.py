@@ -0,0 +1,214 @@
+"""Минификация SVG (диаграммы Mermaid) для встраивания прямо в HTML."""
+
+import re
+from collections import Counter
+
+from .css import CssOptimizer
+
+# Комментарии, <style> и теги - всё остальное текст
+_TOKEN_RE = re.compile(r"(<!--.*?-->|<style\b[^>]*>.*?</style>|<[^>]+>)", re.DOTALL)
+_STYLE_BLOCK_RE = re.compile(r"(<style\b[^>]*>)(.*?)(</style>)", re.DOTALL)
+_STRIP_RE = re.compile(
+    r"<\?xml.*?\?>|<!DOCTYPE[^>]*>|<metadata\b.*?</metadata>|<desc\b[^>]*>\s*</desc>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+_ID_ATTR_RE = re.compile(r'(\sid=")([^"]+)(")')
+_HREF_RE = re.compile(r'((?:xlink:)?href="#)([^"]+)(")')
+_URL_REF_RE = re.compile(r"(url\(\s*['\"]?#)([^'\")\s]+)")
+_ARIA_REF_RE = re.compile(r'(\saria-(?:labelledby|describedby)=")([^"]+)(")')
+_CSS_ID_RE = re.compile(r"#(-?[A-Za-z_][\w-]*)")
+_STYLE_ATTR_RE = re.compile(r'\sstyle="([^"]*)"')
+_CLASS_ATTR_RE = re.compile(r'(\sclass=")([^"]*)(")')
+# Координаты: 123.456789 → 123.457
+_LONG_NUMBER_RE = re.compile(r"-?\d+\.\d{4,}")
+
+# Внутри этих элементов пробелы между тегами видимы
+_TEXT_ELEMENTS = ("text", "foreignObject")
+
+
+class SvgMinifier:
+    """
+    Минифицирует SVG от mmdc для встраивания в HTML без base64.
+
+    - удаляет XML пролог, комментарии, <metadata>;
+    - сокращает id и переписывает ссылки на них (href, url(#), CSS).
+      Префикс id уникален для диаграммы: несколько встроенных SVG на одной
+      странице иначе делят id="my-svg" и стили одной перекрашивают другую;
+    - повторяющиеся style="..." выносит в классы;
+    - минифицирует <style> (CssOptimizer), округляет координаты,
+      схлопывает пробелы.
+    """
+
+    def __init__(self, id_prefix: str = "m"):
+        """
+        Args:
+            id_prefix: Префикс id (начинается с буквы), например "d1-"
+        """
+        self.id_prefix = id_prefix
+
+    def process(self, svg: str) -> str:
+        """Минифицированный SVG."""
+        svg = _STRIP_RE.sub("", svg)
+        svg = self._rename_ids(svg)
+        svg = self._hoist_styles(svg)
+
+        css_optimizer = CssOptimizer(prune=False, minify=True)
+        parts = []
+        text_depth = 0
+        for token in _TOKEN_RE.split(svg):
+            if not token:
+                continue
+            if token.startswith("<!--"):
+                continue
+            if token.startswith("<style"):
+                match = _STYLE_BLOCK_RE.match(token)
+                parts.append(
+                    match.group(1) + css_optimizer.process(match.group(2)) + match.group(3)
+                )
+            elif token.startswith("<"):
+                parts.append(_minify_tag(token))
+                text_depth += _text_depth_delta(token)
+            elif text_depth > 0:
+                parts.append(re.sub(r"\s+", " ", token))
+            elif token.strip():
+                parts.append(re.sub(r"\s+", " ", token).strip())
+
+        result = "".join(parts)
+        if "xlink:" not in result.replace('xmlns:xlink="', ""):
+            result = re.sub(r'\sxmlns:xlink="[^"]*"', "", result)
+        return result
+
+    def _rename_ids(self, svg: str) -> str:
+        """Короткие уникальные id: my-svg → d1-a, flowchart-A-0 → d1-b."""
+        ids = {}
+        for match in _ID_ATTR_RE.finditer(svg):
+            if match.group(2) not in ids:
+                ids[match.group(2)] = f"{self.id_prefix}{_short_name(len(ids))}"
+        if not ids:
+            return svg
+
+        def rename(match: re.Match) -> str:
+            return match.group(1) + ids.get(match.group(2), match.group(2)) + match.group(3)
+
+        def rename_list(match: re.Match) -> str:
+            names = " ".join(ids.get(name, name) for name in match.group(2).split())
+            return match.group(1) + names + match.group(3)
+
+        def rename_url(match: re.Match) -> str:
+            return match.group(1) + ids.get(match.group(2), match.group(2))
+
+        def rename_css(match: re.Match) -> str:
+            # Цвета (#fff, #ececff) не совпадают с id и не меняются
+            name = match.group(1)
+            return f"#{ids[name]}" if name in ids else match.group(0)
+
+        def rename_tag(match: re.Match) -> str:
+            tag = match.group(0)
+            tag = _ID_ATTR_RE.sub(rename, tag)
+            tag = _HREF_RE.sub(rename, tag)
+            tag = _URL_REF_RE.sub(rename_url, tag)
+            return _ARIA_REF_RE.sub(rename_list, tag)
+
+        def rename_style(match: re.Match) -> str:
+            css = _CSS_ID_RE.sub(rename_css, match.group(2))
+            css = _URL_REF_RE.sub(rename_url, css)
+            return match.group(1) + css + match.group(3)
+
+        svg = _STYLE_BLOCK_RE.sub(rename_style, svg)
+        return re.sub(r"<(?!style\b)[^>]+>", rename_tag, svg)
+
+    def _hoist_styles(self, svg: str) -> str:
+        """
+        Повторяющиеся style="..." → класс и правило в <style>.
+
+        Правило `#<id svg> .класс{...!important}` ставится в начало <style>:
+        как и inline стиль, оно перекрывает обычные правила Mermaid, а
+        !important правила classDef (та же специфичность, идут позже)
+        по-прежнему перекрывают его. Стили с !important не выносятся.
+        """
+        counts = Counter(
+            value.strip()
+            for value in _STYLE_ATTR_RE.findall(svg)
+            if value.strip() and "!important" not in value
+        )
+        repeated = [value for value, count in counts.items() if count > 1]
+
+        root = re.search(r"<svg\b[^>]*>", svg)
+        root_id = _ID_ATTR_RE.search(root.group(0)) if root else None
+        if not repeated or root_id is None:
+            return re.sub(r'\sstyle="\s*"', "", svg)
+
+        classes = {value: f"{self.id_prefix}s{_short_name(i)}" for i, value in enumerate(repeated)}
+
+        def replace_style(match: re.Match) -> str:
+            tag = match.group(0)
+            style = _STYLE_ATTR_RE.search(tag)
+            if style is None:
+                return tag
+            value = style.group(1).strip()
+            if not value:
+                return tag[: style.start()] + tag[style.end() :]
+            if value not in classes:
+                return tag
+            tag = tag[: style.start()] + tag[style.end() :]
+            if _CLASS_ATTR_RE.search(tag):
+                return _CLASS_ATTR_RE.sub(
+                    lambda m: f"{m.group(1)}{m.group(2)} {classes[value]}{m.group(3)}",
+                    tag,
+                    count=1,
+                )
+            end = -2 if tag.endswith("/>") else -1
+            return f'{tag[:end]} class="{classes[value]}"{tag[end:]}'
+
+        # Корневой <svg> не трогаем: его style (max-width) уникален
+        head, body = svg[: root.end()], svg[root.end() :]
+        body = re.sub(r"<(?!style\b)[^>]+>", replace_style, body)
+
+        rules = "".join(
+            f"#{root_id.group(2)} .{cls}{{{_important(value)}}}"
+            for value, cls in classes.items()
+        )
+        if "<style" in body:
+            body = re.sub(r"(<style\b[^>]*>)", lambda m: m.group(1) + rules, body, count=1)
+        else:
+            body = f"<style>{rules}</style>{body}"
+        return head + body
+
+
+def _minify_tag(tag: str) -> str:
+    """Пробелы между атрибутами, лишние знаки в координатах."""
+    tag = re.sub(r"\s+", " ", tag)
+    tag = re.sub(r"\s*(/?>)$", r"\1", tag)
+    tag = _LONG_NUMBER_RE.sub(
+        lambda m: f"{float(m.group(0)):.3f}".rstrip("0").rstrip("."), tag
+    )
+    return tag
+
+
+def _text_depth_delta(tag: str) -> int:
+    """+1 на открытие <text>/<foreignObject>, -1 на закрытие."""
+    match = re.match(r"<(/?)([\w:-]+)", tag)
+    if not match or match.group(2) not in _TEXT_ELEMENTS or tag.endswith("/>"):
+        return 0
+    return -1 if match.group(1) else 1
+
+
+def _important(declarations: str) -> str:
+    """fill:#f9f;stroke:#333 → fill:#f9f!important;stroke:#333!important"""
+    return ";".join(
+        f"{declaration.strip()}!important"
+        for declaration in declarations.split(";")
+        if declaration.strip()
+    )
+
+
+def _short_name(number: int) -> str:
+    """0 → a, 25 → z, 26 → ba ... (только буквы: id и классы короткие)."""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    result = letters[number % 26]
+    number //= 26
+    while number:
+        result = letters[number % 26] + result
+        number //= 26
+    return result
@@ -1,8 +1,121 @@
 """Процессор для работы с HTML шаблонами."""
 
+import hashlib
+import re
+import shutil
 import sys
+import threading
+from dataclasses import astuple
 from pathlib import Path
-from ..config import FeaturesConfig, StylesConfig
+from typing import Optional
+from ..cache import write_atomic
+from ..config import FeaturesConfig, OptimizeConfig, StylesConfig
+from ..postprocessors.highlight import pygments_available
+from .css import CssOptimizer
+from .document import DocumentFeatures
+from .vendor import HLJS_VERSION, PLYR_VERSION, VendorAssets
+
+# Корень проекта (где находится папка assets)
+_PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Кеши общие для всех экземпляров TemplateProcessor: при batch-сборке
+# и в MCP сервере каждый Converter создаёт свой процессор, а ассеты одни.
+# _HEADER_CACHE: ключ → (подпись mtime ассетов, готовый header)
+# _BUNDLE_CACHE: ключ → (подпись mtime ассетов, (css, js, head) бандла)
+# _ASSET_CACHE: (путь, вид) → (mtime_ns, подготовленный текст)
+_HEADER_CACHE: dict[tuple, tuple[tuple, str]] = {}
+_BUNDLE_CACHE: dict[tuple, tuple[tuple, tuple[str, str, str]]] = {}
+_ASSET_CACHE: dict[tuple[Path, str], tuple[int, str]] = {}
+_CACHE_LOCK = threading.Lock()
+
+# Общий бандл (write_bundle): стили книги + модули функций + навигация site.
+# @import в book_style.css убирается - модули и так входят в бандл
+_BUNDLE_CSS_PREFIX = ["assets/css/book_style.css"]
+_BUNDLE_CSS_SUFFIX = ["assets/css/modules/site.css"]
+_CSS_IMPORT_RE = re.compile(r"^@import[^;]*;[ \t]*\n?", re.MULTILINE)
+
+# Инициализация всех модулей сразу после загрузки DOM
+_EAGER_INIT_JS = """// Инициализация всех модулей после загрузки DOM
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('🚀 Initializing MD-to-HTML features...');
+    
+    // Инициализация функций (если они определены)
+    if (typeof addCodeCopyButtons === 'function') addCodeCopyButtons();
+    if (typeof enableFullscreenMedia === 'function') enableFullscreenMedia();
+    if (typeof initDynamicBreadcrumbs === 'function') initDynamicBreadcrumbs();
+    if (typeof smoothScrollTOC === 'function') smoothScrollTOC();
+    
+    // Инициализация Plyr медиаплеера
+    if (typeof Plyr !== 'undefined') {
+        const players = Plyr.setup('.plyr-video, .plyr-audio, video, audio', {
+            controls: ['play-large', 'play', 'progress', 'current-time', 
+                       'duration', 'mute', 'volume', 'settings', 'fullscreen'],
+            settings: ['quality', 'speed'],
+            speed: { selected: 1, options: [0.5, 0.75, 1, 1.25, 1.5, 2] }
+        });
+        console.log('🎬 Initialized ' + players.length + ' Plyr instances');
+    } else {
+        console.warn('⚠️ Plyr library not loaded');
+    }
+    
+    console.log('✅ All features initialized');
+});
+"""
+
+# Ленивая инициализация: тяжёлые функции (копирование кода, подсветка,
+# fullscreen, Plyr) настраиваются только для элементов у viewport
+_LAZY_INIT_JS = """// Инициализация модулей после загрузки DOM (lazy hydration)
+document.addEventListener('DOMContentLoaded', function() {
+    // Навигация нужна сразу
+    if (typeof initDynamicBreadcrumbs === 'function') initDynamicBreadcrumbs();
+    if (typeof smoothScrollTOC === 'function') smoothScrollTOC();
+
+    const hydrators = [];
+    if (typeof addCodeCopyButton === 'function') {
+        hydrators.push({ selector: 'pre:not(.mermaid)', hydrate: addCodeCopyButton });
+    }
+    if (typeof hljs !== 'undefined') {
+        hydrators.push({
+            selector: 'pre code:not(.hljs)',
+            hydrate: function(el) { hljs.highlightElement(el); }
+        });
+    }
+    if (typeof initFullscreenContainer === 'function') {
+        initFullscreenContainer();
+        hydrators.push({ selector: 'img:not(.no-fullscreen)', hydrate: attachFullscreenToImage });
+        hydrators.push({ selector: '.mermaid', hydrate: attachMermaidClickHandler });
+    }
+    if (typeof Plyr !== 'undefined' && typeof setupPlyrPlayer === 'function') {
+        hydrators.push({
+            selector: '.plyr-video, .plyr-audio, video, audio',
+            hydrate: setupPlyrPlayer
+        });
+    }
+
+    initLazyHydration(hydrators);
+});
+"""
+
+
+def clear_header_cache():
+    """Сбросить кеш header-бандлов и прочитанных ассетов."""
+    with _CACHE_LOCK:
+        _HEADER_CACHE.clear()
+        _BUNDLE_CACHE.clear()
+        _ASSET_CACHE.clear()
+
+
+def _inline_script(code: str) -> str:
+    """Экранирует </script внутри встраиваемого JS."""
+    return code.replace("</script", "<\\/script")
+
+
+def _asset_mtime(path: Path) -> Optional[int]:
+    """mtime файла в наносекундах или None если файла нет."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
 
 
 class TemplateProcessor:
@@ -14,25 +127,42 @@ class TemplateProcessor:
         features: FeaturesConfig,
         styles: StylesConfig,
         media_mode: str = "embed",
+        optimize: Optional[OptimizeConfig] = None,
     ):
         """
         Args:
             template: "book" или "web"
             features: Конфигурация функций
             styles: Конфигурация стилей (темы)
-            media_mode: "embed" (inline CSS) или "copy" (ссылки на CSS)
+            media_mode: "embed"/"hybrid" (inline CSS) или "copy" (ссылки на CSS)
+            optimize: Настройки оптимизации (отбор/минификация CSS)
         """
         self.template = template
         self.features = features
         self.styles = styles
         self.media_mode = media_mode
+        self.optimize = optimize or OptimizeConfig()
+        self.css_optimizer = CssOptimizer(
+            prune=self.optimize.css_prune, minify=self.optimize.css_minify
+        )
+        self.vendor = VendorAssets() if self.optimize.vendor_assets else None
+        # Подсветка при сборке: скрипт highlight.js не нужен, только тема
+        self.build_highlight = styles.highlight_mode == "build" and pygments_available()
 
-    def build_header(self, format_type: str) -> str:
+    def build_header(
+        self, format_type: str, document: Optional[DocumentFeatures] = None
+    ) -> str:
         """
         Генерирует HTML header для Pandoc --include-in-header.
 
+        Результат кешируется на уровне модуля по ключу
+        (template, features, styles, media_mode, format_type) и
+        инвалидируется при изменении mtime любого используемого ассета.
+
         Args:
             format_type: "html" или "epub"
+            document: Функции документа для отбора CSS (optimize.css_prune)
+                и состава вендорного highlight.js (optimize.vendor_assets)
 
         Returns:
             HTML код для вставки в <head>
@@ -40,6 +170,216 @@ class TemplateProcessor:
         if format_type == "epub":
             return ""  # EPUB не нужен header
 
+        css_document = document if self._prunes_css() else None
+        vendor_document = document if self.vendor else None
+
+        css_files = self._get_css_files(css_document)
+        js_modules = self._get_js_modules()
+
+        key = self._cache_key(format_type, css_document, vendor_document)
+        signature = tuple(
+            (path, _asset_mtime(_PROJECT_ROOT / path))
+            for path in css_files + js_modules
+        )
+
+        with _CACHE_LOCK:
+            cached = _HEADER_CACHE.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        self._vendor_fallback = False
+        header = self._render_header(
+            css_files, js_modules, css_document, vendor_document
+        )
+
+        # Header с CDN-ссылками вместо недоступных вендорных файлов
+        # не кешируем: при следующей сборке кеш может уже заполниться
+        if not self._vendor_fallback:
+            with _CACHE_LOCK:
+                _HEADER_CACHE[key] = (signature, header)
+        return header
+
+    def write_bundle(
+        self, output_dir: Path, document: Optional[DocumentFeatures] = None
+    ) -> str:
+        """
+        Общий бандл для нескольких страниц в одной папке: один
+        минифицированный assets/css/app.<hash>.css и assets/js/app.<hash>.js.
+
+        Имя содержит хеш содержимого: файл пишется, только если его ещё нет
+        (уроки с одинаковым набором функций делят один файл, браузер кеширует
+        его между страницами). Лежит в assets/css/, чтобы относительные
+        url("../fonts/...") продолжали работать; шрифты копируются в
+        assets/fonts/ только отсутствующие.
+
+        Args:
+            output_dir: Папка с HTML страницами
+            document: Функции документа (с css_prune - отбор правил;
+                для site - объединение всех глав)
+
+        Returns:
+            HTML для <head> каждой страницы (ссылки на бандл, CDN)
+        """
+        css_document = document if self.optimize.css_prune else None
+        vendor_document = document if self.vendor else None
+        key = ("bundle",) + self._cache_key("html", css_document, vendor_document)
+        signature = tuple(
+            (path, _asset_mtime(_PROJECT_ROOT / path))
+            for path in _BUNDLE_CSS_PREFIX
+            + self._get_css_files(css_document)
+            + _BUNDLE_CSS_SUFFIX
+            + self._get_js_modules()
+        )
+
+        with _CACHE_LOCK:
+            cached = _BUNDLE_CACHE.get(key)
+        if cached and cached[0] == signature:
+            css, js, head = cached[1]
+        else:
+            self._vendor_fallback = False
+            css, js, head = self._render_bundle(css_document, vendor_document)
+            if not self._vendor_fallback:
+                with _CACHE_LOCK:
+                    _BUNDLE_CACHE[key] = (signature, (css, js, head))
+
+        css_name = self._write_fingerprinted(output_dir / "assets" / "css", "app", ".css", css)
+        js_name = self._write_fingerprinted(output_dir / "assets" / "js", "app", ".js", js)
+        self._copy_fonts(output_dir / "assets" / "fonts")
+
+        breadcrumbs_html = ""
+        if self.features.breadcrumbs:
+            breadcrumbs_html = (
+                '<nav class="breadcrumbs-dynamic" aria-label="Навигация"></nav>'
+            )
+        return "\n".join(
+            [
+                breadcrumbs_html,
+                f'<link rel="stylesheet" href="assets/css/{css_name}">',
+                head,
+                f'<script src="assets/js/{js_name}"></script>',
+            ]
+        )
+
+    def _render_bundle(
+        self,
+        css_document: Optional[DocumentFeatures],
+        vendor_document: Optional[DocumentFeatures],
+    ) -> tuple[str, str, str]:
+        """
+        Содержимое бандла: (css, js, head) - head с CDN ссылками на то,
+        чего нет в локальном вендорном кеше.
+        """
+        css_optimizer = CssOptimizer(prune=self.optimize.css_prune, minify=True)
+        css_files = (
+            _BUNDLE_CSS_PREFIX + self._get_css_files(css_document) + _BUNDLE_CSS_SUFFIX
+        )
+        css_parts = []
+        for css_file in css_files:
+            path = _PROJECT_ROOT / css_file
+            content = self._read_asset(path, "css")
+            if content is None:
+                print(f"⚠️ Не найден CSS файл: {path}", file=sys.stderr)
+                continue
+            content = _CSS_IMPORT_RE.sub("", content)
+            css_parts.append(css_optimizer.process(content, css_document))
+
+        js_parts = [self._get_js_code(self._get_js_modules())]
+        head = []
+
+        highlight_css = highlight_js = plyr_css = plyr_js = None
+        if self.vendor:
+            languages = vendor_document.code_languages if vendor_document else None
+            highlight_css = self.vendor.highlight_theme("github-dark")
+            if highlight_css is not None and not self.build_highlight:
+                highlight_js = self.vendor.highlight_bundle(languages)
+            if self.features.plyr and (
+                vendor_document is None or vendor_document.has_media
+            ):
+                plyr_css = self.vendor.plyr_css()
+                plyr_js = self.vendor.plyr_js()
+
+        if highlight_css is not None and (self.build_highlight or highlight_js):
+            css_parts.append(css_optimizer.process(highlight_css))
+            if highlight_js:
+                js_parts.append(highlight_js)
+                if not self.features.lazy_hydration:
+                    js_parts.append(
+                        "document.addEventListener('DOMContentLoaded', "
+                        "function() { hljs.highlightAll(); });"
+                    )
+        else:
+            # Нет кеша (или vendor_assets выключен) - CDN ссылки на каждой странице
+            head.append(self._get_highlight_html(vendor_document))
+
+        if plyr_css is not None and plyr_js is not None:
+            css_parts.append(css_optimizer.process(plyr_css))
+            js_parts.append(plyr_js)
+        else:
+            head.append(self._get_plyr_html(vendor_document))
+
+        js_parts.append(_LAZY_INIT_JS if self.features.lazy_hydration else _EAGER_INIT_JS)
+        return "\n".join(css_parts), "\n\n".join(js_parts), "".join(head).strip()
+
+    @staticmethod
+    def _write_fingerprinted(folder: Path, stem: str, suffix: str, text: str) -> str:
+        """
+        Пишет <stem>.<hash><suffix>, если такого файла ещё нет.
+
+        Returns:
+            Имя файла
+        """
+        data = text.encode("utf-8")
+        name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{suffix}"
+        path = folder / name
+        if not path.exists():
+            # Параллельные сборки в одну папку: файл появляется целиком
+            write_atomic(path, data)
+            print(f"  📦 {name} ({len(data) // 1024} KB)", file=sys.stderr)
+        return name
+
+    @staticmethod
+    def _copy_fonts(fonts_dest: Path):
+        """Шрифты из assets/fonts/ (только отсутствующие или изменённые)."""
+        fonts_src = _PROJECT_ROOT / "assets" / "fonts"
+        if not fonts_src.exists():
+            return
+        fonts_dest.mkdir(parents=True, exist_ok=True)
+        for font_file in fonts_src.glob("*"):
+            if not font_file.is_file():
+                continue
+            target = fonts_dest / font_file.name
+            if not target.exists() or target.stat().st_size != font_file.stat().st_size:
+                shutil.copy2(font_file, target)
+
+    def _cache_key(
+        self,
+        format_type: str,
+        css_document: Optional[DocumentFeatures],
+        vendor_document: Optional[DocumentFeatures],
+    ) -> tuple:
+        """Ключ кеша header: всё, от чего зависит результат."""
+        return (
+            self.template,
+            format_type,
+            astuple(self.features),
+            astuple(self.styles),
+            self.media_mode,
+            astuple(self.optimize),
+            css_document,
+            vendor_document,
+        )
+
+    def _prunes_css(self) -> bool:
+        """Отбор CSS работает только для встроенных стилей."""
+        return self.optimize.css_prune and self.media_mode != "copy"
+
+    def _get_css_files(self, document: Optional[DocumentFeatures] = None) -> list[str]:
+        """
+        Список CSS модулей для включённых функций.
+
+        Если передан document, модули функций, которых нет в документе
+        (diff блоки, медиаплеер), не включаются.
+        """
         # ИСПРАВЛЕНИЕ БАГ #3: Правильные пути к CSS модулям
         css_files = [
             "assets/css/modules/base.css",
@@ -53,16 +393,44 @@ class TemplateProcessor:
             css_files.append("assets/css/modules/breadcrumbs.css")
         if self.features.fullscreen or self.features.code_copy:
             css_files.append("assets/css/modules/interactive.css")
-        if self.features.diff_blocks:
+        if self.features.diff_blocks and (document is None or document.has_diff):
             css_files.append("assets/css/modules/diff.css")
-        if self.features.plyr:
+        if self.features.plyr and (document is None or document.has_media):
             css_files.append("assets/css/modules/media.css")
 
         css_files.append("assets/css/modules/responsive.css")
+        return css_files
+
+    def _get_js_modules(self) -> list[str]:
+        """Список JS модулей для включённых функций."""
+        js_modules = []
 
+        if self.features.code_copy:
+            js_modules.append("assets/js/modules/codeCopy.js")
+        if self.features.fullscreen:
+            js_modules.append("assets/js/modules/fullscreen.js")
+        if self.features.breadcrumbs:
+            js_modules.append("assets/js/modules/breadcrumbs.js")
+        if self.features.toc:
+            js_modules.append("assets/js/modules/smoothScroll.js")
+        if self.features.plyr:
+            js_modules.append("assets/js/modules/media.js")
+        if self.features.lazy_hydration:
+            js_modules.append("assets/js/modules/hydration.js")
+
+        return js_modules
+
+    def _render_header(
+        self,
+        css_files: list[str],
+        js_modules: list[str],
+        document: Optional[DocumentFeatures] = None,
+        vendor_document: Optional[DocumentFeatures] = None,
+    ) -> str:
+        """Собирает header из списков CSS и JS модулей."""
         # Генерируем CSS (inline или ссылки)
-        if self.media_mode == "embed":
-            css_html = self._get_inline_css(css_files)
+        if self.media_mode != "copy":
+            css_html = self._get_inline_css(css_files, document)
         else:
             # Режим copy - ссылки на файлы
             css_html = "\n".join(
@@ -70,7 +438,7 @@ class TemplateProcessor:
             )
 
         # Собираем JS
-        js_code = self._get_js_code()
+        js_code = self._get_js_code(js_modules)
 
         # ИСПРАВЛЕНИЕ БАГ #2: HTML контейнер для breadcrumbs
         breadcrumbs_html = ""
@@ -79,20 +447,10 @@ class TemplateProcessor:
                 '<nav class="breadcrumbs-dynamic" aria-label="Навигация"></nav>'
             )
 
-        # ИСПРАВЛЕНИЕ БАГ #13: highlight.js после загрузки DOM
-        hljs_html = f"""
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/styles/github-dark.min.css">
-<script src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/highlight.min.js"></script>
-<script>document.addEventListener('DOMContentLoaded', function() {{ hljs.highlightAll(); }});</script>
-"""
+        hljs_html = self._get_highlight_html(vendor_document)
+        plyr_html = self._get_plyr_html(vendor_document)
 
-        # Plyr - медиаплеер для audio/video
-        plyr_html = ""
-        if self.features.plyr:
-            plyr_html = """
-<link rel="stylesheet" href="https://cdn.plyr.io/3.7.8/plyr.css">
-<script src="https://cdn.plyr.io/3.7.8/plyr.polyfilled.js"></script>
-"""
+        init_js = _LAZY_INIT_JS if self.features.lazy_hydration else _EAGER_INIT_JS
 
         return f"""
 {breadcrumbs_html}
@@ -102,52 +460,113 @@ class TemplateProcessor:
 <script>
 {js_code}
 
-// Инициализация всех модулей после загрузки DOM
-document.addEventListener('DOMContentLoaded', function() {{
-    console.log('🚀 Initializing MD-to-HTML features...');
-    
-    // Инициализация функций (если они определены)
-    if (typeof addCodeCopyButtons === 'function') addCodeCopyButtons();
-    if (typeof enableFullscreenMedia === 'function') enableFullscreenMedia();
-    if (typeof initDynamicBreadcrumbs === 'function') initDynamicBreadcrumbs();
-    if (typeof smoothScrollTOC === 'function') smoothScrollTOC();
-    
-    // Инициализация Plyr медиаплеера
-    if (typeof Plyr !== 'undefined') {{
-        const players = Plyr.setup('.plyr-video, .plyr-audio, video, audio', {{
-            controls: ['play-large', 'play', 'progress', 'current-time', 
-                       'duration', 'mute', 'volume', 'settings', 'fullscreen'],
-            settings: ['quality', 'speed'],
-            speed: {{ selected: 1, options: [0.5, 0.75, 1, 1.25, 1.5, 2] }}
-        }});
-        console.log('🎬 Initialized ' + players.length + ' Plyr instances');
-    }} else {{
-        console.warn('⚠️ Plyr library not loaded');
-    }}
-    
-    console.log('✅ All features initialized');
-}});
+{init_js}
 </script>
 """
 
-    def _get_inline_css(self, css_files: list[str]) -> str:
+    def _get_highlight_html(self, document: Optional[DocumentFeatures]) -> str:
+        """
+        highlight.js: из вендорного кеша (только языки документа) или CDN.
+
+        При styles.highlight_mode == "build" код уже подсвечен
+        HighlightPostprocessor, подключается только тема.
+
+        Args:
+            document: Функции документа (None - стандартная сборка)
+        """
+        init = (
+            "<script>document.addEventListener('DOMContentLoaded', "
+            "function() { hljs.highlightAll(); });</script>"
+        )
+        if self.features.lazy_hydration:
+            init = ""  # Подсветка блоков у viewport (_LAZY_INIT_JS)
+
+        if self.vendor:
+            theme = self.vendor.highlight_theme("github-dark")
+            if theme is not None and self.build_highlight:
+                return f'\n<style type="text/css">\n{theme}\n</style>\n'
+            if theme is not None:
+                languages = document.code_languages if document else None
+                bundle = self.vendor.highlight_bundle(languages)
+                if bundle is not None:
+                    return (
+                        f'\n<style type="text/css">\n{theme}\n</style>\n'
+                        f"<script>\n{_inline_script(bundle)}\n</script>\n{init}\n"
+                    )
+            self._vendor_fallback = True
+            print(
+                "⚠️ highlight.js нет в assets/vendor и кеше, используем CDN "
+                "(python fetch_vendor.py)",
+                file=sys.stderr,
+            )
+
+        # ИСПРАВЛЕНИЕ БАГ #13: highlight.js после загрузки DOM
+        cdn = f"https://cdnjs.cloudflare.com/ajax/libs/highlight.js/{HLJS_VERSION}"
+        theme_link = f'<link rel="stylesheet" href="{cdn}/styles/github-dark.min.css">'
+        if self.build_highlight:
+            return f"\n{theme_link}\n"
+        return f"""
+{theme_link}
+<script src="{cdn}/highlight.min.js"></script>
+{init}
+"""
+
+    def _get_plyr_html(self, document: Optional[DocumentFeatures]) -> str:
+        """
+        Plyr - медиаплеер для audio/video: из вендорного кеша или CDN.
+
+        Args:
+            document: Функции документа (без медиа Plyr не подключается)
+        """
+        if not self.features.plyr:
+            return ""
+
+        if self.vendor:
+            if document is not None and not document.has_media:
+                return ""
+            css = self.vendor.plyr_css()
+            js = self.vendor.plyr_js()
+            if css is not None and js is not None:
+                return (
+                    f'\n<style type="text/css">\n{css}\n</style>\n'
+                    f"<script>\n{_inline_script(js)}\n</script>\n"
+                )
+            self._vendor_fallback = True
+            print(
+                "⚠️ Plyr нет в assets/vendor и кеше, используем CDN (python fetch_vendor.py)",
+                file=sys.stderr,
+            )
+
+        cdn = f"https://cdn.plyr.io/{PLYR_VERSION}"
+        return f"""
+<link rel="stylesheet" href="{cdn}/plyr.css">
+<script src="{cdn}/plyr.polyfilled.js"></script>
+"""
+
+    def _get_inline_css(
+        self, css_files: list[str], document: Optional[DocumentFeatures] = None
+    ) -> str:
         """
         Читает CSS файлы и возвращает их как inline <style>.
 
         Args:
             css_files: Список путей к CSS файлам
+            document: Функции документа для отбора правил (None - без отбора)
 
         Returns:
             HTML с inline стилями
         """
-        project_root = Path(__file__).parent.parent.parent
         css_content = []
 
         for css_file in css_files:
-            path = project_root / css_file
-            if path.exists():
-                content = path.read_text(encoding="utf-8")
-                css_content.append(f"/* {css_file} */\n{content}")
+            path = _PROJECT_ROOT / css_file
+            content = self._read_asset(path, "css")
+            if content is not None:
+                content = self.css_optimizer.process(content, document)
+                if self.optimize.css_minify:
+                    css_content.append(content)
+                else:
+                    css_content.append(f"/* {css_file} */\n{content}")
             else:
                 print(f"⚠️ Не найден CSS файл: {path}", file=sys.stderr)
 
@@ -156,37 +575,48 @@ document.addEventListener('DOMContentLoaded', function() {{
             return f'<style type="text/css">\n{combined_css}\n</style>'
         return ""
 
-    def _get_js_code(self) -> str:
+    def _get_js_code(self, js_modules: list[str]) -> str:
         """Читает и объединяет JS файлы, удаляя export для inline."""
-        # Получаем корень проекта (где находится папка assets)
-        project_root = Path(__file__).parent.parent.parent
-
-        js_modules = []
-
-        if self.features.code_copy:
-            js_modules.append("assets/js/modules/codeCopy.js")
-        if self.features.fullscreen:
-            js_modules.append("assets/js/modules/fullscreen.js")
-        if self.features.breadcrumbs:
-            js_modules.append("assets/js/modules/breadcrumbs.js")
-        if self.features.toc:
-            js_modules.append("assets/js/modules/smoothScroll.js")
-        if self.features.plyr:
-            js_modules.append("assets/js/modules/media.js")
-
-        # Читаем все модули
         js_code = []
         for module_path in js_modules:
             # Используем абсолютный путь от корня проекта
-            path = project_root / module_path
-            if path.exists():
-                code = path.read_text(encoding="utf-8")
-                # ИСПРАВЛЕНИЕ БАГ #1: Удаляем export для inline-скрипта
-                code = code.replace("export function", "function")
-                code = code.replace("export const", "const")
-                code = code.replace("export default", "")
+            path = _PROJECT_ROOT / module_path
+            code = self._read_asset(path, "js")
+            if code is not None:
                 js_code.append(code)
             else:
                 print(f"⚠️ Не найден модуль: {path}", file=sys.stderr)
 
         return "\n\n".join(js_code)
+
+    @staticmethod
+    def _read_asset(path: Path, kind: str) -> Optional[str]:
+        """
+        Читает ассет с кешированием по mtime.
+
+        Args:
+            path: Абсолютный путь к файлу
+            kind: "css" (как есть) или "js" (без export для inline)
+
+        Returns:
+            Подготовленный текст или None если файла нет
+        """
+        mtime = _asset_mtime(path)
+        if mtime is None:
+            return None
+
+        with _CACHE_LOCK:
+            cached = _ASSET_CACHE.get((path, kind))
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        text = path.read_text(encoding="utf-8")
+        if kind == "js":
+            # ИСПРАВЛЕНИЕ БАГ #1: Удаляем export для inline-скрипта
+            text = text.replace("export function", "function")
+            text = text.replace("export const", "const")
+            text = text.replace("export default", "")
+
+        with _CACHE_LOCK:
+            _ASSET_CACHE[(path, kind)] = (mtime, text)
+        return text
@@ -0,0 +1,227 @@
+"""Вендорные библиотеки (highlight.js, Plyr) из репозитория или кеша для офлайн сборки."""
+
+import hashlib
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from ..cache import get_cache_dir
+
+HLJS_VERSION = "11.9.0"
+PLYR_VERSION = "3.7.8"
+
+# Пакеты npm, из которых fetch_vendor.py берёт файлы:
+# пакет → {файл в архиве: путь в assets/vendor/}. "*" - все файлы папки.
+VENDOR_PACKAGES = {
+    ("@highlightjs/cdn-assets", HLJS_VERSION): {
+        "package/highlight.min.js": f"highlight.js/{HLJS_VERSION}/highlight.min.js",
+        "package/languages/*.min.js": f"highlight.js/{HLJS_VERSION}/languages/",
+        "package/styles/github-dark.min.css": (
+            f"highlight.js/{HLJS_VERSION}/styles/github-dark.min.css"
+        ),
+    },
+    ("highlight.js", HLJS_VERSION): {
+        "package/lib/core.js": f"highlight.js/{HLJS_VERSION}/core.js",
+    },
+    ("plyr", PLYR_VERSION): {
+        "package/dist/plyr.polyfilled.js": f"plyr/{PLYR_VERSION}/plyr.polyfilled.js",
+        "package/dist/plyr.css": f"plyr/{PLYR_VERSION}/plyr.css",
+    },
+}
+
+CHECKSUMS_NAME = "SHA256SUMS"
+
+# Алиасы из ```lang → имя файла языка highlight.js
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "jsx": "javascript",
+    "mjs": "javascript",
+    "ts": "typescript",
+    "tsx": "typescript",
+    "sh": "bash",
+    "zsh": "bash",
+    "console": "shell",
+    "html": "xml",
+    "xhtml": "xml",
+    "svg": "xml",
+    "yml": "yaml",
+    "c++": "cpp",
+    "cc": "cpp",
+    "h": "c",
+    "cs": "csharp",
+    "c#": "csharp",
+    "md": "markdown",
+    "ps": "powershell",
+    "ps1": "powershell",
+    "kt": "kotlin",
+    "rs": "rust",
+    "rb": "ruby",
+    "golang": "go",
+    "jsonc": "json",
+    "docker": "dockerfile",
+    "postgres": "pgsql",
+    "py-repl": "python-repl",
+    "pycon": "python-repl",
+    "vue": "xml",
+}
+
+# Языки без грамматики (подсветка не нужна)
+_PLAIN_LANGUAGES = {"", "text", "txt", "plain", "plaintext", "mermaid", "output"}
+
+# Языки, встраивающие другие (subLanguage): html → css, javascript
+_LANGUAGE_DEPENDENCIES = {
+    "xml": ("css", "javascript"),
+    "php-template": ("xml",),
+    "markdown": ("xml",),
+}
+
+_LANGUAGE_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+_PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+
+def normalize_languages(languages: Iterable[str]) -> list[str]:
+    """
+    Приводит имена языков из code fences к именам файлов highlight.js.
+
+    Returns:
+        Отсортированный список (стабильный порядок → детерминированный header)
+    """
+    result = set()
+    for lang in languages:
+        name = lang.strip().lower()
+        if name.startswith("diff-"):
+            name = name[len("diff-") :]
+        if name in _PLAIN_LANGUAGES:
+            continue
+        name = LANGUAGE_ALIASES.get(name, name)
+        if not _LANGUAGE_NAME_RE.match(name):
+            continue
+        result.add(name)
+        result.update(_LANGUAGE_DEPENDENCIES.get(name, ()))
+    return sorted(result)
+
+
+def read_checksums(base: Path) -> dict[str, str]:
+    """
+    Контрольные суммы папки вендорных файлов (формат sha256sum).
+
+    Returns:
+        Относительный путь → sha256 (пусто, если файла сумм нет)
+    """
+    try:
+        lines = (base / CHECKSUMS_NAME).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return {}
+    checksums = {}
+    for line in lines:
+        digest, _, relative = line.strip().partition("  ")
+        if digest and relative:
+            checksums[relative.lstrip("*")] = digest
+    return checksums
+
+
+def _wrap_commonjs(code: str) -> str:
+    """Оборачивает CommonJS модуль core.js в скрипт с глобальным hljs."""
+    return (
+        "(function(){var module={exports:{}};var exports=module.exports;\n"
+        f"{code}\n"
+        "window.hljs=module.exports;})();"
+    )
+
+
+class VendorAssets:
+    """
+    Вендорные библиотеки без обращения к сети.
+
+    Поиск файла: assets/vendor/ в репозитории (закоммиченные файлы) →
+    общий кеш (см. get_cache_dir). Файл принимается, только если его
+    sha256 совпадает с записью в SHA256SUMS своей папки. Обе папки
+    заполняет fetch_vendor.py; сборка ничего не скачивает - нет файла
+    (неизвестный язык, не выполнен fetch_vendor.py) → None, и шаблон
+    подключает CDN.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """
+        Args:
+            cache_dir: Папка кеша (по умолчанию get_cache_dir("vendor"))
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else get_cache_dir("vendor")
+        self.project_dir = _PROJECT_ROOT / "assets" / "vendor"
+        self._checksums: dict[Path, dict[str, str]] = {}
+
+    def highlight_core(self) -> Optional[str]:
+        """Ядро highlight.js без языков (глобальный hljs)."""
+        core = self._get(f"highlight.js/{HLJS_VERSION}/core.js")
+        return _wrap_commonjs(core) if core is not None else None
+
+    def highlight_common(self) -> Optional[str]:
+        """Стандартная сборка highlight.js (~35 популярных языков)."""
+        return self._get(f"highlight.js/{HLJS_VERSION}/highlight.min.js")
+
+    def highlight_language(self, name: str) -> Optional[str]:
+        """Грамматика одного языка (регистрирует себя в глобальном hljs)."""
+        return self._get(f"highlight.js/{HLJS_VERSION}/languages/{name}.min.js")
+
+    def highlight_theme(self, name: str = "github-dark") -> Optional[str]:
+        """CSS темы highlight.js."""
+        return self._get(f"highlight.js/{HLJS_VERSION}/styles/{name}.min.css")
+
+    def plyr_js(self) -> Optional[str]:
+        """Plyr с полифиллами."""
+        return self._get(f"plyr/{PLYR_VERSION}/plyr.polyfilled.js")
+
+    def plyr_css(self) -> Optional[str]:
+        """Стили Plyr."""
+        return self._get(f"plyr/{PLYR_VERSION}/plyr.css")
+
+    def highlight_bundle(self, languages: Optional[Iterable[str]]) -> Optional[str]:
+        """
+        Сборка highlight.js только с нужными языками.
+
+        Args:
+            languages: Языки из code fences (None - стандартная сборка)
+
+        Returns:
+            JS код или None если ядра нет в репозитории и кеше
+        """
+        if languages is None:
+            return self.highlight_common()
+
+        core = self.highlight_core()
+        if core is None:
+            return None
+
+        parts = [core]
+        for name in normalize_languages(languages):
+            code = self.highlight_language(name)
+            if code is not None:
+                parts.append(code)
+        return "\n".join(parts)
+
+    def _get(self, relative: str) -> Optional[str]:
+        """Проверенный по SHA256SUMS файл из репозитория или кеша."""
+        for base in (self.project_dir, self.cache_dir):
+            checksums = self._checksums.get(base)
+            if checksums is None:
+                checksums = self._checksums[base] = read_checksums(base)
+            expected = checksums.get(relative)
+            if expected is None:
+                continue
+            try:
+                data = (base / relative).read_bytes()
+            except OSError:
+                continue
+            if hashlib.sha256(data).hexdigest() != expected:
+                print(
+                    f"  ⚠️ {base / relative}: sha256 не совпадает с {CHECKSUMS_NAME}, "
+                    "файл пропущен (python fetch_vendor.py)",
+                    file=sys.stderr,
+                )
+                continue
+            return data.decode("utf-8")
+        return None
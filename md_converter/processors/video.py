@@ -0,0 +1,309 @@
+"""Подготовка копируемых видео: MP4 faststart и кадр-постер, кеш."""
+
+import hashlib
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+from ..cache import get_cache_dir, new_file_mode, write_atomic
+from ..config import VideoConfig
+from ..messages import warn_once
+
+VIDEO_EXTENSIONS = {".mp4", ".m4v", ".mov", ".webm"}
+# Контейнер ISO BMFF/QuickTime: атомы, moov можно переложить
+_ATOM_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+# Атомы-контейнеры на пути moov → trak → mdia → minf → stbl → stco/co64
+_CONTAINER_ATOMS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+# Версия алгоритма: меняется → старые записи кеша не используются
+_CACHE_VERSION = 1
+_BLOCK = 1 << 20
+
+
+class FaststartError(ValueError):
+    """MP4 не удаётся переложить (повреждён или не поддерживается)."""
+
+
+@dataclass
+class PreparedVideo:
+    """Результат подготовки видео."""
+
+    path: Path  # Что копировать: исходник или переложенный файл из кеша
+    poster: Optional[Path] = None  # JPEG кадр в кеше
+
+
+class VideoOptimizer:
+    """
+    Готовит видео к копированию рядом с HTML.
+
+    - MP4/MOV с атомом moov в конце (так пишет большинство записей экрана
+      и камер) перекладываются: moov в начало файла, смещения чанков
+      stco/co64 сдвигаются. Без перекодирования, на чистом Python - плеер
+      начинает воспроизведение, не скачивая весь файл.
+    - Кадр-постер через ffmpeg, если он установлен: вместо чёрного
+      прямоугольника до нажатия Play.
+
+    Результаты кешируются по хешу файла (get_cache_dir("video")).
+    """
+
+    def __init__(self, config: VideoConfig, cache_dir: Optional[Path] = None):
+        """
+        Args:
+            config: Настройки подготовки видео
+            cache_dir: Папка кеша (по умолчанию get_cache_dir("video"))
+        """
+        self.config = config
+        self.cache_dir = Path(cache_dir) if cache_dir else get_cache_dir("video")
+
+    def prepare_many(self, paths: Iterable[Path]) -> dict[Path, PreparedVideo]:
+        """
+        Параллельная подготовка.
+
+        Returns:
+            {исходный путь: PreparedVideo} - только видео, для которых
+            что-то изменилось (переложен moov или есть постер)
+        """
+        candidates = list(
+            dict.fromkeys(p for p in paths if p.suffix.lower() in VIDEO_EXTENSIONS)
+        )
+        if not candidates:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=self.config.workers or None) as pool:
+            results = pool.map(self._prepare_safe, candidates)
+            return {
+                source: prepared
+                for source, prepared in zip(candidates, results)
+                if prepared is not None
+                and (prepared.path != source or prepared.poster is not None)
+            }
+
+    def _prepare_safe(self, source: Path) -> Optional[PreparedVideo]:
+        """prepare() без исключений: битое видео копируется как есть."""
+        try:
+            return self.prepare(source)
+        except Exception as e:
+            print(f"  ⚠️ Не удалось подготовить видео {source.name}: {e}", file=sys.stderr)
+            return None
+
+    def prepare(self, source: Path) -> PreparedVideo:
+        """Подготовка одного видео (с кешем по хешу содержимого)."""
+        digest = _file_digest(source)
+        path = source
+        if source.suffix.lower() in _ATOM_EXTENSIONS:
+            path = self._faststart(source, digest) or source
+        poster = self._poster(source, digest) if self.config.poster else None
+        return PreparedVideo(path, poster)
+
+    def _faststart(self, source: Path, digest: str) -> Optional[Path]:
+        """Переложенный файл в кеше или None (moov уже в начале / не MP4)."""
+        key = f"{digest}-v{_CACHE_VERSION}"
+        cached = self.cache_dir / f"{key}{source.suffix.lower()}"
+        skipped = self.cache_dir / f"{key}.faststart-skip"
+        if cached.exists():
+            return cached
+        if skipped.exists():
+            return None
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{cached.name}.", dir=self.cache_dir)
+        os.close(fd)
+        try:
+            moved = faststart(source, Path(tmp_name))
+            if moved:
+                # mkstemp - 0600; copy2 перенёс бы эти права в результат
+                os.chmod(tmp_name, new_file_mode())
+                os.replace(tmp_name, cached)
+        except FaststartError as e:
+            print(f"  ⚠️ {source.name}: moov не переложен ({e})", file=sys.stderr)
+            moved = False
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+        if not moved:
+            # Уже faststart или не разбирается - не читаем файл повторно
+            write_atomic(skipped, b"")
+            return None
+        print(f"  🎬 {source.name}: moov перенесён в начало файла", file=sys.stderr)
+        return cached
+
+    def _poster(self, source: Path, digest: str) -> Optional[Path]:
+        """JPEG кадр в кеше или None (нет ffmpeg / кадр не получен)."""
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            warn_once("ffmpeg", "  ⚠️ ffmpeg не найден: видео без постера")
+            return None
+
+        params = (_CACHE_VERSION, self.config.poster_time, self.config.poster_width)
+        settings = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+        cached = self.cache_dir / f"{digest}-{settings}.jpg"
+        skipped = self.cache_dir / f"{digest}-{settings}.poster-skip"
+        if cached.exists():
+            return cached
+        if skipped.exists():
+            return None
+
+        # Видео короче poster_time - берём первый кадр
+        for time in dict.fromkeys((self.config.poster_time, 0)):
+            data = _extract_frame(ffmpeg, source, time, self.config.poster_width)
+            if data:
+                write_atomic(cached, data)
+                print(f"  🖼️ {source.name}: постер ({time} с)", file=sys.stderr)
+                return cached
+        write_atomic(skipped, b"")
+        return None
+
+
+def faststart(source: Path, target: Path) -> bool:
+    """
+    Переносит атом moov перед данными (mdat) без перекодирования.
+
+    Атомы до первого mdat (ftyp, ...) остаются на месте, за ними moov,
+    затем остальные атомы в исходном порядке. Смещения чанков в
+    stco/co64, указывающие на данные между первым mdat и старым moov,
+    увеличиваются на размер moov.
+
+    Returns:
+        True - target записан, False - moov уже перед mdat (target не тронут)
+
+    Raises:
+        FaststartError: Файл повреждён или не поддерживается (фрагментированный
+            MP4, сжатый moov, смещение не помещается в stco)
+    """
+    file_size = source.stat().st_size
+    with open(source, "rb") as f:
+        atoms = _top_level_atoms(f, file_size)
+        moovs = [(start, size) for kind, start, size in atoms if kind == b"moov"]
+        mdat_starts = [start for kind, start, _ in atoms if kind == b"mdat"]
+        if len(moovs) != 1 or not mdat_starts:
+            raise FaststartError("нет атома moov или mdat")
+        moov_start, moov_size = moovs[0]
+        insert_at = mdat_starts[0]
+        if moov_start < insert_at:
+            return False
+        if any(kind == b"moof" for kind, _, _ in atoms):
+            raise FaststartError("фрагментированный MP4")
+
+        f.seek(moov_start)
+        moov = bytearray(f.read(moov_size))
+        header = 16 if struct.unpack_from(">I", moov)[0] == 1 else 8
+        _shift_offsets(moov, header, moov_size, insert_at, moov_start, moov_size)
+
+        with open(target, "wb") as out:
+            _copy_range(f, out, 0, insert_at)
+            out.write(moov)
+            for kind, start, size in atoms:
+                if start >= insert_at and kind != b"moov":
+                    _copy_range(f, out, start, size)
+    return True
+
+
+def _top_level_atoms(f: BinaryIO, file_size: int) -> list[tuple[bytes, int, int]]:
+    """(тип, начало, размер) атомов верхнего уровня - только заголовки."""
+    atoms = []
+    pos = 0
+    while pos < file_size:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            raise FaststartError("обрезанный заголовок атома")
+        size, kind = struct.unpack(">I4s", header)
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                raise FaststartError("обрезанный заголовок атома")
+            size = struct.unpack(">Q", large)[0]
+        elif size == 0:
+            size = file_size - pos  # Последний атом до конца файла
+        if size < 8 or pos + size > file_size:
+            raise FaststartError(f"неверный размер атома {kind!r}")
+        atoms.append((kind, pos, size))
+        pos += size
+    return atoms
+
+
+def _shift_offsets(
+    data: bytearray, start: int, end: int, low: int, high: int, delta: int
+):
+    """Сдвигает на delta смещения stco/co64 в [low, high) внутри data[start:end]."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise FaststartError(f"неверный размер атома {kind!r} в moov")
+
+        if kind in _CONTAINER_ATOMS:
+            _shift_offsets(data, pos + header, pos + size, low, high, delta)
+        elif kind in (b"stco", b"co64"):
+            # version/flags (4), число записей (4), смещения (4 или 8 байт)
+            width = "I" if kind == b"stco" else "Q"
+            count = struct.unpack_from(">I", data, pos + header + 4)[0]
+            table = pos + header + 8
+            if table + count * struct.calcsize(width) > pos + size:
+                raise FaststartError(f"обрезанная таблица {kind.decode()}")
+            offsets = [
+                offset + delta if low <= offset < high else offset
+                for offset in struct.unpack_from(f">{count}{width}", data, table)
+            ]
+            if kind == b"stco" and offsets and max(offsets) > 0xFFFFFFFF:
+                raise FaststartError("смещение не помещается в stco")
+            struct.pack_into(f">{count}{width}", data, table, *offsets)
+        elif kind == b"cmov":
+            raise FaststartError("сжатый moov")
+        pos += size
+
+
+def _copy_range(f: BinaryIO, out: BinaryIO, start: int, size: int):
+    """Копирует size байт с позиции start блоками."""
+    f.seek(start)
+    while size > 0:
+        block = f.read(min(_BLOCK, size))
+        if not block:
+            raise FaststartError("файл короче заголовков атомов")
+        out.write(block)
+        size -= len(block)
+
+
+def _file_digest(path: Path) -> str:
+    """sha1 файла блоками (видео - сотни МБ)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_frame(ffmpeg: str, source: Path, time: float, width: int) -> bytes:
+    """Кадр на секунде time в JPEG шириной не больше width ("" если нет)."""
+    result = subprocess.run(
+        [
+            ffmpeg,
+            "-v", "error",
+            "-ss", str(time),
+            "-i", str(source),
+            "-frames:v", "1",
+            "-vf", f"scale='min({width},iw)':-2",
+            "-q:v", "3",
+            "-f", "image2",
+            "-c:v", "mjpeg",
+            "pipe:1",
+        ],
+        capture_output=True,
+        timeout=60,
+        stdin=subprocess.DEVNULL,
+    )
+    return result.stdout if result.returncode == 0 else b""
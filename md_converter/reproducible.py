@@ -0,0 +1,132 @@
+"""Проверка воспроизводимости: две сборки должны совпасть побайтово."""
+
+import fnmatch
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from dataclasses import replace
+from pathlib import Path
+from typing import Optional, Union
+
+from .config import ConverterConfig
+
+# Служебные файлы конвертера в папке результатов: размеры и mtime
+# исходников, а не результат сборки - в сравнение не входят
+_STATE_FILES = (
+    ".precompress.json",
+    ".*.buildstamp.json",
+    ".*.diagrams.json",
+    ".*.epubchapters.json",
+)
+
+
+def check_reproducible(
+    config: ConverterConfig,
+    input_path: Union[str, Path],
+    output_name: Optional[str] = None,
+) -> list[str]:
+    """
+    Собирает документ дважды в разные временные папки и сравнивает
+    результаты побайтово.
+
+    Штамп сборки отключается (обе сборки полные). Дисковые кеши
+    (изображения, вендорные ассеты) общие - их недетерминизм проверкой
+    не ловится.
+
+    Args:
+        config: Конфигурация сборки (output_dir заменяется временным)
+        input_path: Путь к MD файлу или папке
+        output_name: Имя результата
+
+    Returns:
+        Различия ("отличается: lesson.epub → content.opf"); [] - сборка
+        воспроизводима
+    """
+    from .converter import Converter
+
+    if (
+        "epub" in config.formats
+        and config.advanced.source_date_epoch is None
+        and not os.environ.get("SOURCE_DATE_EPOCH", "").isdigit()
+        and not config.advanced.reproducible
+    ):
+        print(
+            "⚠️ Дата EPUB не задана - Pandoc возьмёт время сборки "
+            "(advanced.source_date_epoch, $SOURCE_DATE_EPOCH или advanced.reproducible)",
+            file=sys.stderr,
+        )
+
+    input_path = Path(input_path)
+    output_name = output_name or input_path.stem
+    build_dirs = [Path(tempfile.mkdtemp(prefix=f"md-repro-{i}-")) for i in (1, 2)]
+    try:
+        for i, build_dir in enumerate(build_dirs, start=1):
+            print(f"🔁 Сборка {i}/2 → {build_dir}", file=sys.stderr)
+            build_config = replace(
+                config,
+                output_dir=str(build_dir),
+                optimize=replace(config.optimize, skip_unchanged=False),
+            )
+            Converter(build_config).convert(input_path, output_name)
+        return compare_trees(*build_dirs)
+    finally:
+        for build_dir in build_dirs:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def compare_trees(first: Path, second: Path) -> list[str]:
+    """
+    Различия двух папок сборки (пути относительно папки).
+
+    Для различающихся EPUB перечисляются отличающиеся файлы архива.
+    """
+    first_files = _hashes(first)
+    second_files = _hashes(second)
+    differences = []
+    for name in sorted(first_files.keys() | second_files.keys()):
+        if name not in second_files:
+            differences.append(f"только в первой сборке: {name}")
+        elif name not in first_files:
+            differences.append(f"только во второй сборке: {name}")
+        elif first_files[name] != second_files[name]:
+            members = ""
+            if name.endswith(".epub"):
+                members = ", ".join(_zip_differences(first / name, second / name))
+            differences.append(
+                f"отличается: {name}" + (f" → {members}" if members else "")
+            )
+    return differences
+
+
+def _hashes(root: Path) -> dict[str, str]:
+    """sha256 всех файлов папки по относительному пути (кроме _STATE_FILES)."""
+    result = {}
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and not any(
+            fnmatch.fnmatchcase(path.name, pattern) for pattern in _STATE_FILES
+        ):
+            result[path.relative_to(root).as_posix()] = hashlib.sha256(
+                path.read_bytes()
+            ).hexdigest()
+    return result
+
+
+def _zip_differences(first: Path, second: Path) -> list[str]:
+    """Отличающиеся файлы архивов (содержимое или дата в заголовке)."""
+    with zipfile.ZipFile(first) as a, zipfile.ZipFile(second) as b:
+        first_items = {info.filename: info for info in a.infolist()}
+        second_items = {info.filename: info for info in b.infolist()}
+        names = []
+        for name in sorted(first_items.keys() | second_items.keys()):
+            info_a, info_b = first_items.get(name), second_items.get(name)
+            if (
+                info_a is None
+                or info_b is None
+                or info_a.date_time != info_b.date_time
+                or a.read(name) != b.read(name)
+            ):
+                names.append(name)
+        return names
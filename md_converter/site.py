@@ -0,0 +1,274 @@
+"""Формат site: страница на главу с общими CSS/JS/медиа."""
+
+import html
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+from typing import Optional, Union
+
+from .backends import PandocBackend
+from .buildstamp import FileLookups
+from .config import ConverterConfig
+from .preprocessors import (
+    CalloutsPreprocessor,
+    DiffPreprocessor,
+    MermaidPreprocessor,
+    ObsidianPreprocessor,
+    prune_diagrams,
+)
+from .processors import (
+    Chapter,
+    DocumentFeatures,
+    ImageOptimizer,
+    MediaProcessor,
+    MergerProcessor,
+    TemplateProcessor,
+    VideoOptimizer,
+)
+from .writer import OutputWriter
+
+
+class SiteBuilder:
+    """
+    Собирает папку в сайт: одна HTML страница на главу (MD файл).
+
+    Большой курс в одном HTML (особенно в режиме embed) весит сотни МБ
+    и долго разбирается браузером. Здесь каждая глава - своя страница
+    с боковым оглавлением и ссылками назад/вперёд, а CSS, JS и медиа
+    лежат в одном экземпляре рядом:
+
+        <output_dir>/<output_name>/
+            index.html, 02-глава.html, ...
+            assets/css/app.<hash>.css, assets/js/app.<hash>.js, assets/fonts/
+            media/
+
+    Главы препроцессируются и конвертируются Pandoc параллельно.
+    """
+
+    def __init__(
+        self,
+        config: ConverterConfig,
+        postprocessors: Optional[list] = None,
+        image_optimizer: Optional[ImageOptimizer] = None,
+        writer: Optional[OutputWriter] = None,
+        video_optimizer: Optional[VideoOptimizer] = None,
+    ):
+        """
+        Args:
+            config: Конфигурация конвертера (media_mode для site всегда copy)
+            postprocessors: Постпроцессоры HTML (общие с Converter)
+            image_optimizer: Оптимизация изображений (None = файлы как есть)
+            writer: Запись страниц, диаграмм и медиа (только при изменении)
+            video_optimizer: Подготовка видео (None = файлы как есть)
+        """
+        self.config = config
+        self.postprocessors = postprocessors or []
+        self.image_optimizer = image_optimizer
+        self.video_optimizer = video_optimizer
+        self.writer = writer or OutputWriter()
+        self.merger = MergerProcessor()
+        # Исходные файлы медиа и поиск медиа всех глав последней сборки (штамп сборки)
+        self.media_sources: list[Path] = []
+        self.lookups = FileLookups()
+        self.diagrams: set[str] = set()  # Хеши диаграмм Mermaid в media/ сайта
+        self.template_processor = TemplateProcessor(
+            template=config.template,
+            features=config.features,
+            styles=config.styles,
+            media_mode="copy",
+            optimize=config.optimize,
+        )
+
+    def build(
+        self, input_path: Union[str, Path], output_name: Optional[str] = None
+    ) -> list[Path]:
+        """
+        Собирает сайт.
+
+        Args:
+            input_path: Путь к MD файлу или папке
+            output_name: Имя папки сайта внутри output_dir
+
+        Returns:
+            Пути к страницам в порядке глав
+        """
+        input_path = Path(input_path)
+        output_name = output_name or input_path.stem
+        site_dir = Path(self.config.output_dir) / output_name
+        site_dir.mkdir(parents=True, exist_ok=True)
+
+        print(f"{'=' * 60}", file=sys.stderr)
+        print(f"📝 Формат: SITE → {site_dir}", file=sys.stderr)
+        print(f"{'=' * 60}\n", file=sys.stderr)
+
+        self.media_sources = []
+        self.lookups = FileLookups()
+        self.diagrams = set()
+        chapters = self.merger.merge_chapters(input_path)
+        if not chapters:
+            print("⚠️ Нет MD файлов для сайта", file=sys.stderr)
+            return []
+        pages = [self._page_name(i, chapter) for i, chapter in enumerate(chapters)]
+
+        workers = self.config.site.workers or min(len(chapters), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 1. Препроцессинг глав (диаграммы и медиа - в общую media/)
+            print("⚙️ Этап 1: Препроцессинг глав...", file=sys.stderr)
+            contents = list(
+                executor.map(
+                    lambda chapter: self._prepare(chapter, input_path, site_dir),
+                    chapters,
+                )
+            )
+            print(f"  ✓ Глав: {len(contents)}\n", file=sys.stderr)
+
+            # 2. Общие ассеты по функциям всех глав
+            print("🎨 Этап 2: Общие CSS/JS...", file=sys.stderr)
+            document = DocumentFeatures.combine(
+                DocumentFeatures.detect(content) for content in contents
+            )
+            head_html = self.template_processor.write_bundle(site_dir, document)
+            print("  ✓ Ассеты готовы\n", file=sys.stderr)
+
+            # 3. Страницы
+            print("🔄 Этап 3: Pandoc конвертация глав...", file=sys.stderr)
+            results = list(
+                executor.map(
+                    lambda i: self._render_page(
+                        chapters, pages, i, contents[i], site_dir, head_html
+                    ),
+                    range(len(chapters)),
+                )
+            )
+
+        prune_diagrams(site_dir, output_name, self.diagrams)
+        print(f"✅ Сайт готов: {site_dir / pages[0]}\n", file=sys.stderr)
+        return results
+
+    def _prepare(self, chapter: Chapter, input_path: Path, site_dir: Path) -> str:
+        """Препроцессинг главы до Pandoc (как в Converter.convert)."""
+        content = chapter.content
+
+        if self.config.input.source_type == "obsidian":
+            base_path = input_path.parent if input_path.is_file() else input_path
+            obsidian = ObsidianPreprocessor(base_path=base_path)
+            content = obsidian.process(content)
+            self.lookups.update(obsidian.lookups)
+
+        config = replace(self.config, media_mode="copy", output_dir=str(site_dir))
+        if self.config.features.mermaid:
+            mermaid_pp = MermaidPreprocessor(config, format_type="html", writer=self.writer)
+            content = mermaid_pp.process(content)
+            self.diagrams.update(mermaid_pp.diagrams)
+
+        media_processor = MediaProcessor(
+            mode="copy",
+            files_folder=self.config.input.files_folder,
+            output_dir=str(site_dir),
+            image_optimizer=self.image_optimizer,
+            video_optimizer=self.video_optimizer,
+            image_dimensions=self.config.images.dimensions,
+            copy_assets=False,
+            writer=self.writer,
+        )
+        content, _ = media_processor.process(content, chapter.source)
+        self.media_sources.extend(media_processor.sources)
+        self.lookups.update(media_processor.lookups)
+
+        if self.config.features.callouts:
+            content = CalloutsPreprocessor().process(content)
+        if self.config.features.diff_blocks:
+            content = DiffPreprocessor().process(content)
+        return content
+
+    def _render_page(
+        self,
+        chapters: list[Chapter],
+        pages: list[str],
+        index: int,
+        content: str,
+        site_dir: Path,
+        head_html: str,
+    ) -> Path:
+        """Pandoc + постобработка одной главы."""
+        chapter = chapters[index]
+        book_title = self.config.metadata.title
+        page_title = f"{chapter.title} — {book_title}" if book_title else chapter.title
+
+        # Заголовок книги не повторяется на каждой странице: у главы свой H1
+        config = replace(
+            self.config,
+            output_dir=str(site_dir),
+            media_mode="copy",
+            metadata=replace(self.config.metadata, title=""),
+            advanced=replace(
+                self.config.advanced,
+                pandoc_extra_args=[
+                    *self.config.advanced.pandoc_extra_args,
+                    "--metadata",
+                    f"pagetitle={page_title}",
+                ],
+            ),
+        )
+        body = "\n\n".join(
+            [
+                self._raw_html(self._sidebar_html(chapters, pages, index)),
+                content,
+                self._raw_html(self._pager_html(chapters, pages, index)),
+            ]
+        )
+
+        backend = PandocBackend(config, stylesheet=False, writer=self.writer)
+        return backend.convert(
+            content=body,
+            output_name=Path(pages[index]).stem,
+            format_type="html",
+            header=head_html,
+            postprocessors=self.postprocessors,
+        )
+
+    @staticmethod
+    def _page_name(index: int, chapter: Chapter) -> str:
+        """Первая глава - index.html, остальные - <slug>.html."""
+        return "index.html" if index == 0 else f"{chapter.slug}.html"
+
+    @staticmethod
+    def _raw_html(markup: str) -> str:
+        """Raw блок Pandoc: HTML вставляется как есть."""
+        return f"```{{=html}}\n{markup}\n```"
+
+    @staticmethod
+    def _sidebar_html(chapters: list[Chapter], pages: list[str], current: int) -> str:
+        """Боковое оглавление сайта (текущая глава отмечена aria-current)."""
+        items = []
+        for i, (chapter, page) in enumerate(zip(chapters, pages)):
+            current_attr = ' aria-current="page"' if i == current else ""
+            items.append(
+                f'<li{current_attr}><a href="{html.escape(page)}">'
+                f"{html.escape(chapter.title)}</a></li>"
+            )
+        return (
+            '<aside class="site-sidebar" aria-label="Оглавление"><ol>'
+            + "".join(items)
+            + "</ol></aside>"
+        )
+
+    @staticmethod
+    def _pager_html(chapters: list[Chapter], pages: list[str], current: int) -> str:
+        """Ссылки на предыдущую и следующую главы."""
+        links = []
+        if current > 0:
+            links.append(
+                f'<a class="site-pager-prev" rel="prev" href="{html.escape(pages[current - 1])}">'
+                f"← {html.escape(chapters[current - 1].title)}</a>"
+            )
+        if current < len(chapters) - 1:
+            links.append(
+                f'<a class="site-pager-next" rel="next" href="{html.escape(pages[current + 1])}">'
+                f"{html.escape(chapters[current + 1].title)} →</a>"
+            )
+        return (
+            '<nav class="site-pager" aria-label="Главы">' + "".join(links) + "</nav>"
+        )
@@ -0,0 +1,170 @@
+"""Запись результатов только при изменении содержимого."""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Union
+
+from .cache import write_atomic
+
+
+class OutputWriter:
+    """
+    Публикует файлы результата: атомарно (временный файл + rename) и
+    только если содержимое отличается от того, что уже лежит на диске.
+
+    Папки сборки синхронизируются (Syncthing): перезапись HTML, диаграмм
+    и медиа теми же байтами меняет mtime и гоняет гигабайты по сети.
+    Неизменённые файлы не трогаются вовсе, а синхронизация никогда не
+    видит недописанный файл.
+
+    Потокобезопасен: главы формата site пишут через один экземпляр.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Обнулить счётчики отчёта."""
+        with self._lock:
+            self.written_files = 0
+            self.written_bytes = 0
+            self.unchanged_files = 0
+            self.unchanged_bytes = 0
+
+    def write_bytes(self, path: Union[str, Path], data: bytes) -> bool:
+        """
+        Записать data в path, если содержимое отличается.
+
+        Returns:
+            True - файл записан, False - на диске те же байты
+        """
+        path = Path(path)
+        if _same_content(path, data):
+            self._count(False, len(data))
+            return False
+        write_atomic(path, data)
+        self._count(True, len(data))
+        return True
+
+    def write_text(self, path: Union[str, Path], text: str) -> bool:
+        """write_bytes для текста в UTF-8."""
+        return self.write_bytes(path, text.encode("utf-8"))
+
+    def move(self, source: Union[str, Path], target: Union[str, Path]) -> bool:
+        """
+        Опубликовать готовый временный файл (результат Pandoc) под именем target.
+
+        source должен лежать на той же файловой системе: rename без
+        копирования. Если target уже такой же, source удаляется.
+
+        Returns:
+            True - target заменён, False - target не изменился
+        """
+        source, target = Path(source), Path(target)
+        size = source.stat().st_size
+        try:
+            same = target.stat().st_size == size and _same_files(source, target)
+        except OSError:
+            same = False
+
+        if same:
+            source.unlink()
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+        self._count(not same, size)
+        return not same
+
+    def copy(self, source: Union[str, Path], target: Union[str, Path]) -> bool:
+        """
+        Скопировать файл (с mtime, как shutil.copy2), если target отличается.
+
+        Файл того же размера и mtime (прошлая копия) не читается.
+
+        Returns:
+            True - файл скопирован, False - target уже такой же
+        """
+        source, target = Path(source), Path(target)
+        source_stat = source.stat()
+        try:
+            target_stat = target.stat()
+        except OSError:
+            target_stat = None
+
+        if target_stat is not None and target_stat.st_size == source_stat.st_size:
+            if target_stat.st_mtime_ns == source_stat.st_mtime_ns or _same_files(
+                source, target
+            ):
+                self._count(False, source_stat.st_size)
+                return False
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", dir=target.parent)
+        os.close(fd)
+        try:
+            shutil.copy2(source, tmp_name)
+            os.replace(tmp_name, target)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        self._count(True, source_stat.st_size)
+        return True
+
+    def report(self) -> str:
+        """Сводка для лога: сколько реально записано."""
+        with self._lock:
+            return (
+                f"💾 Записано: {self.written_files} файлов "
+                f"({format_size(self.written_bytes)}), без изменений: "
+                f"{self.unchanged_files} ({format_size(self.unchanged_bytes)})"
+            )
+
+    def print_report(self):
+        """Сводка в stderr (если что-то публиковалось)."""
+        if self.written_files or self.unchanged_files:
+            print(f"  {self.report()}", file=sys.stderr)
+
+    def _count(self, written: bool, size: int):
+        with self._lock:
+            if written:
+                self.written_files += 1
+                self.written_bytes += size
+            else:
+                self.unchanged_files += 1
+                self.unchanged_bytes += size
+
+
+def format_size(size: int) -> str:
+    """Размер файла для логов: 4.2 MB, 310 KB."""
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{max(1, size // 1024)} KB" if size else "0 KB"
+
+
+def _same_content(path: Path, data: bytes) -> bool:
+    """На диске уже лежат именно эти байты."""
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+def _same_files(first: Path, second: Path) -> bool:
+    """Побайтовое сравнение файлов одного размера (блоками)."""
+    with open(first, "rb") as a, open(second, "rb") as b:
+        while True:
+            block = a.read(1 << 20)
+            if block != b.read(1 << 20):
+                return False
+            if not block:
+                return True
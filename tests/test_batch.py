@@ -0,0 +1,90 @@
+"""Тесты пакетной конвертации."""
+
+from pathlib import Path
+
+from md_converter import BatchReport, Converter, ConverterConfig
+from md_converter.batch import convert_many, expand_inputs, output_names
+
+
+def _write(path: Path, text: str = "# Урок\n") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_expand_inputs_glob_and_list(tmp_path):
+    """Glob, файл-список и обычные пути; повторы отбрасываются."""
+    first = _write(tmp_path / "lessons" / "01.md")
+    second = _write(tmp_path / "lessons" / "02.md")
+    _write(tmp_path / "lessons" / "notes.txt", "не документ")
+    course = tmp_path / "course"
+    _write(course / "a.md")
+    list_file = _write(tmp_path / "list.txt", "# курсы\ncourse\n\nlessons/01.md\n")
+
+    inputs = expand_inputs([str(tmp_path / "lessons" / "*.md"), str(list_file)])
+
+    assert [p.resolve() for p in inputs] == [
+        first.resolve(),
+        second.resolve(),
+        course.resolve(),
+    ]
+
+
+def test_output_names_disambiguated():
+    """Одинаковые имена файлов из разных папок не перезаписывают друг друга."""
+    names = output_names([Path("a/урок.md"), Path("b/урок.md"), Path("b/итоги.md")])
+
+    assert names == ["a_урок", "b_урок", "итоги"]
+
+
+def test_output_names_same_parent_name():
+    """Одинаковые и имя файла, и папка: различаются путём от общей папки."""
+    names = output_names(
+        [
+            Path("a/x/урок.md"),
+            Path("b/x/урок.md"),
+            Path("a_x_урок.md"),
+            Path("a/x/урок.md"),
+            Path("c/Урок.md"),
+        ]
+    )
+
+    assert names == ["a_x_урок", "b_x_урок", "a_x_урок_2", "a_x_урок_3", "c_Урок"]
+    assert len({name.casefold() for name in names}) == len(names)
+
+
+def test_continue_on_error_in_process(tmp_path, monkeypatch):
+    """jobs=1: ошибка одного документа попадает в отчёт, остальные собираются."""
+    good = _write(tmp_path / "good.md")
+    bad = _write(tmp_path / "bad.md")
+
+    def fake_convert(self, input_path, output_name=None):
+        if Path(input_path).stem == "bad":
+            raise RuntimeError("Pandoc завершился с ошибкой")
+        return [tmp_path / f"{output_name}.html"]
+
+    monkeypatch.setattr(Converter, "convert", fake_convert)
+    config = ConverterConfig(output_dir=str(tmp_path / "build"))
+    config.features.mermaid = False
+
+    report = Converter(config).convert_many([good, bad], jobs=1)
+
+    assert isinstance(report, BatchReport)
+    assert [item.input_path for item in report.items] == [good, bad]
+    assert report.items[0].outputs == [tmp_path / "good.html"]
+    assert [item.input_path for item in report.failed] == [bad]
+    assert "RuntimeError: Pandoc завершился с ошибкой" in report.items[1].error
+    assert "Готово: 1, ошибок: 1" in report.summary()
+
+
+def test_process_pool_reports_every_input(tmp_path):
+    """Пул процессов: отчёт по каждому входу в исходном порядке."""
+    inputs = [_write(tmp_path / f"{i}.md") for i in range(3)]
+    missing = tmp_path / "missing.md"
+    config = ConverterConfig(output_dir=str(tmp_path / "build"))
+    config.features.mermaid = False
+
+    report = convert_many(config, inputs + [missing], jobs=2)
+
+    assert [item.input_path for item in report.items] == inputs + [missing]
+    assert "Путь не существует" in report.items[-1].error
@@ -0,0 +1,159 @@
+"""Тесты штампа сборки (пропуск неизменённой сборки)."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from md_converter import Converter, ConverterConfig
+from md_converter.backends import PandocBackend
+from md_converter.buildstamp import BuildStamp
+
+
+@pytest.fixture
+def pandoc_calls(monkeypatch):
+    """Pandoc без Pandoc: пишет Markdown как есть, считает вызовы."""
+    calls = []
+
+    def fake_convert(self, content, output_name, format_type, header="", **kwargs):
+        calls.append(output_name)
+        output = Path(self.config.output_dir) / f"{output_name}.{format_type}"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(content, encoding="utf-8")
+        return output
+
+    monkeypatch.setattr(PandocBackend, "convert", fake_convert)
+    return calls
+
+
+def _project(tmp_path):
+    lesson = tmp_path / "lesson"
+    lesson.mkdir()
+    (lesson / "01.md").write_text("# Урок\n\n![](pic.png)\n", encoding="utf-8")
+    (lesson / "pic.png").write_bytes(b"\x89PNG fake")
+    config = ConverterConfig(output_dir=str(tmp_path / "build"))
+    config.features.mermaid = False
+    config.input.files_folder = str(lesson)
+    config.optimize.skip_unchanged = True
+    return lesson, config
+
+
+def _touch_later(path: Path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_unchanged_build_skipped(tmp_path, pandoc_calls):
+    """Повторная сборка без изменений не запускает Pandoc."""
+    lesson, config = _project(tmp_path)
+
+    first = Converter(config).convert(lesson, "lesson")
+    second = Converter(config).convert(lesson, "lesson")
+
+    assert pandoc_calls == ["lesson"]
+    assert [p.resolve() for p in second] == [p.resolve() for p in first]
+    assert (tmp_path / "build" / ".lesson.buildstamp.json").exists()
+
+
+def test_touch_without_changes_stays_up_to_date(tmp_path, pandoc_calls):
+    """Изменился только mtime - хеш тот же, пересборки нет."""
+    lesson, config = _project(tmp_path)
+    Converter(config).convert(lesson, "lesson")
+
+    _touch_later(lesson / "01.md")
+
+    assert BuildStamp(tmp_path / "build", "lesson").check(config, [lesson / "01.md"]) is None
+
+
+@pytest.mark.parametrize(
+    "change, reason",
+    [
+        (lambda lesson, config: (lesson / "01.md").write_text("# Новый\n\n![](pic.png)\n", encoding="utf-8"), "изменён"),
+        (lambda lesson, config: (lesson / "pic.png").write_bytes(b"\x89PNG other"), "pic.png"),
+        (lambda lesson, config: (lesson / "02.md").write_text("# Ещё\n", encoding="utf-8"), "добавлен файл"),
+        (lambda lesson, config: setattr(config.features, "toc", False), "изменился конфиг"),
+    ],
+)
+def test_change_reported(tmp_path, pandoc_calls, change, reason):
+    """Изменение любого входа - пересборка с указанием причины."""
+    lesson, config = _project(tmp_path)
+    Converter(config).convert(lesson, "lesson")
+
+    change(lesson, config)
+    for path in lesson.iterdir():
+        _touch_later(path)
+    input_files = sorted(lesson.glob("*.md"))
+
+    result = BuildStamp(tmp_path / "build", "lesson").check(config, input_files)
+    assert result is not None and reason in result
+
+    Converter(config).convert(lesson, "lesson")
+    assert len(pandoc_calls) == 2
+
+
+def test_missing_output_rebuilds(tmp_path, pandoc_calls):
+    """Удалённый результат собирается заново."""
+    lesson, config = _project(tmp_path)
+    (output,) = Converter(config).convert(lesson, "lesson")
+
+    output.unlink()
+    Converter(config).convert(lesson, "lesson")
+
+    assert len(pandoc_calls) == 2 and output.exists()
+
+
+def test_unresolved_media_appears(tmp_path, pandoc_calls):
+    """Ссылка на ещё не созданный файл: появился файл - пересборка."""
+    lesson, config = _project(tmp_path)
+    (lesson / "01.md").write_text("# Урок\n\n![](later.png)\n", encoding="utf-8")
+    Converter(config).convert(lesson, "lesson")
+
+    (lesson / "later.png").write_bytes(b"\x89PNG new")
+
+    reason = BuildStamp(tmp_path / "build", "lesson").check(config, [lesson / "01.md"])
+    assert reason is not None and "later.png" in reason
+
+
+def test_higher_priority_media_appears(tmp_path, pandoc_calls):
+    """Файл появился в files_folder (приоритет выше папки MD) - пересборка."""
+    lesson, config = _project(tmp_path)
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    config.input.files_folder = str(vault)
+    Converter(config).convert(lesson, "lesson")
+    assert BuildStamp(tmp_path / "build", "lesson").check(config, [lesson / "01.md"]) is None
+
+    (vault / "pic.png").write_bytes(b"\x89PNG vault")
+
+    reason = BuildStamp(tmp_path / "build", "lesson").check(config, [lesson / "01.md"])
+    assert reason is not None and "pic.png" in reason
+
+
+def test_obsidian_attachment_listing(tmp_path, pandoc_calls):
+    """Вложение Obsidian: новый файл с тем же именем раньше в rglob - пересборка."""
+    lesson, config = _project(tmp_path)
+    config.input.source_type = "obsidian"
+    config.input.files_folder = ""
+    (lesson / "pic.png").unlink()
+    (lesson / "b").mkdir()
+    (lesson / "b" / "pic.png").write_bytes(b"\x89PNG b")
+    (lesson / "01.md").write_text("# Урок\n\n![[pic.png]]\n", encoding="utf-8")
+    Converter(config).convert(lesson, "lesson")
+    assert BuildStamp(tmp_path / "build", "lesson").check(config, [lesson / "01.md"]) is None
+
+    (lesson / "a").mkdir()
+    (lesson / "a" / "pic.png").write_bytes(b"\x89PNG a")
+
+    reason = BuildStamp(tmp_path / "build", "lesson").check(config, [lesson / "01.md"])
+    assert reason is not None and "pic.png" in reason
+
+
+def test_stamp_is_opt_in(tmp_path, pandoc_calls):
+    """По умолчанию (и с CLI --force) штамп не используется - всегда сборка."""
+    lesson, config = _project(tmp_path)
+    config.optimize.skip_unchanged = ConverterConfig().optimize.skip_unchanged
+
+    Converter(config).convert(lesson, "lesson")
+    Converter(config).convert(lesson, "lesson")
+
+    assert len(pandoc_calls) == 2
@@ -0,0 +1,100 @@
+"""Тесты отбора и минификации CSS."""
+
+from pathlib import Path
+
+from md_converter.config import FeaturesConfig, OptimizeConfig, StylesConfig
+from md_converter.preprocessors import CalloutsPreprocessor, DiffPreprocessor
+from md_converter.processors import CssOptimizer, DocumentFeatures, TemplateProcessor
+from md_converter.processors.template import clear_header_cache
+
+ASSETS = Path(__file__).parent.parent / "assets" / "css" / "modules"
+
+
+class TestDocumentFeatures:
+    """Определение функций документа."""
+
+    def test_detect_callouts_after_preprocessing(self):
+        md = CalloutsPreprocessor().process("> [!WARNING] Осторожно\n> Текст")
+        features = DocumentFeatures.detect(md)
+        assert features.callout_types == frozenset({"warning"})
+        assert not features.has_diff
+
+    def test_detect_diff_media_mermaid(self):
+        md = DiffPreprocessor().process("```diff-python\n-a\n+b\n```")
+        md += "\n![Видео](media/lesson.mp4)\n![Mermaid Diagram 1](media/d.webp)\n"
+        features = DocumentFeatures.detect(md)
+        assert features.has_diff
+        assert features.has_media
+        assert features.has_mermaid
+
+    def test_closing_fence_does_not_take_next_line(self):
+        features = DocumentFeatures.detect(":::: note\ntext\n::::\nwarning here\n")
+        assert features.callout_types == frozenset({"note"})
+
+    def test_plain_document(self):
+        features = DocumentFeatures.detect("# Заголовок\n\n![](pic.png)")
+        assert features == DocumentFeatures()
+
+
+class TestCssOptimizer:
+    """Отбор правил и минификация."""
+
+    def test_prune_keeps_only_used_callouts(self):
+        css = (ASSETS / "admonitions.css").read_text(encoding="utf-8")
+        doc = DocumentFeatures(callout_types=frozenset({"note"}))
+        result = CssOptimizer(prune=True, minify=False).process(css, doc)
+
+        assert "div.note" in result
+        assert "div.warning" not in result
+        assert "section.bug" not in result
+        assert len(result) < len(css) / 4
+
+    def test_prune_nested_media_rules(self):
+        css = (
+            "@media (prefers-color-scheme: dark) {"
+            " div.note { color: red; } div.bug { color: blue; } }"
+            "@media print { div.bug { display: none; } }"
+        )
+        doc = DocumentFeatures(callout_types=frozenset({"note"}))
+        result = CssOptimizer(prune=True, minify=True).process(css, doc)
+        assert result == "@media (prefers-color-scheme: dark){div.note{color:red}}"
+
+    def test_prune_mermaid_selectors(self):
+        css = 'img[alt*="Mermaid Diagram"] { cursor: zoom-in; } pre { margin: 0; }'
+        result = CssOptimizer(prune=True, minify=True).process(css, DocumentFeatures())
+        assert result == "pre{margin:0}"
+
+    def test_minify_preserves_strings_and_keyframes(self):
+        css = """
+        /* комментарий */
+        .a > .b ,  .c  { content: "a  ;  b"; background: url(data:image/png;base64,AA==); }
+        @keyframes fade { from { opacity: 0; } to { opacity: 1; } }
+        """
+        result = CssOptimizer(prune=False, minify=True).process(css)
+        assert result == (
+            '.a>.b,.c{content:"a  ;  b";background:url(data:image/png;base64,AA==)}'
+            "@keyframes fade{from{opacity:0}to{opacity:1}}"
+        )
+
+
+def test_header_prunes_unused_modules():
+    """В header не попадают diff.css и media.css если их нет в документе."""
+    clear_header_cache()
+    processor = TemplateProcessor(
+        template="web",
+        features=FeaturesConfig(),
+        styles=StylesConfig(),
+        media_mode="embed",
+        optimize=OptimizeConfig(css_prune=True, css_minify=True),
+    )
+    doc = DocumentFeatures(callout_types=frozenset({"tip"}))
+    pruned = processor.build_header("html", doc)
+
+    processor.optimize = OptimizeConfig()
+    processor.css_optimizer = CssOptimizer(prune=False, minify=False)
+    full = processor.build_header("html", doc)
+
+    assert ".diff-old" not in pruned
+    assert "figure.media-player" not in pruned
+    assert "div.tip" in pruned
+    assert len(pruned) < len(full) / 2
@@ -0,0 +1,100 @@
+"""Тесты размеров изображений из заголовков и атрибутов width/height."""
+
+import io
+
+import pytest
+
+from md_converter.processors import MediaProcessor
+from md_converter.processors.dimensions import image_size, image_size_from_bytes
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _encode(fmt: str, size=(321, 123), **params) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "teal").save(buffer, fmt, **params)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "fmt, params",
+    [
+        ("PNG", {}),
+        ("JPEG", {}),
+        ("JPEG", {"progressive": True}),
+        ("GIF", {}),
+        ("BMP", {}),
+        ("WEBP", {"lossless": True}),
+        ("WEBP", {"quality": 50}),
+    ],
+)
+def test_raster_headers(fmt, params):
+    """Размер без декодирования для растровых форматов."""
+    assert image_size_from_bytes(_encode(fmt, **params)) == (321, 123)
+
+
+def test_jpeg_exif_rotation_swaps_sides():
+    """Ориентация EXIF 6 (поворот на 90°): браузер покажет 123×321."""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    assert image_size_from_bytes(_encode("JPEG", exif=exif.tobytes())) == (123, 321)
+
+
+@pytest.mark.parametrize(
+    "svg, expected",
+    [
+        ('<svg xmlns="http://www.w3.org/2000/svg" width="640" height="480px">', (640, 480)),
+        ('<svg viewBox="0 0 812.5 300" width="100%">', (812, 300)),
+        ("<?xml version='1.0'?>\n<svg viewBox='0,0,20,10'>", (20, 10)),
+        ("<svg>", None),
+    ],
+)
+def test_svg_size(svg, expected):
+    """SVG: width/height в px, иначе viewBox."""
+    assert image_size_from_bytes(svg.encode()) == expected
+
+
+def test_image_size_cached_by_mtime(tmp_path):
+    """Файл перечитывается только после изменения."""
+    path = tmp_path / "pic.png"
+    path.write_bytes(_encode("PNG"))
+    assert image_size(path) == (321, 123)
+
+    path.write_bytes(_encode("PNG", size=(10, 20)))
+    assert image_size(path) == (10, 20)
+    assert image_size(tmp_path / "missing.png") is None
+
+
+def test_media_processor_adds_dimensions(tmp_path):
+    """width/height, lazy и async; заданная ширина в px дополняется высотой."""
+    (tmp_path / "pic.png").write_bytes(_encode("PNG", size=(800, 400)))
+    (tmp_path / "clip.mp4").write_bytes(b"\0" * 64)
+    processor = MediaProcessor(mode="copy", output_dir=str(tmp_path / "build"), copy_assets=False)
+    content = (
+        "![a](pic.png)\n![b](pic.png){width=50%}\n![c](clip.mp4)\n"
+        '<img src="pic.png" width="300" />'
+    )
+
+    result, _ = processor.process(content, tmp_path / "doc.md")
+
+    assert result == (
+        '![a](media/pic.png){width="800" height="400" loading="lazy" decoding="async"}\n'
+        '![b](media/pic.png){width=50% loading="lazy" decoding="async"}\n'
+        "![c](media/clip.mp4)\n"
+        '<img src="media/pic.png" height="150" loading="lazy" decoding="async" width="300" />'
+    )
+
+
+def test_dimensions_disabled(tmp_path):
+    """images.dimensions: false - разметка как раньше."""
+    (tmp_path / "pic.png").write_bytes(_encode("PNG"))
+    processor = MediaProcessor(
+        mode="copy",
+        output_dir=str(tmp_path / "build"),
+        copy_assets=False,
+        image_dimensions=False,
+    )
+
+    result, _ = processor.process("![a](pic.png)", tmp_path / "doc.md")
+
+    assert result == "![a](media/pic.png)"
@@ -0,0 +1,149 @@
+"""Тесты инкрементальной упаковки EPUB (optimize.incremental_epub)."""
+
+import re
+import zipfile
+
+from md_converter.backends import EpubRepacker
+from md_converter.backends.epub import _raw_data, _stub, split_chapters
+
+IMAGES = {"a.png": b"image-a" * 50, "b.png": b"image-b" * 50, "c.png": b"image-c" * 50}
+
+BOOK = """# Введение
+
+Текст ![](a.png) и [ссылка](#итоги).
+
+# Основы {#basics}
+
+## Детали
+
+Параграф ![](b.png) со [якорем]{#anchor}.
+
+```python
+# не заголовок
+```
+
+Итоги
+=====
+
+Конец ![](c.png).
+"""
+
+
+def _fake_pandoc(markdown: str, path):
+    """Архив как у Pandoc: text/chNNN.xhtml, media/fileN по порядку, OPF, nav."""
+    media = []
+
+    def image(match):
+        media.append(IMAGES[match.group(1)])
+        return f'<img src="../media/file{len(media) - 1}.png" />'
+
+    chapters = []
+    for chapter in split_chapters(markdown):
+        body = re.sub(r"!\[\]\(([^)]+)\)", image, chapter)
+        chapters.append(f"<html><body>{body}</body></html>")
+    headings = re.findall(r"^#+ .*$|^.+(?=\n=+$)", markdown, re.M)
+    items = "".join(
+        f'<item id="file{n}_png" href="media/file{n}.png" media-type="image/png" />\n'
+        for n in range(len(media))
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip")
+        archive.writestr("EPUB/content.opf", f"<package><manifest>\n{items}  </manifest></package>")
+        archive.writestr("EPUB/nav.xhtml", "\n".join(headings))
+        for number, xhtml in enumerate(chapters, 1):
+            archive.writestr(f"EPUB/text/ch{number:03d}.xhtml", xhtml)
+        for number, data in enumerate(media):
+            archive.writestr(f"EPUB/media/file{number}.png", data)
+
+
+def _build(tmp_path, markdown: str, output) -> EpubRepacker:
+    """Сборка как в PandocBackend: заготовки → Pandoc → перепаковка → публикация."""
+    repacker = EpubRepacker(output, markdown, "context")
+    source = repacker.stub_content() or markdown
+    _fake_pandoc(source, tmp_path / "pandoc.epub")
+    assert repacker.repack(tmp_path / "pandoc.epub", tmp_path / "repacked.epub") is not None
+    (tmp_path / "repacked.epub").replace(output)
+    repacker.save()
+    return repacker
+
+
+def test_split_chapters_like_pandoc():
+    """Деление по # и === вне блоков кода."""
+    chapters = split_chapters("Вступление\n\n" + BOOK)
+
+    assert [c.splitlines()[0] for c in chapters] == [
+        "Вступление",
+        "# Введение",
+        "# Основы {#basics}",
+        "Итоги",
+    ]
+    assert "".join(chapters) == "Вступление\n\n" + BOOK
+
+
+def test_stub_keeps_headings_and_anchors():
+    """Заготовка: заголовки и явные id, без текста и кода."""
+    chapter = split_chapters(BOOK)[1]
+
+    assert _stub(chapter) == "# Основы {#basics}\n\n[]{#anchor}\n\n## Детали\n\n"
+    assert _stub("Текст без заголовков\n") == ""
+
+
+def test_unchanged_chapters_copied_raw(tmp_path):
+    """Правка одной главы: остальные главы и их медиа - байты прошлой сборки."""
+    output = tmp_path / "book.epub"
+    first = _build(tmp_path, BOOK, output)
+    assert first.reused == set()
+    with zipfile.ZipFile(output) as archive, open(output, "rb") as fp:
+        names = archive.namelist()
+        before = {name: _raw_data(fp, archive.getinfo(name)) for name in names}
+    media = sorted(name for name in names if "/media/" in name)
+    assert len(media) == 3 and not any("file" in name for name in media)
+
+    edited = BOOK.replace("Параграф", "Новый параграф")
+    second = _build(tmp_path, edited, output)
+
+    assert second.reused == {0, 2}
+    with zipfile.ZipFile(output) as archive, open(output, "rb") as fp:
+        assert archive.testzip() is None
+        assert archive.namelist()[0] == "mimetype"
+        after = {name: _raw_data(fp, archive.getinfo(name)) for name in archive.namelist()}
+        chapter = archive.read("EPUB/text/ch002.xhtml").decode()
+        opf = archive.read("EPUB/content.opf").decode()
+    for name in ("EPUB/text/ch001.xhtml", "EPUB/text/ch003.xhtml", *media):
+        assert after[name] == before[name]
+    assert "Новый параграф" in chapter
+    assert sorted(name for name in after if "/media/" in name) == media
+    for name in media:
+        assert opf.count(name.split("EPUB/")[1]) == 1
+
+
+def test_changed_structure_full_build(tmp_path):
+    """Новый заголовок - другая структура: все главы собираются заново."""
+    output = tmp_path / "book.epub"
+    _build(tmp_path, BOOK, output)
+
+    repacker = EpubRepacker(output, BOOK.replace("## Детали", "## Подробности"), "context")
+
+    assert repacker.stub_content() is None
+
+
+def test_other_context_or_replaced_epub_full_build(tmp_path):
+    """Другие настройки Pandoc или чужой EPUB - прошлая сборка не используется."""
+    output = tmp_path / "book.epub"
+    _build(tmp_path, BOOK, output)
+    assert EpubRepacker(output, BOOK, "other").stub_content() is None
+
+    output.write_bytes(output.read_bytes() + b"\0")
+    assert EpubRepacker(output, BOOK, "context").stub_content() is None
+
+
+def test_mismatched_stub_build_rejected(tmp_path):
+    """Оглавление заготовки не совпало с прошлым - repack возвращает None."""
+    output = tmp_path / "book.epub"
+    _build(tmp_path, BOOK, output)
+    repacker = EpubRepacker(output, BOOK.replace("Параграф", "Другой"), "context")
+    stub = repacker.stub_content()
+
+    _fake_pandoc(stub.replace("## Детали", "## Иначе"), tmp_path / "pandoc.epub")
+
+    assert repacker.repack(tmp_path / "pandoc.epub", tmp_path / "out.epub") is None
@@ -0,0 +1,92 @@
+"""Тесты подмножеств шрифтов (fonts.subset)."""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+from md_converter import ConverterConfig
+from md_converter.backends import PandocBackend
+from md_converter.processors import FontSubsetter
+from md_converter.processors.fonts import collect_codepoints, font_stylesheet
+
+FONTS_DIR = Path(__file__).resolve().parents[1] / "assets" / "fonts"
+
+
+def test_codepoints_from_text_and_base_set():
+    """Символы текста плюс ASCII и типографика; управляющие - нет."""
+    codepoints = collect_codepoints("Щука\tи ёж → 🦔")
+
+    for char in "Щукаиёж→🦔AZ09«»—":
+        assert ord(char) in codepoints
+    assert ord("\t") not in codepoints
+    assert codepoints == sorted(set(codepoints))
+
+
+def test_stylesheet_points_to_subsets(tmp_path):
+    """url() шрифтов - на подмножества, остальные относительные - абсолютные."""
+    css_dir = tmp_path / "assets" / "css"
+    css_dir.mkdir(parents=True)
+    css = css_dir / "book_style.css"
+    css.write_text(
+        '@import url("./modules/admonitions.css");\n'
+        '@font-face { src: url("../fonts/Montserrat.ttf"); }\n'
+        "@font-face { src: url('../fonts/Other.ttf'); }\n"
+        ".icon { background: url(data:image/png;base64,AAAA); }\n",
+        encoding="utf-8",
+    )
+    subset = tmp_path / "cache" / "Montserrat.woff2"
+
+    result = font_stylesheet(css, {"Montserrat.ttf": subset}, tmp_path / "out.css")
+
+    text = result.read_text(encoding="utf-8")
+    assert f'url("{(css_dir / "modules" / "admonitions.css").as_posix()}")' in text
+    assert f'url("{subset.as_posix()}")' in text
+    assert f'url("{(tmp_path / "assets" / "fonts" / "Other.ttf").as_posix()}")' in text
+    assert "url(data:image/png;base64,AAAA)" in text
+
+
+def test_without_fonttools_keeps_full_fonts(tmp_path, monkeypatch):
+    """Без fontTools - {}: шрифты вшиваются целиком."""
+    (tmp_path / "Font.ttf").write_bytes(b"\0" * 16)
+    monkeypatch.setitem(sys.modules, "fontTools", None)
+
+    subsetter = FontSubsetter(tmp_path, cache_dir=tmp_path / "cache")
+
+    assert subsetter.subset_fonts("текст") == {}
+    assert not (tmp_path / "cache").exists()
+
+
+def test_epub_embeds_subsets_under_same_name(tmp_path):
+    """EPUB: --epub-embed-font с подмножеством вместо исходного файла."""
+    fonts_dir = tmp_path / "fonts"
+    fonts_dir.mkdir()
+    (fonts_dir / "A.ttf").write_bytes(b"a")
+    (fonts_dir / "B.ttf").write_bytes(b"b")
+    subset = tmp_path / "cache" / "A.ttf"
+    config = ConverterConfig.from_dict({"fonts": {"dir": str(fonts_dir), "subset": True}})
+    cmd = []
+
+    PandocBackend(config)._configure_epub(cmd, "book", {"A.ttf": subset})
+
+    embedded = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "--epub-embed-font"]
+    assert embedded == [str(subset), str(fonts_dir / "B.ttf")]
+
+
+def test_subset_is_smaller_and_cached(tmp_path):
+    """Реальное подмножество: меньше исходного, повтор - из кеша."""
+    pytest.importorskip("fontTools.subset")
+    fonts_dir = tmp_path / "fonts"
+    fonts_dir.mkdir()
+    shutil.copy(FONTS_DIR / "Montserrat.ttf", fonts_dir)
+    subsetter = FontSubsetter(fonts_dir, cache_dir=tmp_path / "cache")
+
+    subsets = subsetter.subset_fonts("Привет, мир!")
+
+    subset = subsets["Montserrat.ttf"]
+    assert subset.name == "Montserrat.ttf"
+    assert subset.stat().st_size < (fonts_dir / "Montserrat.ttf").stat().st_size
+    mtime = subset.stat().st_mtime_ns
+    assert subsetter.subset_fonts("Привет, мир!")["Montserrat.ttf"] == subset
+    assert subset.stat().st_mtime_ns == mtime
@@ -0,0 +1,75 @@
+"""Тесты подсветки кода при сборке."""
+
+import pytest
+
+pytest.importorskip("pygments")
+
+from md_converter.config import FeaturesConfig, StylesConfig
+from md_converter.postprocessors import HighlightPostprocessor
+from md_converter.postprocessors import highlight as highlight_module
+from md_converter.preprocessors import DiffPreprocessor
+from md_converter.processors import TemplateProcessor
+from md_converter.processors.template import clear_header_cache
+
+
+@pytest.fixture
+def postprocessor(tmp_path, monkeypatch):
+    monkeypatch.setenv("MD_CONVERTER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(highlight_module, "_FRAGMENT_CACHE", {})
+    return HighlightPostprocessor()
+
+
+def test_pandoc_block_gets_hljs_classes(postprocessor):
+    html = '<pre class="python"><code>def f(x):\n    return &quot;a&quot;  # c</code></pre>'
+    result = postprocessor.process(html)
+
+    assert '<code class="hljs language-python">' in result
+    assert '<span class="hljs-keyword">def</span>' in result
+    assert '<span class="hljs-title function_">f</span>' in result
+    assert '<span class="hljs-string">&quot;a&quot;</span>' not in result
+    assert '<span class="hljs-string">"a"</span>' in result
+    assert '<span class="hljs-comment"># c</span>' in result
+
+
+def test_diff_blocks_highlighted(postprocessor):
+    md = DiffPreprocessor().process("```diff-python\n-x = 1\n+x = 2\n```")
+    result = postprocessor.process(md)
+
+    assert result.count('class="hljs language-python"') == 2
+    assert '<span class="hljs-number">2</span>' in result
+
+
+def test_unknown_language_untouched(postprocessor):
+    html = '<pre class="klingon"><code>Qapla&#39;</code></pre>'
+    assert postprocessor.process(html) == html
+
+
+def test_fragments_cached(postprocessor, monkeypatch):
+    html = '<pre class="python"><code>import os</code></pre>'
+    first = postprocessor.process(html)
+
+    def fail(*args):
+        raise AssertionError("фрагмент должен браться из кеша")
+
+    monkeypatch.setattr(highlight_module, "_highlight_tokens", fail)
+    assert postprocessor.process(html) == first
+
+    # Дисковый кеш переживает очистку памяти (другой процесс batch-сборки)
+    monkeypatch.setattr(highlight_module, "_FRAGMENT_CACHE", {})
+    assert postprocessor.process(html) == first
+
+
+def test_header_without_client_highlighter():
+    clear_header_cache()
+    processor = TemplateProcessor(
+        template="web",
+        features=FeaturesConfig(),
+        styles=StylesConfig(highlight_mode="build"),
+        media_mode="embed",
+    )
+    header = processor.build_header("html")
+
+    assert "github-dark.min.css" in header
+    assert "highlight.min.js" not in header
+    assert "hljs.highlightAll" not in header
+    clear_header_cache()
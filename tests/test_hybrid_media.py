@@ -0,0 +1,81 @@
+"""Тесты режима media_mode: hybrid (встроить небольшие, скопировать большие)."""
+
+from md_converter import ConverterConfig
+from md_converter.config import HybridConfig
+from md_converter.processors import MediaProcessor
+
+CONTENT = """# Лекция
+
+![Схема](scheme.png)
+
+![Запись](lecture.mp4)
+
+![Фото](photo.jpg)
+
+![Звук](jingle.mp3)
+
+<img src="scheme.png" width="200">
+"""
+
+
+def _sources(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "scheme.png").write_bytes(b"\x89PNG" + b"0" * 2000)
+    (source_dir / "lecture.mp4").write_bytes(b"0" * 300_000)
+    (source_dir / "photo.jpg").write_bytes(b"0" * 900_000)
+    (source_dir / "jingle.mp3").write_bytes(b"0" * 4000)
+    return source_dir / "doc.md"
+
+
+def test_hybrid_splits_by_size_and_type(tmp_path):
+    """Небольшие картинки встраиваются, видео и большие файлы копируются."""
+    input_path = _sources(tmp_path)
+    output_dir = tmp_path / "build"
+    processor = MediaProcessor(
+        mode="hybrid", output_dir=str(output_dir), hybrid=HybridConfig(embed_max_kb=512)
+    )
+
+    content, media_map = processor.process(CONTENT, input_path)
+
+    scheme = str((input_path.parent / "scheme.png").resolve()).replace("\\", "/")
+    assert media_map["scheme.png"] == scheme
+    assert media_map["lecture.mp4"] == "media/lecture.mp4"  # не image
+    assert media_map["photo.jpg"] == "media/photo.jpg"  # больше порога
+    assert media_map["jingle.mp3"] == "media/jingle.mp3"
+    assert sorted(p.name for p in (output_dir / "media").iterdir()) == [
+        "jingle.mp3",
+        "lecture.mp4",
+        "photo.jpg",
+    ]
+    # Скопированные помечены для Pandoc --embed-resources, встроенные - нет
+    assert '![Запись](media/lecture.mp4){data-external="1"}' in content
+    lazy = 'loading="lazy" decoding="async"'
+    assert f"![Схема]({scheme}){{{lazy}}}\n" in content
+    assert f'<img src="{scheme}" {lazy} width="200">' in content
+    # CSS/JS встраиваются: assets/ не копируется
+    assert not (output_dir / "assets").exists()
+
+
+def test_hybrid_embed_types_by_extension_and_kind(tmp_path):
+    """embed_types: категория MIME или расширение."""
+    input_path = _sources(tmp_path)
+    processor = MediaProcessor(
+        mode="hybrid",
+        output_dir=str(tmp_path / "build"),
+        hybrid=HybridConfig(embed_max_kb=1024, embed_types=["audio", ".JPG"]),
+    )
+
+    _, media_map = processor.process(CONTENT, input_path)
+
+    copied = {path for path, new in media_map.items() if new.startswith("media/")}
+    assert copied == {"scheme.png", "lecture.mp4"}
+
+
+def test_hybrid_config_from_dict():
+    """Секция hybrid в конфиге."""
+    config = ConverterConfig.from_dict(
+        {"media_mode": "hybrid", "hybrid": {"embed_max_kb": 64, "embed_types": ["image"]}}
+    )
+    assert config.media_mode == "hybrid"
+    assert config.hybrid.embed_max_kb == 64
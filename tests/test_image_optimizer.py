@@ -0,0 +1,166 @@
+"""Тесты оптимизации изображений."""
+
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from md_converter.config import ImagesConfig
+from md_converter.processors import ImageOptimizer, MediaProcessor
+from md_converter import messages
+from md_converter.processors import image as image_module
+
+
+def _make_png(path, width, height):
+    """PNG из шума: плохо сжимается без потерь, как фото или скриншот."""
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    image.save(path, format="PNG")
+    return path
+
+
+@pytest.fixture
+def screenshot(tmp_path):
+    return _make_png(tmp_path / "Pasted image 1.png", 800, 400)
+
+
+@pytest.fixture
+def optimizer(tmp_path):
+    config = ImagesConfig(optimize=True, max_width=400, format="webp", quality=70)
+    return ImageOptimizer(config, cache_dir=tmp_path / "cache")
+
+
+def test_resized_and_transcoded(optimizer, screenshot):
+    result = optimizer.optimize(screenshot)
+
+    assert result.suffix == ".webp"
+    assert result.stat().st_size < screenshot.stat().st_size
+    with Image.open(result) as image:
+        assert image.format == "WEBP"
+        assert image.size == (400, 200)
+
+
+def test_cached_by_content_and_settings(optimizer, screenshot, monkeypatch):
+    first = optimizer.optimize(screenshot)
+
+    def fail(*args):
+        raise AssertionError("результат должен браться из кеша")
+
+    monkeypatch.setattr(ImageOptimizer, "_encode", fail)
+    assert optimizer.optimize(screenshot) == first
+
+    # Другие настройки - другой файл кеша
+    other = ImageOptimizer(
+        ImagesConfig(optimize=True, max_width=200), cache_dir=optimizer.cache_dir
+    )
+    monkeypatch.undo()
+    assert other.optimize(screenshot) != first
+
+
+def test_larger_result_keeps_original(optimizer, screenshot, monkeypatch):
+    monkeypatch.setattr(
+        ImageOptimizer, "_encode", lambda self, data, fmt, width: data + b"\0"
+    )
+    assert optimizer.optimize_many([screenshot]) == {}
+
+    # Решение запомнено: повторно не перекодируется
+    monkeypatch.setattr(ImageOptimizer, "_encode", None)
+    assert optimizer.optimize(screenshot) is None
+
+
+def test_non_raster_untouched(tmp_path, optimizer):
+    gif = tmp_path / "anim.gif"
+    Image.new("RGB", (1000, 10)).save(gif, format="GIF")
+
+    assert optimizer.optimize_many([gif]) == {}
+
+
+def test_media_processor_copy_mode(tmp_path, optimizer, screenshot):
+    output_dir = tmp_path / "build"
+    processor = MediaProcessor(
+        mode="copy", output_dir=str(output_dir), image_optimizer=optimizer
+    )
+    processor._copy_assets = lambda: None
+    md_file = tmp_path / "lesson.md"
+    content = "![shot](Pasted%20image%201.png)"
+
+    result, media_map = processor.process(content, md_file)
+
+    assert result == (
+        '![shot](media/Pasted image 1.webp)'
+        '{width="400" height="200" loading="lazy" decoding="async"}'
+    )
+    assert (output_dir / "media" / "Pasted image 1.webp").exists()
+    assert not (output_dir / "media" / "Pasted image 1.png").exists()
+
+
+def test_media_processor_embed_mode(tmp_path, optimizer, screenshot):
+    processor = MediaProcessor(mode="embed", image_optimizer=optimizer)
+    result, media_map = processor.process("![shot](Pasted image 1.png)", tmp_path / "a.md")
+
+    embedded = media_map["Pasted image 1.png"]
+    assert embedded.endswith(".webp")
+    assert embedded.startswith(str(optimizer.cache_dir.resolve()).replace("\\", "/"))
+
+
+def test_missing_pillow_leaves_images(monkeypatch, optimizer, screenshot):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_pil(name, *args, **kwargs):
+        if name == "PIL" or name.startswith("PIL."):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_pil)
+    monkeypatch.setattr(messages, "_warned", set())
+    assert optimizer.optimize_many([screenshot]) == {}
+
+
+def test_old_pillow_leaves_images(monkeypatch, optimizer, screenshot, capsys):
+    """Pillow < 9.1 (без Image.Resampling/Quantize) - предупреждение, а не AttributeError."""
+    monkeypatch.delattr(Image, "Resampling")
+    monkeypatch.delattr(Image, "Quantize")
+    monkeypatch.setattr(messages, "_warned", set())
+
+    assert optimizer.optimize_many([screenshot]) == {}
+    assert "Pillow >= 9.1" in capsys.readouterr().err
+    assert image_module.encode_palette(screenshot.read_bytes()) is None
+
+
+def test_srcset_variants_copy_mode(tmp_path, screenshot):
+    config = ImagesConfig(srcset_widths=[200, 400, 1600], sizes="100vw")
+    optimizer = ImageOptimizer(config, cache_dir=tmp_path / "cache")
+    output_dir = tmp_path / "build"
+    processor = MediaProcessor(
+        mode="copy", output_dir=str(output_dir), image_optimizer=optimizer
+    )
+    processor._copy_assets = lambda: None
+    content = '![a](Pasted image 1.png){width=50%}\n<img src="Pasted image 1.png" width="300">'
+
+    result, _ = processor.process(content, tmp_path / "lesson.md")
+
+    srcset = (
+        'srcset="media/Pasted%20image%201-200w.webp 200w, '
+        "media/Pasted%20image%201-400w.webp 400w, "
+        'media/Pasted%20image%201.png 800w" sizes="100vw"'
+    )
+    lazy = 'loading="lazy" decoding="async"'
+    assert result == (
+        "![a](media/Pasted image 1.png){width=50% " + srcset + " " + lazy + "}\n"
+        '<img src="media/Pasted image 1.png" height="150" ' + lazy + " " + srcset
+        + ' width="300">'
+    )
+    with Image.open(output_dir / "media" / "Pasted image 1-200w.webp") as image:
+        assert image.size == (200, 100)
+
+
+def test_srcset_not_in_embed_mode(tmp_path, screenshot):
+    optimizer = ImageOptimizer(
+        ImagesConfig(srcset_widths=[200]), cache_dir=tmp_path / "cache"
+    )
+    processor = MediaProcessor(mode="embed", image_optimizer=optimizer)
+    result, _ = processor.process("![a](Pasted image 1.png)", tmp_path / "a.md")
+
+    assert "srcset=" not in result
@@ -0,0 +1,39 @@
+"""Тесты ленивой инициализации JS функций."""
+
+from md_converter.config import FeaturesConfig, StylesConfig
+from md_converter.processors import TemplateProcessor
+from md_converter.processors.template import clear_header_cache
+
+
+def build_header(**features) -> str:
+    clear_header_cache()
+    processor = TemplateProcessor(
+        template="web",
+        features=FeaturesConfig(**features),
+        styles=StylesConfig(),
+        media_mode="embed",
+    )
+    return processor.build_header("html")
+
+
+def test_lazy_hydration_header():
+    """В lazy режиме функции регистрируются в initLazyHydration."""
+    header = build_header(lazy_hydration=True)
+
+    assert "function initLazyHydration" in header
+    assert "initLazyHydration(hydrators);" in header
+    assert "function addCodeCopyButton(preBlock)" in header
+    assert "function setupPlyrPlayer(element)" in header
+    assert "hljs.highlightAll" not in header
+    assert "Plyr.setup(" not in header
+    assert "export " not in header
+
+
+def test_eager_header_by_default():
+    """По умолчанию всё инициализируется на DOMContentLoaded."""
+    header = build_header()
+
+    assert "initLazyHydration" not in header
+    assert "addCodeCopyButtons();" in header
+    assert "hljs.highlightAll" in header
+    assert "Plyr.setup(" in header
@@ -0,0 +1,71 @@
+"""Тесты палитрового кодирования диаграмм."""
+
+import io
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageDraw, ImageFont
+
+from md_converter.config import ConverterConfig
+from md_converter.preprocessors import MermaidPreprocessor
+from md_converter.processors.image import encode_palette
+
+
+def _diagram_png() -> bytes:
+    """Плоская картинка как от mmdc: фон, блоки, сглаженный текст."""
+    image = Image.new("RGB", (1200, 800), "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=32)
+    for i in range(6):
+        box = (60 + i * 150, 60 + i * 110, 400 + i * 150, 180 + i * 110)
+        draw.rounded_rectangle(box, radius=16, fill=(236, 236, 255), outline=(147, 112, 219), width=3)
+        draw.text((box[0] + 20, box[1] + 40), f"Node {i}", fill="black", font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _lossy_webp(png_bytes: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image.save(buffer, "WEBP", quality=85, method=6)
+    return buffer.getvalue()
+
+
+def test_flat_diagram_smaller_than_lossy():
+    png = _diagram_png()
+    data, extension = encode_palette(png)
+
+    assert extension in ("webp", "png")
+    assert len(data) < len(_lossy_webp(png))
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (1200, 800)
+        # Фон и заливка блоков сохранены точно (без ringing)
+        rgb = image.convert("RGB")
+        assert rgb.getpixel((5, 5)) == (255, 255, 255)
+        assert rgb.getpixel((70, 70)) == (236, 236, 255)
+
+
+def test_photo_like_image_rejected():
+    noise = Image.frombytes("RGB", (300, 300), os.urandom(300 * 300 * 3))
+    buffer = io.BytesIO()
+    noise.save(buffer, "PNG")
+
+    assert encode_palette(buffer.getvalue()) is None
+
+
+def test_preprocessor_palette_mode(monkeypatch):
+    monkeypatch.setattr(MermaidPreprocessor, "_find_mmdc", lambda self: "mmdc")
+    config = ConverterConfig()
+    config.styles.mermaid_encoder = "palette"
+    preprocessor = MermaidPreprocessor(config)
+
+    png = _diagram_png()
+    data, extension = preprocessor._encode_diagram(png)
+    assert (data, extension) == encode_palette(png)
+
+    config.styles.mermaid_encoder = "lossy"
+    data, extension = MermaidPreprocessor(config)._encode_diagram(png)
+    assert extension == "webp"
@@ -0,0 +1,46 @@
+"""Тесты предвычисленной структуры заголовков для breadcrumbs."""
+
+import json
+import re
+
+from md_converter.postprocessors import OutlinePostprocessor
+
+
+HTML = """<html><body>
+<h1 id="title">Урок</h1>
+<h2 id="intro">Введение</h2>
+<h3 id="setup">Установка <code>pip</code></h3>
+<h3>Без id</h3>
+<h2 class="unnumbered" id="next">Дальше &amp; выше</h2>
+<h3 id="tags">Теги &lt;/script&gt;</h3>
+</body></html>"""
+
+
+def _extract(html: str) -> list:
+    match = re.search(r'<script type="application/json" id="md-outline">(.*?)</script>', html)
+    assert match, "JSON структуры не найден"
+    return json.loads(match.group(1))
+
+
+def test_outline_structure():
+    outline = OutlinePostprocessor.build_outline(HTML)
+
+    assert outline == [
+        ["intro", 2, -1, "Введение"],
+        ["setup", 3, 0, "Установка pip"],
+        ["next", 2, -1, "Дальше & выше"],
+        ["tags", 3, 2, "Теги </script>"],
+    ]
+
+
+def test_script_inserted_before_body_end():
+    result = OutlinePostprocessor().process(HTML)
+
+    assert result.index('id="md-outline"') < result.index("</body>")
+    # </script> в тексте заголовка не закрывает тег раньше времени
+    assert _extract(result)[3][3] == "Теги </script>"
+
+
+def test_no_headings_no_script():
+    html = "<html><body><p>Текст</p></body></html>"
+    assert OutlinePostprocessor().process(html) == html
@@ -0,0 +1,140 @@
+"""Тесты встроенных медиа (data: URI): дедупликация и отложенная загрузка."""
+
+import base64
+import io
+import re
+
+import pytest
+
+from md_converter import Converter, ConverterConfig
+from md_converter.postprocessors import (
+    PayloadDedupPostprocessor,
+    PayloadDeferPostprocessor,
+    PlyrWrapPostprocessor,
+    run_postprocessors,
+)
+
+LOGO = "data:image/png;base64," + "QUJD" * 1000
+DIAGRAM = "data:image/webp;base64," + "REVG" * 1000
+ICON = "data:image/png;base64,QUJD"  # Маленький - не трогаем
+
+
+def _page(body: str) -> str:
+    return f"<html><body>\n{body}\n</body></html>"
+
+
+def test_repeats_reference_first_payload():
+    """Повтор хранится ссылкой, первое вхождение - как есть с data-mdp."""
+    html = _page(
+        f'<img src="{LOGO}" alt="1">\n<img src="{DIAGRAM}">\n'
+        f'<img src="{LOGO}" alt="2">\n<img src="{ICON}"><img src="{ICON}">'
+    )
+
+    result = PayloadDedupPostprocessor().process(html)
+
+    assert result.count(LOGO) == 1 and result.count(DIAGRAM) == 1
+    assert f'<img data-mdp="1" src="{LOGO}" alt="1">' in result
+    assert '<img data-mdp-ref="1 src" alt="2">' in result
+    assert result.count(f'<img src="{ICON}">') == 2
+    # Скрипт-резолвер перед </body> с таблицей только нужных payload
+    script = re.search(r"<script>(.*?)</script>\n</body>", result, re.DOTALL)
+    assert script and script.group(1).endswith('({"1":"src"});')
+
+
+def test_no_repeats_no_script():
+    """Без повторов документ меняется только пометками data-mdp."""
+    html = _page(f'<img src="{LOGO}"><img src="{DIAGRAM}">')
+
+    result = PayloadDedupPostprocessor().process(html)
+
+    assert "<script>" not in result
+    assert result.replace(' data-mdp="1"', "").replace(' data-mdp="2"', "") == html
+
+
+def test_video_poster_and_source():
+    """Повторный poster и <source> ссылаются на payload первого элемента."""
+    html = _page(
+        f'<video poster="{LOGO}" src="{DIAGRAM}"></video>\n'
+        f'<video poster="{LOGO}"><source src="{DIAGRAM}" type="video/webm"></video>'
+    )
+
+    result = PayloadDedupPostprocessor().process(html)
+
+    # У первого video только один data-mdp: DIAGRAM остаётся без пометки
+    assert f'<video data-mdp="1" poster="{LOGO}" src="{DIAGRAM}">' in result
+    assert '<video data-mdp-ref="1 poster">' in result
+    assert f'<source data-mdp="2" src="{DIAGRAM}"' in result
+
+
+def test_converter_enables_only_for_embed():
+    """optimize.dedupe_media действует только в режиме embed, первым в цепочке."""
+    config = ConverterConfig(media_mode="embed")
+    config.optimize.dedupe_media = True
+    config.features.mermaid = False
+    postprocessors = Converter(config).postprocessors
+    assert isinstance(postprocessors[0], PayloadDedupPostprocessor)
+    assert isinstance(postprocessors[1], PlyrWrapPostprocessor)
+
+    config.media_mode = "copy"
+    assert not any(
+        isinstance(p, PayloadDedupPostprocessor) for p in Converter(config).postprocessors
+    )
+
+
+def test_defer_moves_payloads_to_end():
+    """Payload уходят в конец документа, по одному блоку на одинаковые данные."""
+    html = _page(
+        f'<p>Текст</p><video poster="{LOGO}" src="{DIAGRAM}"></video>\n'
+        f'<audio><source src="{LOGO}"></audio><img src="{ICON}">'
+    )
+
+    result = PayloadDeferPostprocessor().process(html)
+
+    body, tail = result.split("<p>Текст</p>")[1].split("<script", 1)
+    assert "data:" not in body.replace(ICON, "")
+    assert '<video data-mdp-defer="1 poster 2 src"></video>' in body
+    assert '<source data-mdp-defer="1 src">' in body
+    assert result.count(LOGO) == 1 and result.count(DIAGRAM) == 1
+    assert f'<script type="text/plain" id="mdp-1">{LOGO}</script>' in result
+    assert "IntersectionObserver" in tail
+    assert result.endswith("</script>\n</body></html>")
+
+
+def test_defer_image_placeholder_keeps_size():
+    """Картинка получает размеры и SVG заглушку с тем же соотношением сторон."""
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 360), "red").save(buffer, "PNG")
+    png = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode() + "A" * 2000
+
+    result = PayloadDeferPostprocessor().process(_page(f'<img src="{png}" height="100" alt="x">'))
+
+    assert (
+        '<img data-mdp-defer="1 src" width="640" src="data:image/svg+xml,'
+        "%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 640 360'/%3E\""
+        ' height="100" alt="x">'
+    ) in result
+
+
+def test_defer_streams_spool_to_file(tmp_path):
+    """Через run_postprocessors отложенные payload пишутся из временного файла."""
+    source = tmp_path / "in.html"
+    source.write_text(_page(f'<img src="{DIAGRAM}">' * 3), encoding="utf-8")
+
+    run_postprocessors(source, tmp_path / "out.html", [PayloadDeferPostprocessor()], chunk_size=512)
+
+    result = (tmp_path / "out.html").read_text(encoding="utf-8")
+    assert result.count(DIAGRAM) == 1
+    assert result.count('data-mdp-defer="1 src"') == 3
+    assert result.index('id="mdp-1"') < result.index("</body>")
+
+
+def test_converter_defer_replaces_dedupe():
+    """defer_media вместо dedupe_media: отложенные payload уже без повторов."""
+    config = ConverterConfig(media_mode="embed")
+    config.optimize.dedupe_media = True
+    config.optimize.defer_media = True
+    postprocessors = Converter(config).postprocessors
+
+    assert isinstance(postprocessors[0], PayloadDeferPostprocessor)
+    assert not any(isinstance(p, PayloadDedupPostprocessor) for p in postprocessors)
@@ -0,0 +1,130 @@
+"""Тесты подготовки к публикации: минификация HTML и сжатые копии .gz/.br."""
+
+import gzip
+import os
+import sys
+
+import pytest
+
+from md_converter import ConverterConfig
+from md_converter.config import PublishConfig
+from md_converter.postprocessors import HtmlMinifyPostprocessor, run_postprocessors
+from md_converter.precompress import Precompressor
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <script type="text/javascript">
+      var a  =  1;   // <!-- не комментарий -->
+    </script>
+  </head>
+  <body>
+    <!-- комментарий -->
+    <p>Текст   <em>важный</em>
+      и <code>a  =  b</code> конец. </p>
+    <pre><code>  отступ
+    сохранён</code></pre>
+    <video controls="" src="v.mp4"></video> <img src="a.png" alt="" />
+    <br/>
+  </body>
+</html>
+"""
+
+MINIFIED = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><script>\n'
+    "      var a  =  1;   // <!-- не комментарий -->\n"
+    "    </script></head><body><p>Текст <em>важный</em> и <code>a  =  b</code> конец.</p>"
+    "<pre><code>  отступ\n    сохранён</code></pre>"
+    '<video controls src="v.mp4"></video> <img src="a.png" alt=""><br></body></html>'
+)
+
+
+def test_minify_outside_code():
+    """Пробелы и комментарии убираются, pre/code/script - как есть."""
+    assert HtmlMinifyPostprocessor().process(PAGE) == MINIFIED
+
+
+def test_minify_streaming_matches(tmp_path):
+    """Поток мелкими блоками даёт тот же результат."""
+    source = tmp_path / "page.html"
+    source.write_text(PAGE, encoding="utf-8")
+
+    run_postprocessors(source, tmp_path / "out.html", [HtmlMinifyPostprocessor()], chunk_size=7)
+
+    assert (tmp_path / "out.html").read_text(encoding="utf-8") == MINIFIED
+
+
+def test_minify_keeps_unquoted_slash():
+    """<a href=x/> и условные комментарии не портятся."""
+    html = "<p><img src=pic/> <!--[if IE]>x<![endif]--></p>"
+    assert HtmlMinifyPostprocessor().process(html) == html
+
+
+def _site(tmp_path):
+    output = tmp_path / "build"
+    (output / "assets").mkdir(parents=True)
+    (output / "page.html").write_text(PAGE * 20, encoding="utf-8")
+    (output / "other.html").write_text(PAGE * 20, encoding="utf-8")
+    (output / "assets" / "app.css").write_text("p { color: red }\n" * 200, encoding="utf-8")
+    (output / "assets" / "tiny.js").write_text("x()", encoding="utf-8")
+    return output
+
+
+def test_precompress_writes_gzip_siblings(tmp_path, monkeypatch):
+    """Копии .gz у результата и ассетов; чужой HTML и мелкие файлы - нет."""
+    monkeypatch.setitem(sys.modules, "brotli", None)
+    output = _site(tmp_path)
+
+    written = Precompressor(PublishConfig()).compress(output, [output / "page.html"])
+
+    assert sorted(p.name for p in written) == ["app.css.gz", "page.html.gz"]
+    assert gzip.decompress((output / "page.html.gz").read_bytes()) == (
+        output / "page.html"
+    ).read_bytes()
+    assert not (output / "other.html.gz").exists()
+    assert not (output / "assets" / "tiny.js.gz").exists()
+
+
+def test_precompress_skips_unchanged_sources(tmp_path, monkeypatch):
+    """Тот же хеш исходника - без повторного сжатия, изменённый - заново."""
+    monkeypatch.setitem(sys.modules, "brotli", None)
+    output = _site(tmp_path)
+    page = output / "page.html"
+    compressor = Precompressor(PublishConfig())
+    compressor.compress(output, [page])
+
+    assert compressor.compress(output, [page]) == []
+
+    # Перезаписан теми же байтами (новый mtime) - хеш тот же
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert compressor.compress(output, [page]) == []
+
+    page.write_text(PAGE * 30, encoding="utf-8")
+    assert compressor.compress(output, [page]) == [output / "page.html.gz"]
+    assert gzip.decompress((output / "page.html.gz").read_bytes()) == page.read_bytes()
+
+    # Удалённая копия пишется снова
+    (output / "assets" / "app.css.gz").unlink()
+    assert compressor.compress(output, [page]) == [output / "assets" / "app.css.gz"]
+
+
+def test_precompress_brotli(tmp_path):
+    """С пакетом brotli - ещё и .br."""
+    brotli = pytest.importorskip("brotli")
+    output = _site(tmp_path)
+
+    Precompressor(PublishConfig()).compress(output, [output / "page.html"])
+
+    assert brotli.decompress((output / "page.html.br").read_bytes()) == (
+        output / "page.html"
+    ).read_bytes()
+
+
+def test_publish_config_from_dict():
+    """Секция publish в конфиге."""
+    config = ConverterConfig.from_dict({"publish": {"minify_html": True, "workers": 2}})
+    assert config.publish.minify_html is True
+    assert config.publish.precompress is False
+    assert config.publish.workers == 2
@@ -0,0 +1,162 @@
+"""Тесты детерминированных результатов и проверки воспроизводимости."""
+
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+from md_converter import Converter, ConverterConfig
+from md_converter.backends import PandocBackend
+from md_converter.preprocessors import mermaid_preprocessor
+from md_converter.converter import DEFAULT_SOURCE_DATE_EPOCH
+from md_converter.preprocessors import prune_diagrams
+from md_converter.preprocessors.mermaid_preprocessor import MermaidPreprocessor
+from md_converter.reproducible import compare_trees
+
+
+def _mermaid(tmp_path, monkeypatch) -> MermaidPreprocessor:
+    """Препроцессор без mmdc: рендер = байты кода диаграммы."""
+    monkeypatch.setattr(mermaid_preprocessor, "_MMDC_PATH", "mmdc")
+    monkeypatch.setattr(
+        MermaidPreprocessor,
+        "_render_diagram",
+        lambda self, code, index: (code.encode("utf-8"), "webp"),
+    )
+    config = ConverterConfig(output_dir=str(tmp_path), media_mode="copy")
+    return MermaidPreprocessor(config, format_type="html")
+
+
+def test_diagram_names_do_not_depend_on_position(tmp_path, monkeypatch):
+    """Новая диаграмма в начале не переименовывает остальные."""
+    prep = _mermaid(tmp_path, monkeypatch)
+    block = "```mermaid\ngraph LR\n  A --> B\n```\n"
+    first = prep.process(block)
+    second = prep.process("```mermaid\ngraph TD\n  X --> Y\n```\n\n" + block)
+
+    name = first.split("(media/")[1].split(")")[0]
+    assert name.startswith("diagram-") and name.endswith(".webp")
+    assert f"(media/{name})" in second
+    assert len(list((tmp_path / "media").iterdir())) == 2
+
+
+def test_prune_stale_diagrams(tmp_path, monkeypatch):
+    """Изменённая диаграмма: старый файл удаляется, нужный другому документу - нет."""
+    old, kept, shared = "graph LR\n  A --> B", "graph LR\n  C --> D", "graph TD\n  S --> T"
+    lesson = _mermaid(tmp_path, monkeypatch)
+    lesson.process("".join(f"```mermaid\n{code}\n```\n" for code in (old, kept, shared)))
+    prune_diagrams(tmp_path, "lesson", lesson.diagrams)
+    other = _mermaid(tmp_path, monkeypatch)
+    other.process(f"```mermaid\n{shared}\n```\n")
+    prune_diagrams(tmp_path, "other", other.diagrams)
+    old_digest = lesson._diagram_hash(old)
+    (tmp_path / "media" / f"diagram-{old_digest}-480w.webp").write_bytes(b"srcset")
+    unknown = tmp_path / "media" / "diagram-000000000000.webp"
+    unknown.write_bytes(b"not ours")
+
+    rebuilt = _mermaid(tmp_path, monkeypatch)
+    rebuilt.process(f"```mermaid\n{kept}\n```\n")
+    removed = prune_diagrams(tmp_path, "lesson", rebuilt.diagrams)
+
+    assert sorted(p.name for p in removed) == [
+        f"diagram-{old_digest}-480w.webp",
+        f"diagram-{old_digest}.webp",
+    ]
+    names = {p.name for p in (tmp_path / "media").iterdir()}
+    assert f"diagram-{lesson._diagram_hash(kept)}.webp" in names
+    assert f"diagram-{lesson._diagram_hash(shared)}.webp" in names
+    assert unknown.name in names
+
+
+def test_default_source_date_is_pandoc_time(tmp_path, monkeypatch):
+    """Без настройки - время сборки Pandoc; постоянная - только в reproducible."""
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    converter = Converter(ConverterConfig(output_dir=str(tmp_path)))
+
+    assert converter._source_date_epoch() is None
+    converter.config.advanced.reproducible = True
+    assert converter._source_date_epoch() == DEFAULT_SOURCE_DATE_EPOCH
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    assert converter._source_date_epoch() == 1700000000
+    converter.config.advanced.source_date_epoch = 42
+    assert converter._source_date_epoch() == 42
+
+
+def test_epub_identifier_and_date_are_stable(tmp_path, monkeypatch):
+    """EPUB: постоянный identifier и SOURCE_DATE_EPOCH для Pandoc."""
+    runs = []
+
+    def fake_run(cmd, env=None, **kwargs):
+        runs.append((cmd, env))
+        Path(cmd[cmd.index("-o") + 1]).write_bytes(b"epub")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    config = ConverterConfig(output_dir=str(tmp_path))
+    config.features.mermaid = False
+    config.metadata.title = "Курс"
+
+    for _ in range(2):
+        PandocBackend(config).convert("# A", "course", "epub", source_date_epoch=1700000000)
+
+    (first_cmd, env), (second_cmd, _) = runs
+    identifiers = [arg for arg in first_cmd if arg.startswith("identifier=urn:uuid:")]
+    assert len(identifiers) == 1 and identifiers[0] in second_cmd
+    assert env["SOURCE_DATE_EPOCH"] == "1700000000"
+
+
+def test_compare_trees_reports_epub_members(tmp_path):
+    """Различия: отсутствующие файлы и отличающиеся файлы внутри EPUB."""
+    first, second = tmp_path / "a", tmp_path / "b"
+    for root, date in ((first, (2024, 1, 1, 0, 0, 0)), (second, (2025, 1, 1, 0, 0, 0))):
+        (root / "media").mkdir(parents=True)
+        (root / "media" / "pic.webp").write_bytes(b"same")
+        with zipfile.ZipFile(root / "book.epub", "w") as archive:
+            archive.writestr("mimetype", "application/epub+zip")
+            archive.writestr(zipfile.ZipInfo("EPUB/content.opf", date), "<opf/>")
+    (first / "extra.html").write_text("x", encoding="utf-8")
+
+    assert compare_trees(first, second) == [
+        "отличается: book.epub → EPUB/content.opf",
+        "только в первой сборке: extra.html",
+    ]
+    assert compare_trees(second, second) == []
+
+
+def test_check_reproducible_builds_twice(tmp_path, monkeypatch):
+    """Две полные сборки в разные папки; одинаковый результат - без различий."""
+    builds = []
+
+    def fake_convert(self, content, output_name, format_type, header="", **kwargs):
+        builds.append(self.config.output_dir)
+        output = Path(self.config.output_dir) / f"{output_name}.{format_type}"
+        output.write_text(content, encoding="utf-8")
+        return output
+
+    monkeypatch.setattr(PandocBackend, "convert", fake_convert)
+    lesson = tmp_path / "lesson.md"
+    lesson.write_text("# Урок\n", encoding="utf-8")
+    config = ConverterConfig(output_dir=str(tmp_path / "build"))
+    config.features.mermaid = False
+
+    assert Converter(config).check_reproducible(lesson) == []
+    assert len(set(builds)) == 2
+    assert not (tmp_path / "build").exists()
+
+
+def test_check_reproducible_with_precompress(tmp_path, monkeypatch):
+    """Манифест .precompress.json (mtime исходников) не считается различием."""
+    monkeypatch.setitem(sys.modules, "brotli", None)
+
+    def fake_convert(self, content, output_name, format_type, header="", **kwargs):
+        output = Path(self.config.output_dir) / f"{output_name}.{format_type}"
+        output.write_text(content, encoding="utf-8")
+        return output
+
+    monkeypatch.setattr(PandocBackend, "convert", fake_convert)
+    lesson = tmp_path / "lesson.md"
+    lesson.write_text("# Урок\n\n" + "Текст урока. " * 200, encoding="utf-8")
+    config = ConverterConfig(output_dir=str(tmp_path / "build"))
+    config.features.mermaid = False
+    config.publish.precompress = True
+
+    assert Converter(config).check_reproducible(lesson) == []
@@ -0,0 +1,84 @@
+"""Тесты формата site (страница на главу)."""
+
+from pathlib import Path
+
+from md_converter.backends import PandocBackend
+from md_converter.config import ConverterConfig
+from md_converter.processors import DocumentFeatures, MergerProcessor
+from md_converter.site import SiteBuilder
+
+
+def _write_course(folder: Path):
+    folder.mkdir()
+    (folder / "10 Итоги.md").write_text("# Итоги\n\nКонец.\n", encoding="utf-8")
+    (folder / "2 Установка.md").write_text(
+        "```bash\n# не заголовок\n```\n\n# Установка\n\n"
+        "::: note\nЗаметка\n:::\n",
+        encoding="utf-8",
+    )
+    (folder / "1 Введение.md").write_text("Текст без заголовка.\n", encoding="utf-8")
+
+
+def test_merge_chapters_keeps_boundaries(tmp_path):
+    """Файл = глава: natsort, заголовок H1 вне кода, slug."""
+    _write_course(tmp_path / "course")
+
+    chapters = MergerProcessor().merge_chapters(tmp_path / "course")
+
+    assert [c.title for c in chapters] == ["1 Введение", "Установка", "Итоги"]
+    assert [c.slug for c in chapters] == ["01-1-введение", "02-2-установка", "03-10-итоги"]
+
+
+def test_document_features_combine():
+    """Функции глав объединяются для общего CSS/JS."""
+    first = DocumentFeatures.detect("::: note\nA\n:::\n\n```python\nx\n```\n")
+    second = DocumentFeatures.detect('<div class="diff-wrapper"></div>\n\n```bash\nls\n```\n')
+
+    combined = DocumentFeatures.combine([first, second])
+
+    assert combined.callout_types == {"note"}
+    assert combined.has_diff and not combined.has_media
+    assert combined.code_languages == {"python", "bash"}
+
+
+def test_site_pages_share_assets(tmp_path, monkeypatch):
+    """Страницы с навигацией ссылаются на один бандл CSS/JS."""
+    calls = []
+
+    def fake_convert(self, content, output_name, format_type, header="", **kwargs):
+        calls.append(self)
+        output = Path(self.config.output_dir) / f"{output_name}.html"
+        output.write_text(f"<head>{header}</head>\n{content}", encoding="utf-8")
+        return output
+
+    monkeypatch.setattr(PandocBackend, "convert", fake_convert)
+    _write_course(tmp_path / "course")
+    config = ConverterConfig(output_dir=str(tmp_path / "build"))
+    config.features.mermaid = False
+    config.metadata.title = "Курс"
+
+    pages = SiteBuilder(config).build(tmp_path / "course", "course")
+
+    site_dir = tmp_path / "build" / "course"
+    assert [p.name for p in pages] == ["index.html", "02-2-установка.html", "03-10-итоги.html"]
+    (css_file,) = (site_dir / "assets" / "css").glob("app.*.css")
+    (js_file,) = (site_dir / "assets" / "js").glob("app.*.js")
+    assert ".site-pager" in css_file.read_text(encoding="utf-8")
+    assert not any(b.stylesheet for b in calls)
+
+    middle = pages[1].read_text(encoding="utf-8")
+    assert f'<link rel="stylesheet" href="assets/css/{css_file.name}">' in middle
+    assert f'<script src="assets/js/{js_file.name}"></script>' in middle
+    assert '<li aria-current="page"><a href="02-2-установка.html">Установка</a>' in middle
+    assert 'rel="prev" href="index.html"' in middle
+    assert 'rel="next" href="03-10-итоги.html"' in middle
+    assert "<style" not in middle
+
+    first = pages[0].read_text(encoding="utf-8")
+    assert 'rel="prev"' not in first and 'rel="next"' in first
+    assert "pagetitle=Установка — Курс" in _pandoc_args(calls)
+
+
+def _pandoc_args(backends) -> list[str]:
+    """Аргументы Pandoc всех вызовов (pagetitle главы)."""
+    return [arg for b in backends for arg in b.config.advanced.pandoc_extra_args]
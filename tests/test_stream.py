@@ -0,0 +1,92 @@
+"""Тесты потоковой постобработки HTML."""
+
+import pytest
+
+from md_converter.postprocessors import (
+    OutlinePostprocessor,
+    PlyrWrapPostprocessor,
+    run_postprocessors,
+)
+from md_converter.postprocessors.stream import END, START, TEXT, HtmlTokenizer, tokenize
+
+HTML = """<!DOCTYPE html>
+<html><head><style>a > b { color: red }</style>
+<script>if (a < b && "</p>") {}</script><!-- <h2 id="no"> --></head>
+<body>
+<h2 id="intro" title="a > b">Введение &amp; обзор</h2>
+<figure>
+  <video src="data:video/mp4;base64,AAAA/x==" controls></video>
+</figure>
+<p>1 < 2</p>
+<figure><audio class="mine" src="a.mp3"></audio></figure>
+<h3 id="end">Итог</h3>
+</body></html>
+"""
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10**6])
+def test_tokenizer_round_trip(size):
+    """Склейка токенов = вход при любом разбиении на блоки."""
+    tokenizer = HtmlTokenizer()
+    tokens = []
+    for chunk in _chunks(HTML, size):
+        tokens.extend(tokenizer.feed(chunk))
+    tokens.extend(tokenizer.close())
+
+    assert "".join(t.text for t in tokens) == HTML
+    starts = [t.name for t in tokens if t.kind == START]
+    assert starts.count("h2") == 1  # заголовок в комментарии - не тег
+    # Содержимое <script> - текст: "</p>" и "<" внутри не теги
+    texts = "".join(t.text for t in tokens if t.kind == TEXT)
+    assert 'if (a < b && "</p>") {}' in texts
+    assert [t.name for t in tokens if t.kind == END].count("p") == 1
+
+
+def test_quoted_gt_inside_tag():
+    """">" в значении атрибута не закрывает тег."""
+    (token,) = [t for t in tokenize(HTML) if t.name == "h2" and t.kind == START]
+    assert token.text == '<h2 id="intro" title="a > b">'
+
+
+def test_plyr_classes():
+    """Классы Plyr: медиа без class и figure вокруг медиа."""
+    result = PlyrWrapPostprocessor().process(HTML)
+
+    assert '<figure class="media-player media-video">\n  <video class="plyr-video" src=' in result
+    assert '<figure class="media-player media-audio"><audio class="mine"' in result
+    assert result.count("plyr-audio") == 0
+
+
+@pytest.mark.parametrize("size", [1, 5, 4096])
+def test_file_stream_matches_string_api(tmp_path, size):
+    """Поток файл → файл даёт тот же результат, что process(str)."""
+    chain = [PlyrWrapPostprocessor(), OutlinePostprocessor()]
+    expected = HTML
+    for postprocessor in chain:
+        expected = postprocessor.process(expected)
+
+    source = tmp_path / "in.html"
+    source.write_text(HTML, encoding="utf-8")
+    run_postprocessors(source, tmp_path / "out.html", chain, chunk_size=size)
+
+    result = (tmp_path / "out.html").read_text(encoding="utf-8")
+    assert result == expected
+    assert result.index('id="md-outline"') < result.index("</body>")
+
+
+def test_large_tag_split_across_chunks(tmp_path):
+    """Встроенный data: URI больше блока чтения - тег собирается целиком."""
+    payload = "A" * 200_000
+    html = f'<figure><video src="data:video/mp4;base64,{payload}=="></video></figure>'
+    source = tmp_path / "in.html"
+    source.write_text(html, encoding="utf-8")
+
+    run_postprocessors(source, tmp_path / "out.html", [PlyrWrapPostprocessor()], chunk_size=4096)
+
+    result = (tmp_path / "out.html").read_text(encoding="utf-8")
+    assert result.startswith('<figure class="media-player media-video"><video class="plyr-video" src=')
+    assert payload in result
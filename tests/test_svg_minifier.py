@@ -0,0 +1,99 @@
+"""Тесты SVG режима Mermaid и минификации SVG."""
+
+import re
+
+from md_converter.config import ConverterConfig
+from md_converter.preprocessors import MermaidPreprocessor
+from md_converter.processors import DocumentFeatures
+from md_converter.processors.svg import SvgMinifier
+
+# Сокращённый вывод mmdc (flowchart, Mermaid 10)
+MERMAID_SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<!-- Generated by mermaid -->
+<svg aria-roledescription="flowchart-v2" role="graphics-document document"
+     viewBox="-8 -8 217.140625 174" style="max-width: 217.140625px;"
+     xmlns:xlink="http://www.w3.org/1999/xlink" xmlns="http://www.w3.org/2000/svg"
+     width="100%" id="my-svg" aria-labelledby="chart-title-my-svg">
+  <title id="chart-title-my-svg">Схема</title>
+  <metadata>generator</metadata>
+  <style>#my-svg{font-family:"trebuchet ms",verdana,arial,sans-serif;fill:#333;}
+    #my-svg .node rect{fill:#ECECFF;stroke:#9370DB;stroke-width:1px;}
+    #my-svg .edgePath .path{stroke:#333333;}</style>
+  <g>
+    <marker id="my-svg_flowchart-pointEnd" class="marker flowchart" viewBox="0 0 10 10">
+      <path d="M 0 0 L 10 5 L 0 10 z" style="stroke-width: 1; stroke-dasharray: 1,0;" class="arrowMarkerPath"/>
+    </marker>
+    <path marker-end="url(#my-svg_flowchart-pointEnd)" style="fill:none;" class="flowchart-link"
+          d="M100.5703125,34L100.5703125,38.16666666666666L100.5703125,42.33333333333333"
+          id="L-A-B-0"/>
+    <path marker-end="url(#my-svg_flowchart-pointEnd)" style="fill:none;" d="M1,2L3,4" id="L-B-C-0"/>
+    <g id="flowchart-A-0" class="node default" transform="translate(100.5703125, 17)">
+      <rect height="34" width="85.71875" y="-17" x="-42.859375" style="" class="basic label-container"/>
+      <g class="label">
+        <foreignObject height="18" width="65.71875"><div style="display: inline-block; white-space: nowrap;" xmlns="http://www.w3.org/1999/xhtml"><span class="nodeLabel">Начало  A</span></div></foreignObject>
+      </g>
+    </g>
+    <use xlink:href="#flowchart-A-0"/>
+  </g>
+</svg>
+"""
+
+
+def test_minified_svg_structure():
+    result = SvgMinifier(id_prefix="d1-").process(MERMAID_SVG)
+
+    assert len(result) < len(MERMAID_SVG)
+    assert "<?xml" not in result and "<!--" not in result and "<metadata" not in result
+    assert "\n" not in result
+    # id переименованы, ссылки на них тоже
+    assert "my-svg" not in result and "flowchart-A-0" not in result
+    assert result.startswith("<svg ") and 'id="d1-a"' in result
+    assert 'aria-labelledby="d1-b"' in result
+    assert 'marker-end="url(#d1-c)"' in result and 'id="d1-c"' in result
+    assert 'xlink:href="#d1-f"' in result
+    assert "#d1-a .node rect{" in result
+    # Цвета в CSS не путаются с id
+    assert "#333" in result
+    # Координаты округлены, пробелы в тексте схлопнуты
+    assert "38.167" in result and "38.1666" not in result
+    assert "Начало A" in result
+
+
+def test_repeated_inline_styles_hoisted():
+    result = SvgMinifier(id_prefix="d1-").process(MERMAID_SVG)
+
+    assert 'style="fill:none;"' not in result
+    assert result.count('class="flowchart-link d1-sa"') == 1
+    assert "#d1-a .d1-sa{fill:none!important}" in result
+    assert 'style=""' not in result
+    # Уникальный стиль и стиль корня остаются inline
+    assert "stroke-dasharray" in result
+    assert 'style="max-width: 217.141px;"' in result
+
+
+def test_prefix_isolates_diagrams():
+    first = SvgMinifier(id_prefix="d1-").process(MERMAID_SVG)
+    second = SvgMinifier(id_prefix="d2-").process(MERMAID_SVG)
+
+    ids_first = set(re.findall(r'id="([^"]+)"', first))
+    ids_second = set(re.findall(r'id="([^"]+)"', second))
+    assert ids_first and not ids_first & ids_second
+
+
+def test_svg_inlined_in_embed_mode(monkeypatch):
+    monkeypatch.setattr(MermaidPreprocessor, "_find_mmdc", lambda self: "mmdc")
+    monkeypatch.setattr(
+        MermaidPreprocessor,
+        "_run_mmdc",
+        lambda self, code, suffix, args: MERMAID_SVG.encode("utf-8"),
+    )
+    config = ConverterConfig()
+    config.styles.mermaid_format = "svg"
+
+    md = "Текст\n\n```mermaid\ngraph TD\nA-->B\n```\n\n```mermaid\ngraph TD\nB-->C\n```\n"
+    result = MermaidPreprocessor(config).process(md)
+
+    assert "base64" not in result
+    assert result.count('```{=html}\n<div class="mermaid"><svg ') == 2
+    assert 'id="d1-a"' in result and 'id="d2-a"' in result
+    assert DocumentFeatures.detect(result).has_mermaid
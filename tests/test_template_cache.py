@@ -0,0 +1,114 @@
+"""Тесты кеша header-бандлов TemplateProcessor."""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from md_converter.config import FeaturesConfig, StylesConfig
+from md_converter.processors import template as template_module
+from md_converter.processors.template import TemplateProcessor, clear_header_cache
+
+
+@pytest.fixture
+def assets_root(tmp_path, monkeypatch):
+    """Копия assets во временной папке, чтобы можно было менять файлы."""
+    project_root = Path(template_module.__file__).parent.parent.parent
+    shutil.copytree(project_root / "assets" / "css", tmp_path / "assets" / "css")
+    shutil.copytree(project_root / "assets" / "js", tmp_path / "assets" / "js")
+    monkeypatch.setattr(template_module, "_PROJECT_ROOT", tmp_path)
+    clear_header_cache()
+    yield tmp_path
+    clear_header_cache()
+
+
+@pytest.fixture
+def read_counter(monkeypatch):
+    """Считает чтения файлов через Path.read_text."""
+    calls = []
+    original = Path.read_text
+
+    def counting_read_text(self, *args, **kwargs):
+        calls.append(self)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", counting_read_text)
+    return calls
+
+
+def make_processor(**feature_overrides) -> TemplateProcessor:
+    return TemplateProcessor(
+        template="web",
+        features=FeaturesConfig(**feature_overrides),
+        styles=StylesConfig(),
+        media_mode="embed",
+    )
+
+
+def test_header_shared_between_instances(assets_root, read_counter):
+    """Второй процессор с теми же настройками не читает ассеты."""
+    first = make_processor().build_header("html")
+    reads_after_first = len(read_counter)
+    assert reads_after_first > 0
+
+    second = make_processor().build_header("html")
+    assert second == first
+    assert len(read_counter) == reads_after_first
+
+
+def test_header_key_depends_on_features(assets_root):
+    """Разные наборы функций дают разные header."""
+    full = make_processor().build_header("html")
+    no_diff = make_processor(diff_blocks=False).build_header("html")
+
+    assert "assets/css/modules/diff.css" in full
+    assert "assets/css/modules/diff.css" not in no_diff
+
+
+def test_header_invalidated_by_mtime(assets_root, read_counter):
+    """Изменение ассета перечитывает только его."""
+    make_processor().build_header("html")
+
+    css_path = assets_root / "assets" / "css" / "modules" / "diff.css"
+    css_path.write_text(".diff-marker-test { color: red; }", encoding="utf-8")
+    stat = css_path.stat()
+    os.utime(css_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    read_counter.clear()
+    header = make_processor().build_header("html")
+
+    assert ".diff-marker-test" in header
+    assert read_counter == [css_path]
+
+
+def test_epub_header_empty(assets_root):
+    """Для EPUB header не генерируется."""
+    assert make_processor().build_header("epub") == ""
+
+
+def test_bundle_fingerprinted_and_written_once(assets_root, tmp_path):
+    """app.<hash>.css/js: пишутся один раз, имя зависит от содержимого."""
+    out = tmp_path / "build"
+    head = make_processor().write_bundle(out)
+
+    css_files = list((out / "assets" / "css").glob("app.*.css"))
+    js_files = list((out / "assets" / "js").glob("app.*.js"))
+    assert len(css_files) == 1 and len(js_files) == 1
+    assert f'href="assets/css/{css_files[0].name}"' in head
+    assert f'src="assets/js/{js_files[0].name}"' in head
+    # Минифицирован, без @import
+    css = css_files[0].read_text(encoding="utf-8")
+    assert "@import" not in css and "/*" not in css
+
+    mtime = css_files[0].stat().st_mtime_ns
+    assert make_processor().write_bundle(out) == head
+    assert css_files[0].stat().st_mtime_ns == mtime
+
+    # Другой набор функций - другой бандл рядом
+    other = make_processor(diff_blocks=False).write_bundle(out)
+    assert other != head
+    assert len(list((out / "assets" / "css").glob("app.*.css"))) == 2
+    # Лишние ассеты (parallax.css, модули) не копируются
+    assert not (out / "assets" / "css" / "parallax.css").exists()
+    assert not (out / "assets" / "css" / "modules").exists()
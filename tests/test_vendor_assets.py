@@ -0,0 +1,158 @@
+"""Тесты вендорных библиотек из репозитория и кеша."""
+
+import hashlib
+import socket
+
+import pytest
+
+from md_converter.config import FeaturesConfig, OptimizeConfig, StylesConfig
+from md_converter.processors import DocumentFeatures, TemplateProcessor
+from md_converter.processors import vendor as vendor_module
+from md_converter.processors.template import clear_header_cache
+from md_converter.processors.vendor import VendorAssets, normalize_languages
+
+
+def _write_vendor(base, files):
+    """Вендорные файлы и SHA256SUMS, как пишет fetch_vendor.py."""
+    lines = []
+    for relative, text in files.items():
+        path = base / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        lines.append(f"{hashlib.sha256(text.encode()).hexdigest()}  {relative}\n")
+    (base / "SHA256SUMS").write_text("".join(lines), encoding="utf-8")
+
+
+VENDORED = {
+    "highlight.js/11.9.0/core.js": "module.exports = {highlightAll: function() {}};",
+    "highlight.js/11.9.0/styles/github-dark.min.css": "/* github-dark.min.css */",
+    **{
+        f"highlight.js/11.9.0/languages/{name}.min.js": f"/* {name}.min.js */"
+        for name in ("python", "bash", "javascript")
+    },
+    "plyr/3.7.8/plyr.polyfilled.js": "/* plyr.polyfilled.js */",
+    "plyr/3.7.8/plyr.css": "/* plyr.css */",
+}
+
+
+@pytest.fixture
+def project(tmp_path):
+    return tmp_path / "project" / "assets" / "vendor"
+
+
+@pytest.fixture
+def vendor(tmp_path, project, monkeypatch):
+    """Файлы в кеше, сеть запрещена: сборка не должна в неё ходить."""
+    monkeypatch.setattr(vendor_module, "_PROJECT_ROOT", tmp_path / "project")
+    monkeypatch.setattr(socket, "socket", _no_network)
+    _write_vendor(tmp_path / "cache", VENDORED)
+    return VendorAssets(cache_dir=tmp_path / "cache")
+
+
+def _no_network(*args, **kwargs):
+    raise AssertionError("сборка обращается к сети")
+
+
+def test_normalize_languages():
+    assert normalize_languages(["py", "JS", "text", "diff-python", "html"]) == [
+        "css",
+        "javascript",
+        "python",
+        "xml",
+    ]
+
+
+def test_bundle_contains_only_document_languages(vendor):
+    bundle = vendor.highlight_bundle({"python", "sh"})
+
+    assert "window.hljs=module.exports" in bundle
+    assert "/* python.min.js */" in bundle
+    assert "/* bash.min.js */" in bundle
+    assert "javascript" not in bundle
+
+
+def test_unknown_language_skipped(vendor):
+    bundle = vendor.highlight_bundle({"klingon", "python"})
+
+    assert "klingon" not in bundle
+    assert "/* python.min.js */" in bundle
+
+
+def test_project_vendor_dir_has_priority(vendor, project):
+    _write_vendor(project, {"plyr/3.7.8/plyr.css": ".plyr-local {}"})
+
+    assert vendor.plyr_css() == ".plyr-local {}"
+    assert vendor.plyr_js() == "/* plyr.polyfilled.js */"
+
+
+def test_checksum_mismatch_rejected(vendor, project, tmp_path):
+    _write_vendor(project, {"plyr/3.7.8/plyr.css": ".plyr-local {}"})
+    (project / "plyr" / "3.7.8" / "plyr.css").write_text(".changed {}", encoding="utf-8")
+    (tmp_path / "cache" / "plyr" / "3.7.8" / "plyr.polyfilled.js").write_text("x")
+
+    assert vendor.plyr_css() == "/* plyr.css */"
+    assert vendor.plyr_js() is None
+
+
+def test_missing_files_without_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(vendor_module, "_PROJECT_ROOT", tmp_path / "project")
+    monkeypatch.setattr(socket, "socket", _no_network)
+    vendor = VendorAssets(cache_dir=tmp_path / "empty")
+
+    assert vendor.highlight_bundle({"python"}) is None
+    assert vendor.plyr_css() is None
+
+
+def test_header_is_network_free(vendor):
+    clear_header_cache()
+    processor = TemplateProcessor(
+        template="web",
+        features=FeaturesConfig(),
+        styles=StylesConfig(),
+        media_mode="embed",
+        optimize=OptimizeConfig(vendor_assets=True),
+    )
+    processor.vendor = vendor
+    document = DocumentFeatures(code_languages=frozenset({"python"}), has_media=True)
+    header = processor.build_header("html", document)
+
+    assert "cdnjs.cloudflare.com" not in header
+    assert "cdn.plyr.io" not in header
+    assert "/* python.min.js */" in header
+    assert "/* plyr.polyfilled.js */" in header
+    clear_header_cache()
+
+
+def test_fetch_script_layout(tmp_path, monkeypatch):
+    """fetch_vendor.py раскладывает архив npm так, как ищет VendorAssets."""
+    import io
+    import tarfile
+
+    import fetch_vendor
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, text in {
+            "package/lib/core.js": VENDORED["highlight.js/11.9.0/core.js"],
+            "package/languages/python.min.js": "/* python */",
+            "package/languages/go.min.js": "/* go */",
+        }.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(text.encode())
+            archive.addfile(info, io.BytesIO(text.encode()))
+    buffer.seek(0)
+
+    with tarfile.open(fileobj=buffer, mode="r:gz") as archive:
+        files = fetch_vendor.extract(
+            archive,
+            {
+                "package/lib/core.js": "highlight.js/11.9.0/core.js",
+                "package/languages/*.min.js": "highlight.js/11.9.0/languages/",
+            },
+        )
+    fetch_vendor.write_vendor(tmp_path / "cache", files)
+
+    monkeypatch.setattr(vendor_module, "_PROJECT_ROOT", tmp_path / "project")
+    bundle = VendorAssets(cache_dir=tmp_path / "cache").highlight_bundle({"go", "python"})
+    assert "/* go */" in bundle and "/* python */" in bundle
+    assert fetch_vendor.check_vendor(tmp_path / "cache") == 0
@@ -0,0 +1,145 @@
+"""Тесты подготовки видео: MP4 faststart и постер."""
+
+import os
+import stat
+import struct
+
+import pytest
+
+from md_converter.cache import new_file_mode
+from md_converter.config import VideoConfig
+from md_converter.processors import MediaProcessor, VideoOptimizer
+from md_converter.processors import video as video_module
+from md_converter.processors.video import FaststartError, faststart
+
+CHUNKS = [b"frame-one" * 10, b"frame-two" * 20, b"frame-three" * 5]
+
+
+def _atom(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _offsets_atom(kind: bytes, offsets: list[int]) -> bytes:
+    width = "I" if kind == b"stco" else "Q"
+    table = struct.pack(f">{len(offsets)}{width}", *offsets)
+    return _atom(kind, b"\0" * 4 + struct.pack(">I", len(offsets)) + table)
+
+
+def _moov(kind: bytes, offsets: list[int]) -> bytes:
+    stbl = _atom(b"stbl", _atom(b"stsz", b"\0" * 12) + _offsets_atom(kind, offsets))
+    trak = _atom(b"trak", _atom(b"tkhd", b"\0" * 20) + _atom(b"mdia", _atom(b"minf", stbl)))
+    return _atom(b"moov", _atom(b"mvhd", b"\0" * 100) + trak)
+
+
+def _mp4(kind: bytes = b"stco", moov_last: bool = True) -> bytes:
+    """ftyp + mdat (+ moov в конце) с таблицей смещений чанков."""
+    ftyp = _atom(b"ftyp", b"isom\0\0\0\0isomavc1")
+    data = b"".join(CHUNKS)
+    offsets = []
+    position = 8  # Заголовок mdat
+    for chunk in CHUNKS:
+        offsets.append(position)
+        position += len(chunk)
+
+    if moov_last:
+        base = len(ftyp)
+        return ftyp + _atom(b"mdat", data) + _moov(kind, [base + o for o in offsets])
+    base = len(ftyp) + len(_moov(kind, [0] * len(CHUNKS)))
+    return ftyp + _moov(kind, [base + o for o in offsets]) + _atom(b"mdat", data)
+
+
+def _chunks_at(data: bytes) -> list[bytes]:
+    """Чанки по таблице stco/co64 файла."""
+    for kind, width in ((b"stco", "I"), (b"co64", "Q")):
+        at = data.find(kind)
+        if at != -1:
+            count = struct.unpack_from(">I", data, at + 8)[0]
+            offsets = struct.unpack_from(f">{count}{width}", data, at + 12)
+            return [data[o : o + len(c)] for o, c in zip(offsets, CHUNKS)]
+    raise AssertionError("нет таблицы смещений")
+
+
+@pytest.mark.parametrize("kind", [b"stco", b"co64"])
+def test_faststart_moves_moov_and_shifts_offsets(tmp_path, kind):
+    """moov перед mdat, смещения чанков указывают на те же данные."""
+    source = tmp_path / "lecture.mp4"
+    source.write_bytes(_mp4(kind))
+    assert _chunks_at(source.read_bytes()) == CHUNKS
+
+    assert faststart(source, tmp_path / "fast.mp4") is True
+
+    result = (tmp_path / "fast.mp4").read_bytes()
+    assert len(result) == source.stat().st_size
+    assert result[4:8] == b"ftyp"
+    assert result.index(b"moov") < result.index(b"mdat")
+    assert _chunks_at(result) == CHUNKS
+
+
+def test_faststart_already_fast(tmp_path):
+    """moov уже в начале - файл не переписывается."""
+    source = tmp_path / "fast.mp4"
+    source.write_bytes(_mp4(moov_last=False))
+
+    assert faststart(source, tmp_path / "out.mp4") is False
+    assert not (tmp_path / "out.mp4").exists()
+
+
+def test_faststart_rejects_broken_file(tmp_path):
+    """Обрезанный файл - FaststartError, а не мусор на выходе."""
+    source = tmp_path / "broken.mp4"
+    source.write_bytes(_mp4()[:-10])
+
+    with pytest.raises(FaststartError):
+        faststart(source, tmp_path / "out.mp4")
+
+
+def test_media_processor_copies_prepared_video(tmp_path, monkeypatch):
+    """COPY: переложенный файл и постер в media/, preload="none" в разметке."""
+    monkeypatch.setattr(video_module.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+    frames = []
+
+    def fake_frame(ffmpeg, source, time, width):
+        frames.append(time)
+        return b"\xff\xd8jpeg"
+
+    monkeypatch.setattr(video_module, "_extract_frame", fake_frame)
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "lecture.mp4").write_bytes(_mp4())
+    optimizer = VideoOptimizer(VideoConfig(optimize=True), cache_dir=tmp_path / "cache")
+    processor = MediaProcessor(
+        mode="copy",
+        output_dir=str(tmp_path / "build"),
+        copy_assets=False,
+        video_optimizer=optimizer,
+    )
+
+    content, _ = processor.process("![Лекция](lecture.mp4)\n", source_dir / "doc.md")
+
+    media = tmp_path / "build" / "media"
+    copied = (media / "lecture.mp4").read_bytes()
+    assert copied.index(b"moov") < copied.index(b"mdat")
+    if os.name != "nt":  # Не 0600 временного файла кеша
+        assert stat.S_IMODE((media / "lecture.mp4").stat().st_mode) == new_file_mode()
+    assert (media / "lecture.poster.jpg").read_bytes() == b"\xff\xd8jpeg"
+    assert content == (
+        '![Лекция](media/lecture.mp4){poster="media/lecture.poster.jpg" preload="none"}\n'
+    )
+
+    # Повторная сборка: из кеша, ffmpeg не запускается
+    processor.process("![Лекция](lecture.mp4)\n", source_dir / "doc.md")
+    assert frames == [1.0]
+
+
+def test_embed_mode_leaves_video(tmp_path):
+    """EMBED: видео встраивается как есть."""
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "lecture.mp4").write_bytes(_mp4())
+    optimizer = VideoOptimizer(VideoConfig(optimize=True), cache_dir=tmp_path / "cache")
+    processor = MediaProcessor(mode="embed", video_optimizer=optimizer)
+
+    _, media_map = processor.process("![](lecture.mp4)", source_dir / "doc.md")
+
+    assert media_map["lecture.mp4"].endswith("src/lecture.mp4")
+    assert not (tmp_path / "cache").exists()
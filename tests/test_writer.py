@@ -0,0 +1,120 @@
+"""Тесты записи результатов только при изменении."""
+
+import os
+import stat
+import subprocess
+
+import pytest
+
+from md_converter import ConverterConfig
+from md_converter.backends import PandocBackend
+from md_converter.writer import OutputWriter
+
+
+def _age(path, seconds=100):
+    """Сдвинуть mtime в прошлое: перезапись будет видна по mtime."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10**9))
+    return path.stat().st_mtime_ns
+
+
+def test_write_bytes_skips_identical(tmp_path):
+    """Те же байты - файл не трогается, другие - заменяется."""
+    writer = OutputWriter()
+    target = tmp_path / "out" / "diagram_1.webp"
+
+    assert writer.write_bytes(target, b"RIFF1") is True
+    mtime = _age(target)
+
+    assert writer.write_bytes(target, b"RIFF1") is False
+    assert target.stat().st_mtime_ns == mtime
+
+    assert writer.write_bytes(target, b"RIFF2") is True
+    assert target.read_bytes() == b"RIFF2"
+    assert (writer.written_files, writer.unchanged_files) == (2, 1)
+    assert writer.written_bytes == 10
+    assert list(target.parent.iterdir()) == [target]  # без временных файлов
+
+
+@pytest.mark.skipif(os.name == "nt", reason="права POSIX")
+def test_written_files_keep_permissions(tmp_path):
+    """Новый файл - 0o666 с umask (не 0600 mkstemp), заменяемый - прежние права."""
+    umask = os.umask(0o022)
+    os.umask(umask)
+    writer = OutputWriter()
+    page = tmp_path / "page.html"
+    script = tmp_path / "run.sh"
+    script.write_bytes(b"old")
+    os.chmod(script, 0o755)
+
+    writer.write_bytes(page, b"<p>1</p>")
+    writer.write_bytes(script, b"new")
+
+    assert stat.S_IMODE(page.stat().st_mode) == 0o666 & ~umask
+    assert stat.S_IMODE(script.stat().st_mode) == 0o755
+    assert not list(tmp_path.glob(".*"))
+
+
+def test_copy_skips_identical(tmp_path):
+    """Копия с тем же содержимым не перезаписывается даже при другом mtime."""
+    writer = OutputWriter()
+    source = tmp_path / "pic.png"
+    source.write_bytes(b"\x89PNG data")
+    target = tmp_path / "media" / "pic.png"
+
+    assert writer.copy(source, target) is True
+    assert target.stat().st_mtime_ns == source.stat().st_mtime_ns
+    mtime = _age(target)
+
+    assert writer.copy(source, target) is False
+    assert target.stat().st_mtime_ns == mtime
+
+    source.write_bytes(b"\x89PNG diff")
+    assert writer.copy(source, target) is True
+    assert target.read_bytes() == b"\x89PNG diff"
+
+
+def test_report(tmp_path):
+    """Отчёт: сколько записано и сколько осталось без изменений."""
+    writer = OutputWriter()
+    writer.write_text(tmp_path / "a.html", "x" * 4096)
+    writer.write_text(tmp_path / "a.html", "x" * 4096)
+
+    assert writer.report() == "💾 Записано: 1 файлов (4 KB), без изменений: 1 (4 KB)"
+
+    writer.reset()
+    assert writer.written_files == writer.unchanged_files == 0
+
+
+class _Upper:
+    """Постпроцессор со строковым API (process)."""
+
+    def process(self, html):
+        return html.upper()
+
+
+def test_backend_publishes_only_changes(tmp_path, monkeypatch):
+    """Pandoc пишет во временную папку; тот же HTML не заменяет результат."""
+    html = ["<p>v1</p>"]
+
+    def fake_run(cmd, **kwargs):
+        output = cmd[cmd.index("-o") + 1]
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(html[0])
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    build = tmp_path / "build"
+    writer = OutputWriter()
+    backend = PandocBackend(ConverterConfig(output_dir=str(build)), writer=writer)
+
+    output = backend.convert("# v1", "lesson", "html", header="<style></style>")
+    mtime = _age(output)
+    backend.convert("# v1", "lesson", "html", header="<style></style>")
+    assert output.stat().st_mtime_ns == mtime
+
+    html[0] = "<p>v2</p>"
+    backend.convert("# v2", "lesson", "html", postprocessors=[_Upper()])
+    assert output.read_text(encoding="utf-8") == "<P>V2</P>"
+    assert sorted(p.name for p in build.iterdir()) == ["lesson.html"]
+    assert (writer.written_files, writer.unchanged_files) == (2, 1)